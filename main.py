@@ -1,5 +1,6 @@
 """Main module."""
 import sys
+from srtools.configuration.configuration import SelectedConfiguration
 from srtools.manager.showroommanager import ShowroomManager
 from srtools.manager.servicesmanager import ServicesManager
 from srtools.utils.commandlineparser import CommandLineParser
@@ -9,7 +10,9 @@ def main(args):
     """Main function."""
     parser = CommandLineParser()
     configuration = parser.parse(args)
-    showroom_manager = ShowroomManager(configuration)
+    # Replaying a capture doesn't need the online rooms
+    showroom_manager = ShowroomManager(configuration,
+                                       initialize=configuration.chosen != SelectedConfiguration.REPLAY)
     services_manager = ServicesManager(configuration, showroom_manager)
 
     action = services_manager.actions_factory.create(configuration.chosen,
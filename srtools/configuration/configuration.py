@@ -262,6 +262,7 @@ class SelectedConfiguration(Enum):
     MESSAGE = 14
     HUNT = 15
     STALK = 16
+    REPLAY = 17
 
 class PaidGifts(Enum):
     """Paid gifts ids."""
@@ -374,8 +375,55 @@ class ConnectionConfiguration(object):
         """Resets connection information."""
         self.cookies = "firefox"
         self.timeout = 30
+        # Seconds to establish a connection, whatever the endpoint
+        self.connect_timeout = 10
+        # Read timeouts by path of the endpoints answering quickly, the rest use timeout
+        self.endpoint_timeouts = {
+            "/api/live/live_info": 10,
+            "/room/is_live": 10,
+            "/api/live/polling": 10,
+            "/api/live/onlive_num": 10
+        }
+        # Seconds to reuse the replies of read-only endpoints by path, 0 to always query
+        self.cache_ttls = {
+            "/api/room/profile": 60,
+            "/api/room/next_live": 60,
+            "/api/live/live_info": 5,
+            "/api/live/onlives": 10,
+            "/api/live/gift_list": 300,
+            "/api/room/settings": 300
+        }
+        # Maximum replies kept, the least recently used are dropped first
+        self.cache_size = 1024
+        # File sharing the online rooms with the srtools processes of the host, fetched by only
+        # one of them, None to fetch them in every process
+        self.snapshot = None
+        # Seconds the shared online rooms are used before fetching them again
+        self.snapshot_ttl = 10
+        # Connections kept open to the server, shared by every thread
+        self.pool_size = 20
+        # Idle seconds before probing a kept open connection, 0 to not probe
+        self.keep_alive = 60
+        # Requests per second and burst by endpoint family (path prefix), shared by every
+        # thread, the longest matching prefix applies and "" to every other path
+        self.rate_limits = {
+            "": (50, 100),
+            "/api/live/gifting": (2, 4),
+            "/api/live/post_live_comment": (1, 2),
+            "/social/twitter": (1, 2)
+        }
+        # Seconds before the first retry of a failed request, doubled on every retry (jittered),
+        # a Retry-After asked by the server is waited at least
+        self.backoff = 0.5
+        self.max_backoff = 30
+        # Seconds without sending requests once the server forbids them, then one is tried
+        # and the time is doubled while it keeps forbidding them
+        self.breaker_cooldown = 60
+        self.max_breaker_cooldown = 900
         self.retries = 3
         self.debug = False
+        # Replaces https://www.showroom-live.com, to test against a local server
+        self.base_url = None
         self.user_agent = \
             'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:47.0) Gecko/20100101 Firefox/47.0'
             #'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/59.0.3071.104 Safari/537.36'
@@ -440,6 +488,22 @@ class CaptureConfiguration(object):
         self.target_room = -1
         self.output = "stdout"
         self.type = "colored"
+        self.engine = "blocking"
+        self.format = "text"
+        self.compression = "none"
+        # Seconds binary captures keep messages in memory at most before writing them
+        self.flush_interval = 5
+
+class ReplayConfiguration(object):
+    """Replay configuration."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Resets replay configuration."""
+        self.source = None
+        self.output = None
+        self.type = "colored"
 
 class TrackConfiguration(object):
     """Track configuration."""
@@ -453,6 +517,14 @@ class TrackConfiguration(object):
         self.save = False
         self.target_file = "track.txt"
         self.capture = False
+        # Concurrent live data requests, all of them go to the same host
+        self.threads = 10
+        # "threads" (blocking requests in threads) or "async" (awaited from a single thread)
+        self.http = "threads"
+        # "text" (tab separated) or "sqlite"
+        self.sink = "text"
+        # Latest values of every room, to restart without losing diffs (default: target_file.last)
+        self.checkpoint = None
 
 class HuntConfiguration(object):
     """Hunt configuration."""
@@ -478,6 +550,20 @@ class StalkConfiguration(object):
         self.target_rooms = {}
         self.simulate = False
 
+class StateConfiguration(object):
+    """State kept by long running commands (track, hunt, stalk)."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Resets state configuration."""
+        # Cycles without seeing a room or live before forgetting it, 0 to keep them
+        self.expire_cycles = 12
+        # Maximum rooms or lives remembered, least recently seen are forgotten first
+        self.max_entries = 100000
+        # Cycles between memory reports, 0 to disable them
+        self.report_cycles = 12
+
 class WatchConfiguration(object):
     """Watch configuration."""
     def __init__(self):
@@ -486,6 +572,18 @@ class WatchConfiguration(object):
     def reset(self):
         """Resets watch configuration."""
         self.delay = 10
+        # Seconds around the expected start of a room (time table or next live) polling it
+        # every delay seconds
+        self.window = 600
+        # Seconds between checks of every waiting room at once, through the online rooms list
+        self.sweep = 300
+        # Seconds between refreshes of the expected starts
+        self.schedule_refresh = 3600
+        # "fork" (a process for each room gone online) or "multiplex" (every room from a single
+        # process, sharing connections and captures, needs the async capture engine to capture)
+        self.mode = "fork"
+        # Processes sharing the rooms in multiplex mode, each one pinned to a core
+        self.processes = 1
         self.skip_count = False
         self.skip_throw = False
         self.target_room = -1
@@ -585,9 +683,11 @@ class Configuration(object):
         self.track = TrackConfiguration()
         self.test = TestConfiguration()
         self.capture = CaptureConfiguration()
+        self.replay = ReplayConfiguration()
         self.message = MessageConfiguration()
         self.hunt = HuntConfiguration()
         self.stalk = StalkConfiguration()
+        self.state = StateConfiguration()
         self.reset()
 
     def reset(self):
@@ -605,9 +705,11 @@ class Configuration(object):
         self.lottery.reset()
         self.test.reset()
         self.capture.reset()
+        self.replay.reset()
         self.message.reset()
         self.hunt.reset()
         self.stalk.reset()
+        self.state.reset()
         # Favorite configurations load automatically from file
         #self.favorite_official_users.reset()
         #self.favorite_users.reset()
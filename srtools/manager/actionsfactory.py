@@ -214,6 +214,16 @@ class ActionsFactory(object):
         def execute(self):
             self.services_manager.do_stalk_avatars(self.configuration.obtained_avatars.avatars)
 
+    class ReplayAction(BaseAction):
+        """Handler for Replay action."""
+        def __init__(self, configuration, services_manager):
+            super(ActionsFactory.ReplayAction, self).__init__(configuration, services_manager)
+
+        def execute(self):
+            count = self.services_manager.do_replay(self.configuration.replay.source,
+                                                    self.configuration.replay.type)
+            print(f"Replayed {count} messages.")
+
     def __init__(self):
         pass
 
@@ -263,6 +273,8 @@ class ActionsFactory(object):
             action = self.HuntAction(configuration, services_manager)
         elif action_id == SelectedConfiguration.STALK:
             action = self.StalkAction(configuration, services_manager)
+        elif action_id == SelectedConfiguration.REPLAY:
+            action = self.ReplayAction(configuration, services_manager)
         else:
             log_error("Unkonwn action (%s)" % action_id)
 
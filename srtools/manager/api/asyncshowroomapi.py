@@ -0,0 +1,284 @@
+"""Asynchronous Showroom API."""
+import asyncio
+import datetime
+import json
+
+try:
+    import aiohttp
+except ImportError:
+    # Asynchronous client not available
+    aiohttp = None
+
+from srtools.manager.api.showroomwebservice import _ShowroomWebService
+from srtools.utils.loggingutils import log_error
+
+class AsyncShowroomAPI(_ShowroomWebService):
+    """
+    Showroom API on asyncio, mirroring the read methods of ShowroomAPI as coroutines. Every
+    request of the same instance shares one pool, so many can be awaited at once from a thread:
+
+        results = await asyncio.gather(*[api.get_live_data(x, lives_manager) for x in rooms])
+
+    It must be used from a single event loop and closed with close() (or async with).
+    """
+    class Response(object):
+        """Already read reply, with the parts of requests.Response used by the API."""
+        def __init__(self, status_code, text, headers=None):
+            self.status_code = status_code
+            self.text = text
+            self.headers = headers or {}
+
+        def json(self):
+            """Decodes the reply, raises ValueError if it isn't JSON."""
+            return json.loads(self.text)
+
+    class ConnectionsManager(_ShowroomWebService.ConnectionsManager):
+        """Connections manager sending the requests through an aiohttp session."""
+        # Cookies sent to the server, browsers keep the ones of every site
+        _COOKIE_DOMAIN = "showroom-live.com"
+
+        def __init__(self, configuration, session=None):
+            if aiohttp is None:
+                raise ValueError("The asynchronous API requires the aiohttp package")
+
+            super(AsyncShowroomAPI.ConnectionsManager, self).__init__(configuration, session)
+            self._client = None
+            # Cookies of the shared blocking session, the browser ones otherwise
+            self._cookies = session.cookies if session is not None else self._load_cookies()
+
+        def _create_session(self):
+            # Requests go through aiohttp, no requests session is needed
+            return None
+
+        def reset_connections(self):
+            # The aiohttp session is created in the event loop, on first use
+            pass
+
+        def _get_client(self):
+            """Returns the aiohttp session, created on first use."""
+            if self._client is None:
+                cookies = {x.name: x.value for x in self._cookies or []
+                           if (x.domain or "").endswith(self._COOKIE_DOMAIN)}
+                keep_alive = self.configuration.connection.keep_alive
+                connector = aiohttp.TCPConnector(limit=self.configuration.connection.pool_size,
+                                                 keepalive_timeout=keep_alive or None,
+                                                 force_close=keep_alive <= 0)
+                self._client = aiohttp.ClientSession(connector=connector, cookies=cookies,
+                                                     headers=self._headers)
+
+            return self._client
+
+        async def _request(self, method, url, **kwargs):
+            """
+            Executes a query when the rate of its endpoint family allows it. GET is retried after
+            a backoff while the server is throttling and on connection errors, POST only as
+            _check_reply allows.
+            :returns: The reply, None if failed or forbidden.
+            :rtype: AsyncShowroomAPI.Response
+            """
+            result = None
+            if self.breaker.allow():
+                connect, read = self._get_timeout(url)
+                timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+                attempt = 0
+                delay = 0
+                while delay is not None and attempt < self.configuration.connection.retries:
+                    await asyncio.sleep(delay + self._throttle(url))
+                    attempt += 1
+
+                    try:
+                        async with self._get_client().request(method, self._get_url(url),
+                                                              timeout=timeout,
+                                                              **kwargs) as resp:
+                            result = AsyncShowroomAPI.Response(resp.status, await resp.text(),
+                                                               resp.headers)
+                        delay = self._check_reply(result.status_code,
+                                                  result.headers.get("Retry-After"), attempt,
+                                                  method == "GET")
+                    except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as err:
+                        log_error(err)
+                        delay = self._backoff(attempt) if method == "GET" else None
+
+                if result is not None and result.status_code == 403 and method == "POST":
+                    result = None
+
+            return result
+
+        async def get(self, url, **kwargs):
+            """
+            Executes a GET query. Read-only endpoints are answered from the cache, and identical
+            queries awaited at the same time share a single request.
+            """
+            key = self._get_key(url, kwargs)
+            result = self._get_cached(key)
+            if result is None:
+                if key is None:
+                    result = await self._get_async(url, key, **kwargs)
+                else:
+                    result = await self.single_flight.do_async(key, self._get_async, url, key,
+                                                               **kwargs)
+
+            return result
+
+        async def _get_async(self, url, key, **kwargs):
+            """Executes a GET query against the server."""
+            result = await self._request("GET", url, **kwargs)
+            self._put_cached(key, result)
+            return result
+
+        async def post(self, url, **kwargs):
+            """Executes a POST query."""
+            return await self._request("POST", url, **kwargs)
+
+        async def close(self):
+            """Closes the pooled connections."""
+            if self._client is not None:
+                await self._client.close()
+                self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_args):
+        await self.close()
+
+    async def close(self):
+        """Closes the pooled connections."""
+        await self.connections_manager.close()
+
+    async def _get_json(self, query, *args):
+        """
+        Awaits a query and decodes its reply.
+        :param query: One of the _query_* methods.
+        :type query: function
+        :returns: The JSON reply, None if failed.
+        :rtype: dictionary
+        """
+        respjson = None
+        try:
+            resp = await query(*args)
+            if resp is not None:
+                respjson = resp.json()
+        except Exception as err:
+            log_error(err)
+
+        return respjson
+
+    async def get_current_user(self, room):
+        """Coroutine of ShowroomAPI.get_current_user."""
+        respjson = await self._get_json(self._query_current_user, room)
+        if respjson is not None and (respjson.get('user_id') == 0 or
+                                     respjson.get('errors') is not None):
+            respjson = None
+
+        return respjson
+
+    async def get_onlive_num(self):
+        """Coroutine of ShowroomAPI.get_onlive_num."""
+        respjson = await self._get_json(self._query_onlive_num)
+        return respjson.get('num') if respjson is not None else -1
+
+    async def get_onlives(self):
+        """Coroutine of ShowroomAPI.get_onlives."""
+        return await self._get_json(self._query_onlives)
+
+    async def get_summary_ranking(self, room):
+        """Coroutine of ShowroomAPI.get_summary_ranking."""
+        return await self._get_json(self._query_summary_ranking, room)
+
+    async def get_stage_user_list(self, room):
+        """Coroutine of ShowroomAPI.get_stage_user_list."""
+        return await self._get_json(self._query_stage_user_list, room)
+
+    async def get_stage_user_list_anteroom(self, room):
+        """Coroutine of ShowroomAPI.get_stage_user_list_anteroom."""
+        return await self._get_json(self._query_stage_user_list_anteroom, room)
+
+    async def get_stage_gift_list(self, room):
+        """Coroutine of ShowroomAPI.get_stage_gift_list."""
+        return await self._get_json(self._query_stage_gift_list, room)
+
+    async def get_gift_list(self, room):
+        """Coroutine of ShowroomAPI.get_gift_list."""
+        return await self._get_json(self._query_gift_list, room)
+
+    async def get_setings(self, room):
+        """Coroutine of ShowroomAPI.get_setings."""
+        return await self._get_json(self._query_settings, room)
+
+    async def get_telop(self, room):
+        """Coroutine of ShowroomAPI.get_telop."""
+        respjson = await self._get_json(self._query_telop, room)
+        return respjson.get('telop') if respjson is not None else ''
+
+    async def get_event_and_support(self, room):
+        """Coroutine of ShowroomAPI.get_event_and_support."""
+        return await self._get_json(self._query_event_and_support, room)
+
+    async def get_gift_log(self, room):
+        """Coroutine of ShowroomAPI.get_gift_log."""
+        return await self._get_json(self._query_gift_log, room)
+
+    async def get_questionnaire_result(self, room):
+        """Coroutine of ShowroomAPI.get_questionnaire_result."""
+        return await self._get_json(self._query_questionnaire_result, room)
+
+    async def get_comment_log(self, room):
+        """Coroutine of ShowroomAPI.get_comment_log."""
+        return await self._get_json(self._query_comment_log, room)
+
+    async def get_room_profile(self, room):
+        """Coroutine of ShowroomAPI.get_room_profile."""
+        return await self._get_json(self._query_room_profile, room)
+
+    async def get_next_live(self, room_id):
+        """Coroutine of ShowroomAPI.get_next_live."""
+        result = None
+        respjson = await self._get_json(self._query_next_live, room_id)
+        if respjson is not None and respjson.get('epoch') is not None:
+            result = datetime.datetime.fromtimestamp(respjson['epoch'])
+
+        return result
+
+    async def is_online(self, room_id):
+        """Coroutine of ShowroomAPI.is_online."""
+        return bool(await self._check_online(room_id))
+
+    async def _check_online(self, room_id):
+        """Coroutine of ShowroomAPI._check_online."""
+        return self._is_online_from_is_live(await self._get_json(self._query_is_online, room_id))
+
+    async def _query_online_live_info(self, room):
+        """Coroutine of ShowroomAPI._query_online_live_info."""
+        respjson = None
+        online = None
+        resp = await self._query_live_data(room)
+        if resp is not None:
+            respjson = resp.json()
+            online = self._is_online_from_live_info(respjson)
+            if online is None:
+                online = await self._check_online(room.room_id)
+
+        return respjson, online
+
+    async def get_live(self, room, lives_manager):
+        """Coroutine of ShowroomAPI.get_live."""
+        result = None
+        try:
+            respjson, online = await self._query_online_live_info(room)
+            result = self._update_live(room, lives_manager, respjson, online)
+        except Exception as err:
+            log_error(err)
+
+        return result
+
+    async def get_live_data(self, room, lives_manager):
+        """Coroutine of ShowroomAPI.get_live_data."""
+        result = None
+        try:
+            respjson, online = await self._query_online_live_info(room)
+            result = self._update_live_data(room, lives_manager, respjson, online)
+        except Exception as err:
+            log_error(err)
+
+        return result
@@ -0,0 +1,86 @@
+"""Line framing for SHOWROOM connection."""
+
+class BroadcastFramer(object):
+    """
+    Splits the broadcast stream in lines.
+    Data is received straight into a preallocated buffer and lines are decoded from memoryview
+    slices, the pending tail is only moved when the end of the buffer is reached.
+    """
+    _DEFAULT_SIZE = 64 * 1024
+
+    def __init__(self, size=_DEFAULT_SIZE):
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+    def _reserve(self):
+        """Make room after the pending data, compacting or growing the buffer when full."""
+        if self._end == len(self._buffer):
+            pending = self._end - self._start
+            if self._start > 0:
+                # Regions may overlap, copy the (partial line) tail first
+                self._buffer[:pending] = bytes(self._view[self._start:self._end])
+            else:
+                # A single line doesn't fit, grow the buffer
+                self._view.release()
+                self._buffer.extend(bytes(len(self._buffer)))
+                self._view = memoryview(self._buffer)
+
+            self._start = 0
+            self._end = pending
+
+    def pending(self):
+        """
+        Amount of received bytes not yet returned as a line.
+        :returns: Bytes waiting for the end of line.
+        :rtype: int
+        """
+        return self._end - self._start
+
+    def receive(self, connection):
+        """
+        Receive data from connection into the buffer.
+        :param connection: Socket to read from.
+        :type connection: socket.socket
+        :returns: Amount of bytes received, 0 if the connection was closed.
+        :rtype: int
+        """
+        self._reserve()
+        received = connection.recv_into(self._view[self._end:])
+        self._end += received
+        return received
+
+    def feed(self, data):
+        """
+        Add already received data to the buffer.
+        :param data: Received data.
+        :type data: bytes
+        """
+        data = memoryview(data)
+        while data:
+            self._reserve()
+            size = min(len(data), len(self._buffer) - self._end)
+            self._view[self._end:self._end + size] = data[:size]
+            self._end += size
+            data = data[size:]
+
+    def lines(self):
+        """
+        Yields every complete line in the buffer, empty lines are skipped.
+        :returns: Decoded lines without the end of line.
+        :rtype: string[]
+        """
+        buffer = self._buffer
+        start = self._start
+        index = buffer.find(b"\n", start, self._end)
+        while index > -1:
+            self._start = index + 1
+            if index > start:
+                yield str(self._view[start:index], "utf-8", "replace")
+
+            start = self._start
+            index = buffer.find(b"\n", start, self._end)
+
+        if self._start == self._end:
+            self._start = self._end = 0
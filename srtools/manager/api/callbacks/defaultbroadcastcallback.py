@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 import json
 import codecs
+import re
 import sys
 import time
 from datetime import datetime
+from srtools.utils.capturefile import CaptureWriter
 from srtools.utils.errorprint import print_error
 
 import srtools.manager.api.message
@@ -35,15 +37,110 @@ class DefaultBroadcastCallback(object):
     _MESSAGE_ENTER_OWNER = 302 # No example
     _MESSAGE_LEAVE_OWNER = 303 # No example
 
+    # Handler name and arguments extractor for each message type
+    _MESSAGE_HANDLERS = {
+        _MESSAGE_FETCH_AVATAR: ('_fetch_avatar', lambda resp: ()),
+        _MESSAGE_END_LIVE: ('_end_live', lambda resp: (resp.get('a'),)),
+        _MESSAGE_RELOAD_VIDEO: ('_reload_video', lambda resp: (resp.get('created_at'),)),
+        _MESSAGE_START_LIVE: ('_start_live', lambda resp: ("",)),
+        _MESSAGE_START_VOTE: ('_start_vote', lambda resp: (resp.get('l'), resp.get('i'),
+                                                            resp.get('n'))),
+        _MESSAGE_ENDVOTE: ('_end_vote', lambda resp: (resp.get('l'), resp.get('i'),
+                                                       resp.get('v'))),
+        _MESSAGE_CHANGE_SUPPORT_GAUGE: ('_change_support_gauge',
+                                        lambda resp: (resp.get('p'), resp.get('c'))),
+        _MESSAGE_SET_TWITTER_ICON: ('_set_twitter_icon', lambda resp: (resp.get('u'),)),
+        _MESSAGE_ADD_GIFT_LOG: ('_add_gift_log', lambda resp: (resp.get('av'), resp.get('ac'),
+                                                               resp.get('g'), resp.get('n'))),
+        _MESSAGE_START_PERFORMANCE_TIME: ('_start_performance_time',
+                                          lambda resp: (resp.get('pid'), resp.get('pt'),
+                                                        resp.get('sat'), resp.get('btbpc'),
+                                                        resp.get('created_at'))),
+        _MESSAGE_START_BRAVO_TIME: ('_start_bravo_time', lambda resp: ()),
+        _MESSAGE_FINISH_BRAVO_TIME: ('_finish_bravo_time', lambda resp: ()),
+        _MESSAGE_RESULT_BRAVO_TIME: ('_result_bravo_time',
+                                     lambda resp: (resp.get('pid'), resp.get('uu'),
+                                                   resp.get('tp'), resp.get('created_at'))),
+        _MESSAGE_SPEAK_BRADARU: ('_speak_bradaru',
+                                 lambda resp: (resp.get('id'), resp.get('created_at'))),
+        # These are intended for anyone but the current user
+        _MESSAGE_VIEW_COMMENT: ('_view_comment',
+                                lambda resp: (resp.get('cm'), resp.get('ac'), resp.get('u'),
+                                              resp.get('av'), resp.get('lon'), resp.get('lat'),
+                                              resp.get('rad'))),
+        _MESSAGE_THROW_GIFTS: ('_throw_gifts',
+                               lambda resp: (resp.get('u'), resp.get('av'), resp.get('g'),
+                                             resp.get('n'), resp.get('ac'), resp.get('h'),
+                                             resp.get('lon'), resp.get('lat'), resp.get('rad'))),
+        # "created_at":1499114910
+        # "api":"https://www.showroom-live.com/live/telop?live_id=2035327
+        _MESSAGE_SET_TELOP: ('_set_telop', lambda resp: (resp.get('telop'),)),
+        _MESSAGE_HIDE_TELOP: ('_hide_telop', lambda resp: ()),
+        _MESSAGE_VIEW_COMMENT_OLD: ('_old_view_comment',
+                                    lambda resp: (resp.get('cm'), resp.get('ac'), resp.get('u'),
+                                                  resp.get('av'))),
+        _MESSAGE_ENTER_OWNER: ('_enter_owner', lambda resp: ()),
+        _MESSAGE_LEAVE_OWNER: ('_leave_owner', lambda resp: ()),
+        _UNKNOWNMESSAGE_VOTE_REFRESH: ('_unknown_vote_refresh',
+                                       lambda resp: (resp.get('created_at'),)),
+    }
+    _MESSAGE_TYPE_KEY = '"t":'
+    _MESSAGE_TYPE_PATTERN = re.compile(r'[{,]\s*"t":\s*"?(\d+)"?\s*[,}]')
+    _EMPTY_MESSAGE = {}
+    # Message types whose payload _preprocess_message reads, None for all of them. The rest are
+    # preprocessed with an empty payload, so they skip the decode unless their handler needs it
+    _PREPROCESSED_MESSAGES = None
+
     def __init__(self, configuration, room):
         self.configuration = configuration
         self._file = None
+        self._capture = None
         self._alias = "default"
         self._room = room
         self._empty_message_counter = 0
         self._empty_message_limit = 50
+        self._preprocess_overridden = self._is_overridden('_preprocess_message')
+        self._preprocessed = self._PREPROCESSED_MESSAGES if self._preprocess_overridden \
+                             else frozenset()
+        self._handlers = self._compile_handlers()
         codecs.register_error("customreplace", self._custom_conversion_handler)
 
+    def _is_overridden(self, name):
+        """
+        Whether a subclass replaced the given method.
+        :param name: Method name.
+        :type name: string
+        :returns: True if the method is not the one in DefaultBroadcastCallback.
+        :rtype: bool
+        """
+        return getattr(type(self), name) is not getattr(DefaultBroadcastCallback, name)
+
+    def _compile_handlers(self):
+        """
+        Build the dispatch table for this instance.
+        :returns: Dictionary of message type to (bound handler, arguments extractor, whether the
+                  payload must be decoded).
+        :rtype: dictionary
+        """
+        return dict((value, (getattr(self, name), arguments, self._is_overridden(name)))
+                    for value, (name, arguments) in self._MESSAGE_HANDLERS.items())
+
+    def _peek_message_type(self, data):
+        """
+        Read the message type without decoding the whole payload.
+        :param data: JSON payload of a MSG message.
+        :type data: string
+        :returns: The message type, None if it cannot be found unambiguously.
+        :rtype: int
+        """
+        result = None
+        if data.count(self._MESSAGE_TYPE_KEY) == 1:
+            match = self._MESSAGE_TYPE_PATTERN.search(data)
+            if match is not None:
+                result = int(match.group(1))
+
+        return result
+
     # TODO: Mover esto a showroombroadcast.py, aqui no se usa
     def _custom_conversion_handler(self, ex):
         """
@@ -68,16 +165,15 @@ class DefaultBroadcastCallback(object):
         :returns: Array with parsed data.
         :rtype: string[]
         """
+        code = key = data = ""
         try:
-            code = key = data = ""
-
-            count = message.count("\t")
-            if count == 2:
-                code, key, data = message.split("\t")
-            elif count == 1:
-                code, data = message.split("\t")
+            fields = message.split("\t", 2)
+            if len(fields) == 3:
+                code, key, data = fields
+            elif len(fields) == 2:
+                code, data = fields
             else:
-                code = message.split("\t")
+                code = fields[0]
 
         except Exception as err:
             print_error(err)
@@ -399,20 +495,44 @@ class DefaultBroadcastCallback(object):
         """
         return True
 
+    def _capture_header(self):
+        """
+        Information stored at the beginning of binary captures.
+        :returns: Room and live information.
+        :rtype: dictionary
+        """
+        header = {"alias": self._alias}
+        if self._room is not None:
+            header["room_id"] = self._room.room_id
+            header["room_url_key"] = self._room.room_url_key
+            if self._room.live is not None:
+                header["live_id"] = self._room.live.live_id
+
+        return header
+
     def initialize(self):
         """Initialize the object."""
         self._file = None
+        self._capture = None
         if self.configuration.capture.output:
             if self.configuration.capture.output.upper() in ['STDOUT', '-']:
                 self._file = sys.stdout
             elif self.configuration.capture.output.upper() == 'STDERR':
                 self._file = sys.stderr
+            elif self.configuration.capture.format == 'binary':
+                self._capture = CaptureWriter(self.configuration.capture.output,
+                                              self._capture_header(),
+                                              self.configuration.capture.compression,
+                                              self.configuration.capture.flush_interval)
             else:
                 self._file = open(self.configuration.capture.output, 'a+')
 
     def terminate(self):
         """Terminate the object."""
-        if self.configuration.capture.output is not None:
+        if self._capture is not None:
+            self._capture.close()
+            self._capture = None
+        elif self._file is not None and self._file not in [sys.stdout, sys.stderr]:
             self._file.close()
 
     def alias(self):
@@ -426,22 +546,28 @@ class DefaultBroadcastCallback(object):
         :type message: string
         """
         self._empty_message_counter = 0
-        if self._file:
+        if self._capture is not None:
+            self._capture.write(message)
+        elif self._file:
             self._file.write(str(datetime.now()) + "\t" + message + "\n")
 
-    def empty_message(self):
+    def empty_message(self, wait=True):
         """
         Empty message notification.
+        :param wait: Whether to sleep before retrying. Asynchronous callers wait on their own.
+        :type wait: bool
         :returns: True if communication should still be tried, False otherwise.
         :rtype: bool
         """
         #TODO: Should try to reconnect instead of dropping connection
         cont = True
         self._empty_message_counter += 1
+        if self._capture is not None:
+            self._capture.flush(False)
         if self._empty_message_counter > self._empty_message_limit:
             cont = False
             self.new_message("No communication with server, aborting.")
-        else:
+        elif wait:
             time.sleep(1)
 
         return cont
@@ -456,73 +582,33 @@ class DefaultBroadcastCallback(object):
         """
         cont = True
         try:
-            #message = message.decode("utf-8", "customreplace")
-
             code, _key, data = self._parse_message(message)
             if code == srtools.manager.api.message.MESSAGE_HEADER_MSG:
-                resp = json.loads(data)
-                value = int(resp['t'])
-
-                self._preprocess_message(message, code, _key, value, resp)
-
-                if value == self._MESSAGE_FETCH_AVATAR:
-                    cont = self._fetch_avatar()
-                elif value == self._MESSAGE_END_LIVE:
-                    cont = self._end_live(resp.get('a'))
-                elif value == self._MESSAGE_RELOAD_VIDEO:
-                    cont = self._reload_video(resp.get('created_at'))
-                elif value == self._MESSAGE_START_LIVE:
-                    cont = self._start_live("")
-                elif value == self._MESSAGE_START_VOTE:
-                    cont = self._start_vote(resp.get('l'), resp.get('i'), resp.get('n'))
-                elif value == self._MESSAGE_ENDVOTE:
-                    cont = self._end_vote(resp.get('l'), resp.get('i'), resp.get('v'))
-                elif value == self._MESSAGE_CHANGE_SUPPORT_GAUGE:
-                    cont = self._change_support_gauge(resp.get('p'), resp.get('c'))
-                elif value == self._MESSAGE_SET_TWITTER_ICON:
-                    cont = self._set_twitter_icon(resp.get('u'))
-                elif value == self._MESSAGE_ADD_GIFT_LOG:
-                    cont = self._add_gift_log(resp.get('av'), resp.get('ac'), resp.get('g'),
-                                              resp.get('n'))
-                elif value == self._MESSAGE_START_PERFORMANCE_TIME:
-                    cont = self._start_performance_time(resp.get('pid'), resp.get('pt'),
-                                                        resp.get('sat'), resp.get('btbpc'),
-                                                        resp.get('created_at'))
-                elif value == self._MESSAGE_START_BRAVO_TIME:
-                    cont = self._start_bravo_time()
-                elif value == self._MESSAGE_FINISH_BRAVO_TIME:
-                    cont = self._finish_bravo_time()
-                elif value == self._MESSAGE_RESULT_BRAVO_TIME:
-                    cont = self._result_bravo_time(resp.get('pid'), resp.get('uu'), resp.get('tp'),
-                                                   resp.get('created_at'))
-                elif value == self._MESSAGE_SPEAK_BRADARU:
-                    cont = self._speak_bradaru(resp.get('id'), resp.get('created_at'))
-                # These are intended for anyone but the current user
-                elif value == self._MESSAGE_VIEW_COMMENT:
-                    cont = self._view_comment(resp.get('cm'), resp.get('ac'), resp.get('u'),
-                                              resp.get('av'), resp.get('lon'), resp.get('lat'),
-                                              resp.get('rad'))
-                elif value == self._MESSAGE_THROW_GIFTS:
-                    cont = self._throw_gifts(resp.get('u'), resp.get('av'), resp.get('g'),
-                                             resp.get('n'), resp.get('ac'), resp.get('h'),
-                                             resp.get('lon'), resp.get('lat'), resp.get('rad'))
-                elif value == self._MESSAGE_SET_TELOP:
-                    # "created_at":1499114910
-                    # "api":"https://www.showroom-live.com/live/telop?live_id=2035327
-                    cont = self._set_telop(resp.get('telop'))
-                elif value == self._MESSAGE_HIDE_TELOP:
-                    cont = self._hide_telop()
-                elif value == self._MESSAGE_VIEW_COMMENT_OLD:
-                    cont = self._old_view_comment(resp.get('cm'), resp.get('ac'), resp.get('u'),
-                                                  resp.get('av'))
-                elif value == self._MESSAGE_ENTER_OWNER:
-                    cont = self._enter_owner()
-                elif value == self._MESSAGE_LEAVE_OWNER:
-                    cont = self._leave_owner()
-                elif value == self._UNKNOWNMESSAGE_VOTE_REFRESH:
-                    cont = self._unknown_vote_refresh(resp.get('created_at'))
+                resp = None
+                value = None
+                if self._preprocessed is not None:
+                    value = self._peek_message_type(data)
+
+                if value is None:
+                    resp = json.loads(data)
+                    value = int(resp['t'])
+
+                if self._preprocess_overridden:
+                    if resp is None and value in self._preprocessed:
+                        resp = json.loads(data)
+
+                    self._preprocess_message(message, code, _key, value,
+                                             resp if resp is not None else self._EMPTY_MESSAGE)
+
+                handler = self._handlers.get(value)
+                if handler is None:
+                    cont = self._unknown_message(resp if resp is not None else json.loads(data))
                 else:
-                    cont = self._unknown_message(resp)
+                    function, arguments, decode = handler
+                    if decode and resp is None:
+                        resp = json.loads(data)
+
+                    cont = function(*arguments(resp if resp is not None else self._EMPTY_MESSAGE))
             elif code == srtools.manager.api.message.MESSAGE_HEADER_ACK:
                 cont = self._ack_received(data)
             elif code == srtools.manager.api.message.MESSAGE_HEADER_ERR:
@@ -8,6 +8,13 @@ from srtools.utils.errorprint import print_error
 
 class WatchBroadcastCallback(DefaultBroadcastCallback):
     """ANSI colored output."""
+    # Only the messages sent by a user are highlighted
+    _PREPROCESSED_MESSAGES = frozenset([DefaultBroadcastCallback._MESSAGE_VIEW_COMMENT,
+                                        DefaultBroadcastCallback._MESSAGE_THROW_GIFTS,
+                                        DefaultBroadcastCallback._MESSAGE_SET_TWITTER_ICON,
+                                        DefaultBroadcastCallback._MESSAGE_ADD_GIFT_LOG,
+                                        DefaultBroadcastCallback._MESSAGE_VIEW_COMMENT_OLD])
+
     def __init__(self, configuration, room):
         super(WatchBroadcastCallback, self).__init__(configuration, room)
 
@@ -11,9 +11,18 @@ from parse import parse
 
 from srtools.manager.api.showroomwebservice import _ShowroomWebService
 from srtools.utils.loggingutils import log_error
+from srtools.utils.sharedsnapshot import SharedSnapshot
 
 class ShowroomAPI(_ShowroomWebService):
     """Showroom API implementation."""
+    def __init__(self, configuration, session=None):
+        super(ShowroomAPI, self).__init__(configuration, session)
+        # Online rooms shared by the processes of the host, None to always fetch them
+        self.onlives_snapshot = None
+        if configuration.connection.snapshot:
+            self.onlives_snapshot = SharedSnapshot(configuration.connection.snapshot,
+                                                   configuration.connection.snapshot_ttl)
+
     def query_csrf_token(self):
         """
         :returns: The current valid CSRF token.
@@ -116,7 +125,26 @@ class ShowroomAPI(_ShowroomWebService):
 
     def get_onlives(self):
         """
-        Gets all the online rooms.
+        Gets all the online rooms, from the shared snapshot if configured.
+        :returns: JSON with the onlives. None if failed.
+        :rtype: string
+        """
+        if self.onlives_snapshot is not None:
+            result = self.onlives_snapshot.get(self._get_onlives)
+        else:
+            result = self._get_onlives()
+
+        return result
+
+    def invalidate_onlives(self):
+        """Makes the next get_onlives fetch the online rooms again."""
+        self.connections_manager.invalidate(self.API_ONLIVES)
+        if self.onlives_snapshot is not None:
+            self.onlives_snapshot.expire()
+
+    def _get_onlives(self):
+        """
+        Fetches all the online rooms.
         :returns: JSON with the onlives. None if failed.
         :rtype: string
         """
@@ -130,6 +158,22 @@ class ShowroomAPI(_ShowroomWebService):
 
         return respjson
 
+    def get_timetable(self):
+        """
+        Gets the scheduled broadcasts.
+        :returns: JSON with the time tables. None if failed.
+        :rtype: string
+        """
+        respjson = None
+        try:
+            resp = self._query_timetable()
+            if resp is not None:
+                respjson = resp.json()
+        except Exception as err:
+            log_error(err)
+
+        return respjson
+
     def get_summary_ranking(self, room):
         """
         Gets the historical top 30.
@@ -418,17 +462,25 @@ class ShowroomAPI(_ShowroomWebService):
         :returns: True if it's online, False otherwise.
         :rtype: bool
         """
-        result = False
+        return bool(self._check_online(room_id))
+
+    def _check_online(self, room_id):
+        """
+        Checks if the given room is online, telling failed queries apart.
+        :param room_id: The room id to query.
+        :type room_id: int
+        :returns: True if it's online, False if it's offline, None if failed.
+        :rtype: bool
+        """
+        respjson = None
         try:
             resp = self._query_is_online(room_id)
             if resp is not None:
                 respjson = resp.json()
-                result = (respjson.get('ok') == 1)
-                #result = (respjson.get('live_status') == 2)
         except Exception as err:
             log_error(err)
 
-        return result
+        return self._is_online_from_is_live(respjson)
 
     def login(self, username, password):
         """Login."""
@@ -450,6 +502,25 @@ class ShowroomAPI(_ShowroomWebService):
 
         return result
 
+    def _query_online_live_info(self, room):
+        """
+        Queries live_info, using is_live only if the reply doesn't tell whether the room is online.
+        :param room: The room to query.
+        :type room: Room
+        :returns: Tuple (live_info JSON, True if online, False if offline, None if failed).
+        :rtype: tuple
+        """
+        respjson = None
+        online = None
+        resp = self._query_live_data(room)
+        if resp is not None:
+            respjson = resp.json()
+            online = self._is_online_from_live_info(respjson)
+            if online is None:
+                online = self._check_online(room.room_id)
+
+        return respjson, online
+
     def get_live(self, room, lives_manager):
         """
         Returns broadcast id from given room.
@@ -462,15 +533,8 @@ class ShowroomAPI(_ShowroomWebService):
         """
         result = None
         try:
-            if self.is_online(room.room_id):
-                data = self._query_live_data(room).json()
-                live_id = int(data['live_id'])
-                result = lives_manager.find(live_id)
-
-                if result is None:
-                    result = lives_manager.create(live_id)
-
-            room.live = result
+            respjson, online = self._query_online_live_info(room)
+            result = self._update_live(room, lives_manager, respjson, online)
         except Exception as err:
             log_error(err)
 
@@ -488,19 +552,8 @@ class ShowroomAPI(_ShowroomWebService):
         """
         result = None
         try:
-            respjson = None
-
-            if self.is_online(room.room_id):
-                resp = self._query_live_data(room)
-                if resp is not None:
-                    respjson = resp.json()
-                    live_id = int(respjson['live_id'])
-                    result = lives_manager.find(live_id)
-
-                    if result is None:
-                        result = lives_manager.create(live_id)
-
-                    lives_manager.refresh(result, respjson)
+            respjson, online = self._query_online_live_info(room)
+            result = self._update_live_data(room, lives_manager, respjson, online)
         except Exception as err:
             log_error(err)
 
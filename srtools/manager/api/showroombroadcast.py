@@ -2,12 +2,13 @@
 import socket
 import threading
 import srtools.manager.api.message
+from srtools.manager.api.broadcastframer import BroadcastFramer
 from srtools.manager.api.callbacks.defaultbroadcastcallback import DefaultBroadcastCallback
 from srtools.utils.errorprint import print_error
 
 class ShowroomBroadcast(object):
     """Handles live communication with SHOWROOM."""
-    _RECV_BUFFER_SIZE = 4096
+    _RECV_BUFFER_SIZE = 64 * 1024
     _PING_TIMEOUT = 60
 
     # Message format
@@ -15,7 +16,7 @@ class ShowroomBroadcast(object):
     _LOWLEVEL_QUIT = srtools.manager.api.message.MESSAGE_HEADER_QUIT + "\n"
     _LOWLEVEL_PING = srtools.manager.api.message.MESSAGE_HEADER_PING + "\tshowroom\n"
 
-    _remaining_data = bytearray()
+    _framer = None
     _room = None
     _user = None
     _ping_task = None
@@ -28,6 +29,7 @@ class ShowroomBroadcast(object):
         self._user = user
         self._ping_task = threading.Timer(self._PING_TIMEOUT, self._do_ping)
         self._connected_socket = None
+        self._framer = BroadcastFramer(self._RECV_BUFFER_SIZE)
 
     def _send_message(self, message):
         """
@@ -76,52 +78,10 @@ class ShowroomBroadcast(object):
         :returns: List of full messages to process.
         :rtype: string[]
         """
+        message_list = []
         try:
-            message_list = []
-            received_data = self._connected_socket.recv(self._RECV_BUFFER_SIZE)
-            if received_data:
-                temp_received = self._remaining_data;
-                temp_received.extend(received_data)
-                received_data = temp_received
-                if received_data.find(b"\n") > -1:
-                    index = received_data.rfind(b"\n") + 1
-                    result = received_data[:index]
-
-                    self._remaining_data = received_data[index:]
-
-                    #result = result.replace("\xe9", "e")
-                    result = result.decode("utf-8", "replace")
-                    message_list = filter(None, result.split("\n"))
-                else:
-                    self._remaining_data = received_data
-                    message_list = []
-
-        except Exception as err:
-            print_error(err)
-
-        return message_list
-
-    def _receive_old(self):
-        """
-        Receive information from connection.
-        :returns: List of full messages to process.
-        :rtype: string[]
-        """
-        try:
-            received_data = self._connected_socket.recv(self._RECV_BUFFER_SIZE)
-            if received_data:
-                received_data = received_data.decode("utf-8")
-
-            received_data = self._remaining_data + received_data
-            if received_data.find("\n") > -1:
-                index = received_data.rfind("\n") + 1
-                result = received_data[:index]
-
-                self._remaining_data = received_data[index:]
-                message_list = filter(None, result.split("\n"))
-            else:
-                self._remaining_data = received_data
-                message_list = []
+            if self._framer.receive(self._connected_socket):
+                message_list = list(self._framer.lines())
         except Exception as err:
             print_error(err)
 
@@ -142,17 +102,19 @@ class ShowroomBroadcast(object):
         self._ping_task.start()
 
         callback.initialize()
-        while continue_processing:
-            message_list = self._receive()
-
-            if message_list:
-                for message in message_list:
-                    callback.new_message(message)
-                    continue_processing = callback.process_message(message)
-            else:
-                continue_processing = callback.empty_message()
+        try:
+            while continue_processing:
+                message_list = self._receive()
 
+                if message_list:
+                    for message in message_list:
+                        callback.new_message(message)
+                        continue_processing = callback.process_message(message)
+                else:
+                    continue_processing = callback.empty_message()
 
-        self._ping_task.cancel()
-        self._quit()
-        callback.terminate()
+            self._quit()
+        finally:
+            # Also on SIGTERM or Ctrl+C, so the pending messages are written
+            self._ping_task.cancel()
+            callback.terminate()
@@ -0,0 +1,197 @@
+"""Asynchronous routines for SHOWROOM connection."""
+import asyncio
+import threading
+from srtools.manager.api.showroombroadcast import ShowroomBroadcast
+from srtools.utils.errorprint import print_error
+
+class ShowroomBroadcastEngine(object):
+    """Handles live communication with many SHOWROOM rooms from a single event loop."""
+    _PING_TIMEOUT = ShowroomBroadcast._PING_TIMEOUT
+    _EMPTY_MESSAGE_DELAY = 1
+    _STOP_TIMEOUT = 10
+    _LINE_LIMIT = 1024 * 1024
+
+    def __init__(self, configuration):
+        self._configuration = configuration
+        self._loop = None
+        self._thread = None
+        self._captures = {}
+        self._lock = threading.Lock()
+
+    def _key(self, room):
+        """
+        Key used to identify a capture.
+        :param room: The room being captured.
+        :type room: Room
+        :returns: A key unique per broadcast.
+        :rtype: tuple
+        """
+        return (room.room_id, room.live.live_id if room.live is not None else None)
+
+    def _run_loop(self):
+        """Thread body, runs the event loop until stopped."""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _ping(self, writer):
+        """
+        Send a ping every _PING_TIMEOUT seconds.
+        :param writer: Stream where to send the ping.
+        :type writer: asyncio.StreamWriter
+        """
+        while True:
+            await asyncio.sleep(self._PING_TIMEOUT)
+            writer.write(ShowroomBroadcast._LOWLEVEL_PING.encode('utf8'))
+            await writer.drain()
+
+    async def _communicate(self, room, callback):
+        """
+        Execute the communication loop of a single room.
+        :param room: Room to capture.
+        :type room: Room
+        :param callback: Already initialized callback to call for each received message.
+        :type callback: DefaultBroadcastCallback
+        """
+        writer = None
+        ping_task = None
+        try:
+            reader, writer = await asyncio.open_connection(room.live.broadcast_host,
+                                                           room.live.broadcast_port,
+                                                           limit=self._LINE_LIMIT)
+            writer.write((ShowroomBroadcast._LOWLEVEL_SUBSCRIBE %
+                          room.live.broadcast_key).encode('utf8'))
+            await writer.drain()
+            ping_task = asyncio.ensure_future(self._ping(writer))
+
+            continue_processing = True
+            while continue_processing:
+                line = await reader.readline()
+                if line.endswith(b"\n"):
+                    message = line[:-1].decode("utf-8", "replace")
+                    if message:
+                        callback.new_message(message)
+                        continue_processing = callback.process_message(message)
+                else:
+                    continue_processing = callback.empty_message(False)
+                    if continue_processing:
+                        await asyncio.sleep(self._EMPTY_MESSAGE_DELAY)
+
+        except asyncio.CancelledError:
+            pass
+        except Exception as err:
+            print_error(err)
+        finally:
+            if ping_task is not None:
+                ping_task.cancel()
+
+            if writer is not None:
+                try:
+                    writer.write(ShowroomBroadcast._LOWLEVEL_QUIT.encode('utf8'))
+                    writer.close()
+                except Exception as err:
+                    print_error(err)
+
+            callback.terminate()
+
+    async def _shutdown(self):
+        """Cancel every running capture and wait for them to finish."""
+        tasks = [x for x in asyncio.all_tasks() if x is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self):
+        """Start the event loop in a background thread, if not already running."""
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name="broadcast-engine")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop every capture and the event loop."""
+        if self._thread is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop) \
+                       .result(self._STOP_TIMEOUT)
+            except Exception as err:
+                print_error(err)
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(self._STOP_TIMEOUT)
+            self._thread = None
+            self._loop = None
+            with self._lock:
+                self._captures = {}
+
+    def contains(self, room):
+        """
+        Whether the given room is being captured.
+        :param room: Room to check.
+        :type room: Room
+        :returns: True if its current live is being captured, False otherwise.
+        :rtype: bool
+        """
+        with self._lock:
+            return self._key(room) in self._captures
+
+    def add(self, room, callback):
+        """
+        Start capturing the given room.
+        The callback is initialized in the calling thread so it picks the current configuration.
+        :param room: Room to capture.
+        :type room: Room
+        :param callback: Callback to call for each received message.
+        :type callback: DefaultBroadcastCallback
+        :returns: True if the capture was added, False if it was already running.
+        :rtype: bool
+        """
+        result = False
+        key = self._key(room)
+        self.start()
+
+        with self._lock:
+            if key not in self._captures:
+                callback.initialize()
+                future = asyncio.run_coroutine_threadsafe(self._communicate(room, callback),
+                                                          self._loop)
+                self._captures[key] = future
+                future.add_done_callback(lambda _, key=key: self._remove(key))
+                result = True
+
+        return result
+
+    def _remove(self, key):
+        """
+        Forget a finished capture.
+        :param key: Key of the capture.
+        :type key: tuple
+        """
+        with self._lock:
+            self._captures.pop(key, None)
+
+    def active(self):
+        """
+        Amount of running captures.
+        :returns: Number of rooms being captured.
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._captures)
+
+    def wait(self):
+        """Block until every running capture ends."""
+        while True:
+            with self._lock:
+                futures = list(self._captures.values())
+
+            if not futures:
+                break
+
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as err:
+                    print_error(err)
@@ -1,11 +1,20 @@
 """Connections Manager."""
+import os
+import socket
 import time
+import weakref
 from collections import OrderedDict
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError
+from urllib3.connection import HTTPConnection
 import browsercookie
 
 from srtools.utils.loggingutils import log_error
+from srtools.utils.ratelimit import CircuitBreaker, TokenBucket, backoff_delay, parse_retry_after
+from srtools.utils.responsecache import ResponseCache
+from srtools.utils.singleflight import SingleFlight
 
 # Hack to be able to use request against showroom-live.com
 # code taken from https://stackoverflow.com/questions/38015537/python-requests-exceptions-sslerror-dh-key-too-small
@@ -16,10 +25,42 @@ except AttributeError:
     # no pyopenssl support used / needed / available
     pass
 
+class _PoolAdapter(HTTPAdapter):
+    """HTTP adapter probing idle pooled connections with TCP keep-alive."""
+    def __init__(self, keep_alive, **kwargs):
+        """
+        :param keep_alive: Idle seconds before probing a connection, 0 to not probe.
+        :type keep_alive: int
+        """
+        self._keep_alive = keep_alive
+        super(_PoolAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        options = list(HTTPConnection.default_socket_options)
+        if self._keep_alive > 0:
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self._keep_alive))
+        kwargs["socket_options"] = options
+        super(_PoolAdapter, self).init_poolmanager(*args, **kwargs)
+
+# Connection managers alive in this process, their pools are replaced in forked children
+_CONNECTIONS_MANAGERS = weakref.WeakSet()
+
+def _reset_connections_after_fork():
+    """Gives forked children their own connections, sharing the parent's would mix replies."""
+    for connections_manager in list(_CONNECTIONS_MANAGERS):
+        connections_manager.reset_connections()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_connections_after_fork)
+
 class _ShowroomWebService(object):
     """Interface to interact with Showroom API."""
     _CSRF_TOKEN = '' # add csrf token of used browser
 
+    SHOWROOM_URL = "https://www.showroom-live.com"
+
     # Web pages
     WEB_USER_PROFILE = "https://www.showroom-live.com/room/user_profile"
     # API
@@ -73,23 +114,86 @@ class _ShowroomWebService(object):
 
     class ConnectionsManager(object):
         """Connections Manager."""
+        # Replies meaning the server is busy, retried after a backoff
+        _RETRY_STATUS = (429, 503)
+
         def __init__(self, configuration, session=None):
             # 0: Amateur, 1: Official
             self.twitter_timeout = [None, None]
-            self.forbidden = False
             self.configuration = configuration
 
-            if session is None:
-                self.session = requests.Session()
-                if self.configuration.connection.cookies == "firefox":
-                    self.session.cookies = browsercookie.firefox()
-                elif self.configuration.connection.cookies == "chrome":
-                    self.session.cookies = browsercookie.chrome()
+            # Built once, the same for every request
+            self._headers = self._get_http_headers()
+            self._proxies = self._get_proxies()
+            connect_timeout = self.configuration.connection.connect_timeout
+            timeout = self.configuration.connection.timeout
+            self._default_timeout = (min(connect_timeout, timeout), timeout)
+            self._timeouts = {path: (min(connect_timeout, x, timeout), min(x, timeout))
+                              for path, x in
+                              self.configuration.connection.endpoint_timeouts.items()}
+            self._cache_ttls = dict(self.configuration.connection.cache_ttls)
+            self.cache = ResponseCache(self.configuration.connection.cache_size)
+            self.single_flight = SingleFlight()
+            self._buckets = {prefix: TokenBucket(rate, burst) for prefix, (rate, burst) in
+                             self.configuration.connection.rate_limits.items()}
+            # Longest prefixes first, so the most specific family applies
+            self._families = sorted(self._buckets, key=len, reverse=True)
+            self._path_buckets = {}
+            self.breaker = CircuitBreaker(self.configuration.connection.breaker_cooldown,
+                                          self.configuration.connection.max_breaker_cooldown)
 
-                #self.session.cookies = browsercookie.chrome()
+            if session is None:
+                self.session = self._create_session()
+                self.reset_connections()
             else:
                 self.session = session
 
+            _CONNECTIONS_MANAGERS.add(self)
+
+        def _load_cookies(self):
+            """
+            Loads the cookies of the configured browser.
+            :returns: The cookies, None if not configured.
+            :rtype: http.cookiejar.CookieJar
+            """
+            result = None
+            if self.configuration.connection.cookies == "firefox":
+                result = browsercookie.firefox()
+            elif self.configuration.connection.cookies == "chrome":
+                result = browsercookie.chrome()
+
+            return result
+
+        def _create_session(self):
+            """
+            Creates the session sending the requests, with the browser cookies.
+            :rtype: requests.Session
+            """
+            session = requests.Session()
+            cookies = self._load_cookies()
+            if cookies is not None:
+                session.cookies = cookies
+
+            return session
+
+        def reset_connections(self):
+            """
+            Replaces the connection pools of the session, keeping its cookies. Forked children
+            call it, so they open their own connections instead of reading from the parent's.
+            """
+            pool_size = self.configuration.connection.pool_size
+            for prefix in ["https://", "http://"]:
+                # Blocking pools make extra threads wait for a connection instead of opening
+                # one that would be closed right after
+                self.session.mount(prefix, _PoolAdapter(self.configuration.connection.keep_alive,
+                                                        pool_connections=2,
+                                                        pool_maxsize=pool_size,
+                                                        pool_block=True))
+
+        def _get_timeout(self, url):
+            """Returns the connect and read timeouts of the queried endpoint."""
+            return self._timeouts.get(urlsplit(url).path, self._default_timeout)
+
         def _get_proxies(self):
             proxies = {
                 #'http': "socks5://127.0.0.1:9050",
@@ -98,6 +202,14 @@ class _ShowroomWebService(object):
 
             return proxies
 
+        def _get_url(self, url):
+            """Returns the url to query, pointing to the configured base url if any."""
+            base_url = self.configuration.connection.base_url
+            if base_url and url.startswith(_ShowroomWebService.SHOWROOM_URL):
+                url = base_url.rstrip("/") + url[len(_ShowroomWebService.SHOWROOM_URL):]
+
+            return url
+
         def _get_http_headers(self):
             """Returns modified headers for HTTP connection."""
             headers = requests.utils.default_headers()
@@ -111,54 +223,159 @@ class _ShowroomWebService(object):
             })
             return headers
 
-        def get(self, url, **kwargs):
-            """Executes a GET query."""
+        def _get_key(self, url, kwargs):
+            """
+            Identifies a GET query, ignoring the "_" cache buster.
+            :param url: Queried url.
+            :type url: string
+            :param kwargs: Query arguments.
+            :type kwargs: dictionary
+            :returns: The key, None if the query has more arguments than its parameters.
+            :rtype: tuple
+            """
             result = None
-            if not self.forbidden:
-                count = 0
-                while count < self.configuration.connection.retries:
-                    count += 1
+            if not set(kwargs) - {"params"}:
+                result = ResponseCache.key(urlsplit(url).path, kwargs.get("params"))
 
-                    try:
-                        #log_trace("HTTP GET", extra='{url: %s, params=%s}' % (url, str(kwargs)))
-                        result = self.session.get(url,
-                                                  timeout=self.configuration.connection.timeout,
-                                                  headers=self._get_http_headers(),
-                                                  proxies=self._get_proxies(), **kwargs)
-                        if result.status_code == 200:
-                            pass
-                        if result.status_code == 403:
-                            self.forbidden = True
-                        if result.status_code == 404:
-                            pass
-                        break
-                    except ConnectionError as err:
-                        log_error(err)
+            return result
+
+        def _get_cached(self, key):
+            """Returns the kept reply of a query, None if there's none or it isn't cached."""
+            result = None
+            if key is not None and self._cache_ttls.get(key[0]):
+                result = self.cache.get(key)
+
+            return result
+
+        def _put_cached(self, key, response):
+            """Keeps a successful reply for the time to live of its endpoint."""
+            if key is not None and self._cache_ttls.get(key[0]) and response is not None and \
+               response.status_code == 200:
+                self.cache.put(key, response, self._cache_ttls[key[0]])
+
+        def invalidate(self, url=None, params=None):
+            """
+            Drops kept replies, so the next query reaches the server.
+            :param url: Endpoint to drop, None for every endpoint.
+            :type url: string
+            :param params: Parameters of the query to drop, None for every query of the endpoint.
+            :type params: dictionary
+            """
+            self.cache.invalidate(urlsplit(url).path if url else None, params)
+
+        def get(self, url, **kwargs):
+            """
+            Executes a GET query. Read-only endpoints are answered from the cache, and identical
+            queries from several threads at the same time share a single request.
+            """
+            key = self._get_key(url, kwargs)
+            result = self._get_cached(key)
+            if result is None:
+                if key is None:
+                    result = self._get(url, key, **kwargs)
+                else:
+                    result = self.single_flight.do(key, self._get, url, key, **kwargs)
+
+            return result
+
+        def _get(self, url, key, **kwargs):
+            """Executes a GET query against the server."""
+            result = self._send(self.session.get, url, True, **kwargs)
+            self._put_cached(key, result)
             return result
 
         def post(self, url, **kwargs):
             """Executes a POST query."""
+            result = self._send(self.session.post, url, False, **kwargs)
+            if result is not None and result.status_code == 403:
+                result = None
+
+            return result
+
+        @property
+        def forbidden(self):
+            """Whether the server forbids the requests, none are sent until the breaker cools down."""
+            return self.breaker.state == CircuitBreaker.State.OPEN
+
+        def _get_bucket(self, url):
+            """Returns the token bucket of the endpoint family of the url, None if not limited."""
+            path = urlsplit(url).path
+            result = self._path_buckets.get(path, False)
+            if result is False:
+                family = next((x for x in self._families if path.startswith(x)), None)
+                result = self._path_buckets[path] = self._buckets.get(family)
+
+            return result
+
+        def _throttle(self, url):
+            """Returns the seconds to wait before sending a request, keeping its family's rate."""
+            bucket = self._get_bucket(url)
+            return bucket.reserve() if bucket is not None else 0
+
+        def _backoff(self, attempt, retry_after=None):
+            """Returns the seconds to wait before retrying a failed request."""
+            return backoff_delay(attempt, self.configuration.connection.backoff,
+                                 self.configuration.connection.max_backoff,
+                                 parse_retry_after(retry_after))
+
+        def _check_reply(self, status_code, retry_after, attempt, idempotent=True):
+            """
+            Feeds a reply to the circuit breaker.
+            :param status_code: HTTP status of the reply.
+            :type status_code: int
+            :param retry_after: Retry-After header of the reply.
+            :type retry_after: string
+            :param attempt: Requests sent so far.
+            :type attempt: int
+            :param idempotent: False if resending could apply the request twice (POST), then it's
+                               only retried when the server refused it with 429 and Retry-After.
+            :type idempotent: bool
+            :returns: Seconds to wait before retrying, None if there's no need to.
+            :rtype: float
+            """
             result = None
-            if not self.forbidden:
-                count = 0
-                while count < self.configuration.connection.retries:
-                    count += 1
+            if status_code == 403:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+                if (idempotent and status_code in self._RETRY_STATUS) or \
+                   (status_code == 429 and retry_after is not None):
+                    result = self._backoff(attempt, retry_after)
+
+            return result
+
+        def _send(self, method, url, idempotent, **kwargs):
+            """
+            Sends a request when the rate of its endpoint family allows it, retrying it after a
+            backoff while the server is throttling.
+            :param method: session.get or session.post.
+            :type method: function
+            :param url: Queried url.
+            :type url: string
+            :param idempotent: Whether it can be resent, see _check_reply. Only idempotent
+                               requests are retried on connection errors.
+            :type idempotent: bool
+            :returns: The last reply, None if failed or forbidden.
+            :rtype: requests.Response
+            """
+            result = None
+            if self.breaker.allow():
+                attempt = 0
+                delay = 0
+                while delay is not None and attempt < self.configuration.connection.retries:
+                    time.sleep(delay + self._throttle(url))
+                    attempt += 1
 
                     try:
-                        result = self.session.post(url,
-                                                   timeout=self.configuration.connection.timeout,
-                                                   headers=self._get_http_headers(),
-                                                   proxies=self._get_proxies(), **kwargs)
-                        if result.status_code == 200:
-                            pass
-                            #result_json = result.json()
-                        if result.status_code == 403:
-                            result = None
-                            self.forbidden = True
-                        break
+                        #log_trace("HTTP", extra='{url: %s, params=%s}' % (url, str(kwargs)))
+                        result = method(self._get_url(url), timeout=self._get_timeout(url),
+                                        headers=self._headers, proxies=self._proxies, **kwargs)
+                        delay = self._check_reply(result.status_code,
+                                                  result.headers.get("Retry-After"), attempt,
+                                                  idempotent)
                     except ConnectionError as err:
                         log_error(err)
-                        break
+                        delay = self._backoff(attempt) if idempotent else None
 
             return result
 
@@ -166,6 +383,97 @@ class _ShowroomWebService(object):
         self.connections_manager = self.ConnectionsManager(configuration, session)
         self.current_csrf_token = self._CSRF_TOKEN
 
+    @staticmethod
+    def _is_online_from_is_live(respjson):
+        """
+        Reads an is_live reply.
+        :param respjson: is_live reply, None if failed.
+        :type respjson: dictionary
+        :returns: True if online, False if offline, None if failed.
+        :rtype: bool
+        """
+        result = None
+        if respjson is not None and not respjson.get('errors'):
+            result = (respjson.get('ok') == 1)
+            #result = (respjson.get('live_status') == 2)
+
+        return result
+
+    @staticmethod
+    def _is_online_from_live_info(respjson):
+        """
+        Infers from a live_info reply whether the room is broadcasting.
+        :param respjson: live_info reply.
+        :type respjson: dictionary
+        :returns: True if online, False if offline, None if the reply doesn't tell.
+        :rtype: bool
+        """
+        result = None
+        if respjson is not None and not respjson.get('errors'):
+            if respjson.get('live_status') is not None:
+                result = (respjson['live_status'] == 2)
+            elif respjson.get('live_id') is not None:
+                result = (int(respjson['live_id']) != 0)
+
+        return result
+
+    @staticmethod
+    def _find_live(lives_manager, respjson):
+        """
+        Finds the live of a live_info reply, creating it if unknown.
+        :rtype: Live
+        """
+        live_id = int(respjson['live_id'])
+        result = lives_manager.find(live_id)
+        if result is None:
+            result = lives_manager.create(live_id)
+
+        return result
+
+    def _update_live(self, room, lives_manager, respjson, online):
+        """
+        Sets the live of a room from a live_info reply, for get_live.
+        :param respjson: live_info reply.
+        :type respjson: dictionary
+        :param online: True if online, False if offline, None if the query failed.
+        :type online: bool
+        :returns: The current live, None if offline or failed.
+        :rtype: Live
+        """
+        result = None
+        if online:
+            result = self._find_live(lives_manager, respjson)
+
+        # A failed query keeps the known live
+        if online is not None:
+            # The previous live of the room has ended
+            if room.live is not None and \
+               (result is None or room.live.live_id != result.live_id):
+                lives_manager.remove(room.live.live_id)
+            room.live = result
+
+        return result
+
+    def _update_live_data(self, room, lives_manager, respjson, online):
+        """
+        Refreshes the live of a room from a live_info reply, for get_live_data.
+        :param respjson: live_info reply.
+        :type respjson: dictionary
+        :param online: True if online, False if offline, None if the query failed.
+        :type online: bool
+        :returns: The refreshed live, None if offline or failed.
+        :rtype: Live
+        """
+        result = None
+        if online:
+            result = self._find_live(lives_manager, respjson)
+            lives_manager.refresh(result, respjson)
+        elif online is False:
+            # A failed query keeps the known live
+            lives_manager.end(room.room_id)
+
+        return result
+
     def _query_csrf_token(self):
         """
         Return current CSRF token.
@@ -1,4 +1,5 @@
 """Rooms Manager"""
+from bisect import bisect_left, insort
 from enum import Enum
 
 from srtools.manager.basemanager import BaseManager
@@ -17,10 +18,15 @@ class RoomsManager(BaseManager):
 
     class Room(object):
         """Showroom room information."""
+        # Attributes indexed by the manager, updated on every assignment
+        _INDEXED = frozenset(["official", "genre", "live", "room_url_key"])
+
         def __init__(self, room_id):
+            object.__setattr__(self, "_manager", None)
             self.live = None
             self.room_id = room_id
             self.room_url_key = None
+            self.genre = None
             self.genres = []
             self.avatars = []
             self.avatars_checked = False
@@ -33,12 +39,31 @@ class RoomsManager(BaseManager):
             self.bonus_checked = False
             self.tweet_default = ""
 
+        def __setattr__(self, name, value):
+            if name in self._INDEXED and self._manager is not None:
+                previous = getattr(self, name, None)
+                object.__setattr__(self, name, value)
+                self._manager._reindex(self, name, previous, value)
+            else:
+                object.__setattr__(self, name, value)
+
         def __str__(self):
             """"""
             return str(self.room_id)
 
-    class RoomsFilter(object):
-        """Showroom rooms filter information."""
+    class RoomsQuery(object):
+        """Base of the room filters, combined with & and |."""
+        def __and__(self, other):
+            return RoomsManager.RoomsFilterGroup(RoomsManager.RoomsFilterGroup.AND, [self, other])
+
+        def __or__(self, other):
+            return RoomsManager.RoomsFilterGroup(RoomsManager.RoomsFilterGroup.OR, [self, other])
+
+    class RoomsFilter(RoomsQuery):
+        """
+        Showroom rooms filter information.
+        Attributes set to a set, frozenset, list or tuple match any of the contained values.
+        """
         def __init__(self):
             self.live = None
             self.room_id = None
@@ -55,14 +80,117 @@ class RoomsManager(BaseManager):
             self.tweet_default = None
             self.order_by = RoomsManager.RoomsSort.UNDEFINED
 
+    class RoomsFilterGroup(RoomsQuery):
+        """Rooms matching all (AND) or any (OR) of the given filters."""
+        AND = "and"
+        OR = "or"
+
+        def __init__(self, operator, filters):
+            """
+            :param operator: AND or OR.
+            :type operator: string
+            :param filters: Filters or filter groups to combine.
+            :type filters: RoomsQuery[]
+            """
+            self.operator = operator
+            self.filters = list(filters)
+            self.order_by = self.filters[0].order_by if self.filters else \
+                            RoomsManager.RoomsSort.UNDEFINED
+
+    # Filter attributes resolved through the indexes, the rest are checked room by room
+    _INDEXED_FILTERS = ["room_id", "live", "room_url_key", "official", "genre"]
+    _UNINDEXED_FILTERS = ["avatar_id", "has_upcoming", "badge", "image", "avatar_url", "telop",
+                          "bonus_checked", "tweet_default"]
+    # Filter values matching any of their elements
+    _MULTIPLE_VALUES = (set, frozenset, list, tuple)
+
     def __init__(self, configuration, showroom_api):
         super(RoomsManager, self).__init__(configuration, showroom_api)
         self._rooms = {}
+        self._sequence = {}
+        self._next_sequence = 0
+        self._indexes = {"official": {}, "genre": {}, "live": {}, "room_url_key": {}}
+        # Sorted views: room ids, and (live id, room id) of the rooms with a live
+        self._by_room_id = []
+        self._by_live_id = []
+
+    @staticmethod
+    def _index_key(name, value):
+        """
+        Key of an indexed value.
+        :param name: Indexed attribute.
+        :type name: string
+        :param value: Attribute value.
+        :returns: The value, or its live id for lives.
+        """
+        if name == "live":
+            value = value.live_id if value is not None else None
+
+        return value
+
+    def _reindex(self, room, name, previous, value):
+        """
+        Moves a room between index entries after an indexed attribute changed.
+        :param room: The modified room.
+        :type room: Room
+        :param name: Modified attribute.
+        :type name: string
+        :param previous: Previous value.
+        :param value: New value.
+        """
+        previous = self._index_key(name, previous)
+        value = self._index_key(name, value)
+        if previous is not value and previous != value:
+            self._unindex_value(room, name, previous)
+            self._index_value(room, name, value)
+
+    def _index_value(self, room, name, key):
+        """Adds a room to an index entry."""
+        self._indexes[name].setdefault(key, set()).add(room.room_id)
+        if name == "live" and key is not None:
+            insort(self._by_live_id, (key, room.room_id))
+
+    def _unindex_value(self, room, name, key):
+        """Removes a room from an index entry."""
+        entry = self._indexes[name].get(key)
+        if entry is not None:
+            entry.discard(room.room_id)
+            if not entry:
+                del self._indexes[name][key]
+
+        if name == "live" and key is not None:
+            position = bisect_left(self._by_live_id, (key, room.room_id))
+            if position < len(self._by_live_id) and \
+               self._by_live_id[position] == (key, room.room_id):
+                del self._by_live_id[position]
 
     def create(self, room_id):
         """Creates and returns a room."""
-        self._rooms[room_id] = self.Room(room_id)
-        return self._rooms[room_id]
+        if room_id in self._rooms:
+            self.remove(room_id)
+
+        room = self.Room(room_id)
+        self._rooms[room_id] = room
+        self._sequence[room_id] = self._next_sequence
+        self._next_sequence += 1
+        insort(self._by_room_id, room_id)
+        for name in self._indexes:
+            self._index_value(room, name, self._index_key(name, getattr(room, name)))
+        object.__setattr__(room, "_manager", self)
+
+        return room
+
+    def remove(self, room_id):
+        """Removes a room, returns it if it existed."""
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            object.__setattr__(room, "_manager", None)
+            del self._sequence[room_id]
+            del self._by_room_id[bisect_left(self._by_room_id, room_id)]
+            for name in self._indexes:
+                self._unindex_value(room, name, self._index_key(name, getattr(room, name)))
+
+        return room
 
     def create_filter(self):
         """Creates and returns a room filter."""
@@ -81,34 +209,159 @@ class RoomsManager(BaseManager):
         """Returns whether the room exists internally."""
         return room_id in self._rooms
 
+    def __len__(self):
+        """Amount of known rooms."""
+        return len(self._rooms)
+
+    @staticmethod
+    def _intersect(selections):
+        """
+        Intersects room id sets, smallest first.
+        :param selections: Sets to intersect.
+        :type selections: set[]
+        :returns: Room ids in every set, None if there were no sets.
+        :rtype: set
+        """
+        result = None
+        for selection in sorted(selections, key=len):
+            result = set(selection) if result is None else result & selection
+            if not result:
+                break
+
+        return result
+
+    @staticmethod
+    def _combine(checks):
+        """
+        Combines room checks.
+        :param checks: Functions returning whether a room matches.
+        :type checks: function[]
+        :returns: A function checking all of them, None if there were no checks.
+        :rtype: function
+        """
+        if not checks:
+            result = None
+        elif len(checks) == 1:
+            result = checks[0]
+        else:
+            result = lambda room: all(check(room) for check in checks)
+
+        return result
+
+    @staticmethod
+    def _compile_check(name, value, multiple):
+        """
+        Builds the check of an unindexed attribute.
+        :param name: Attribute name.
+        :type name: string
+        :param value: Requested value, or set of values.
+        :param multiple: Whether value is a set of values.
+        :type multiple: bool
+        :returns: Function returning whether a room matches.
+        :rtype: function
+        """
+        if multiple:
+            result = lambda room: getattr(room, name, None) in value
+        else:
+            result = lambda room: getattr(room, name, None) == value
+
+        return result
+
+    def _select(self, name, values):
+        """
+        Rooms ids whose indexed attribute has any of the given values.
+        :param name: Indexed attribute.
+        :type name: string
+        :param values: Requested values.
+        :type values: list
+        :rtype: set
+        """
+        if name == "room_id":
+            result = {x for x in values if x in self._rooms}
+        else:
+            index = self._indexes[name]
+            keys = [self._index_key(name, x) for x in values]
+            if len(keys) == 1:
+                result = index.get(keys[0], set())
+            else:
+                result = set()
+                for key in keys:
+                    result |= index.get(key, set())
+
+        return result
+
+    def _plan(self, rooms_filter):
+        """
+        Compiles a filter into the matching room ids of its indexed attributes and a check for
+        the rest, so only the requested attributes are ever tested.
+        :param rooms_filter: Filter to compile.
+        :type rooms_filter: RoomsQuery
+        :returns: Tuple (room ids, None if no index applies; check, None if nothing to check).
+        :rtype: tuple
+        """
+        if isinstance(rooms_filter, self.RoomsFilterGroup):
+            plans = [self._plan(x) for x in rooms_filter.filters]
+            if rooms_filter.operator == self.RoomsFilterGroup.AND:
+                return (self._intersect([x[0] for x in plans if x[0] is not None]),
+                        self._combine([x[1] for x in plans if x[1] is not None]))
+
+            if any(x[0] is None for x in plans):
+                return (None, lambda room: any(
+                    (candidates is None or room.room_id in candidates) and
+                    (check is None or check(room)) for candidates, check in plans))
+
+            candidates = set()
+            for selection, check in plans:
+                candidates |= selection if check is None else \
+                              {x for x in selection if check(self._rooms[x])}
+            return (candidates, None)
+
+        selections = []
+        checks = []
+        for name in self._INDEXED_FILTERS + self._UNINDEXED_FILTERS:
+            value = getattr(rooms_filter, name)
+            multiple = isinstance(value, self._MULTIPLE_VALUES)
+            if value is None or (name == "room_id" and not multiple and value < 1):
+                continue
+
+            if name in self._INDEXED_FILTERS:
+                selections.append(self._select(name, value if multiple else [value]))
+            else:
+                checks.append(self._compile_check(name, set(value) if multiple else value,
+                                                  multiple))
+
+        return (self._intersect(selections), self._combine(checks))
+
     def rooms(self, rooms_filter=None):
-        """Returns a list of rooms."""
+        """
+        Returns a list of rooms.
+        :param rooms_filter: Filter or combination of filters, None for every room.
+        :type rooms_filter: RoomsQuery
+        :rtype: Room[]
+        """
 
         if rooms_filter is None:
             rooms_filter = self.RoomsFilter()
 
-        rooms = [x for x in self._rooms.values() \
-                if (rooms_filter.live is None or (x.live is not None and x.live.live_id == rooms_filter.live.live_id)) and \
-                   (rooms_filter.room_id is None or rooms_filter.room_id < 1 or (x.room_id == rooms_filter.room_id)) and \
-                   (rooms_filter.room_url_key is None or (x.room_url_key == rooms_filter.room_url_key)) and \
-                   (rooms_filter.avatar_id is None or (x.avatar_id == rooms_filter.avatar_id)) and \
-                   (rooms_filter.has_upcoming is None or (x.has_upcoming == rooms_filter.has_upcoming)) and \
-                   (rooms_filter.badge is None or (x.badge == rooms_filter.badge)) and \
-                   (rooms_filter.image is None or (x.image == rooms_filter.image)) and \
-                   (rooms_filter.avatar_url is None or (x.avatar_url == rooms_filter.avatar_url)) and \
-                   (rooms_filter.telop is None or (x.telop == rooms_filter.telop)) and \
-                   (rooms_filter.official is None or (x.official == rooms_filter.official)) and \
-                   (rooms_filter.bonus_checked is None or (x.bonus_checked == rooms_filter.bonus_checked)) and \
-                   (rooms_filter.tweet_default is None or (x.tweet_default == rooms_filter.tweet_default)) and \
-                   (rooms_filter.genre is None or (x.genres is not None and rooms_filter.genre in x.genres))]
-
-        if rooms_filter.order_by == RoomsManager.RoomsSort.LIVE_ID_ASC:
-            rooms = sorted([x for x in rooms if x.live is not None], key=lambda x: x.live.live_id)
-        elif rooms_filter.order_by == RoomsManager.RoomsSort.LIVE_ID_DESC:
-            rooms = sorted([x for x in rooms if x.live is not None], key=lambda x: x.live.live_id, reverse=True)
-        elif rooms_filter.order_by == RoomsManager.RoomsSort.ROOM_ID_ASC:
-            rooms = sorted(rooms, key=lambda x: x.room_id)
-        elif rooms_filter.order_by == RoomsManager.RoomsSort.ROOM_ID_DESC:
-            rooms = sorted(rooms, key=lambda x: x.room_id, reverse=True)
+        candidates, check = self._plan(rooms_filter)
+        order_by = rooms_filter.order_by
+        if order_by in [RoomsManager.RoomsSort.LIVE_ID_ASC, RoomsManager.RoomsSort.LIVE_ID_DESC]:
+            room_ids = [x[1] for x in self._by_live_id
+                        if candidates is None or x[1] in candidates]
+        elif order_by in [RoomsManager.RoomsSort.ROOM_ID_ASC,
+                          RoomsManager.RoomsSort.ROOM_ID_DESC]:
+            room_ids = self._by_room_id if candidates is None else sorted(candidates)
+        elif candidates is None:
+            room_ids = self._rooms.keys()
+        else:
+            room_ids = sorted(candidates, key=self._sequence.get)
+
+        if order_by in [RoomsManager.RoomsSort.LIVE_ID_DESC, RoomsManager.RoomsSort.ROOM_ID_DESC]:
+            room_ids = reversed(room_ids)
+
+        if check is None:
+            rooms = [self._rooms[x] for x in room_ids]
+        else:
+            rooms = [x for x in (self._rooms[x] for x in room_ids) if check(x)]
 
         return rooms
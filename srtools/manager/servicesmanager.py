@@ -1,7 +1,9 @@
 """Services Manager"""
-import csv
+import asyncio
 import os
 import random
+import signal
+import sys
 import time
 import json
 from datetime import datetime
@@ -10,16 +12,24 @@ from pytz import timezone
 
 from srtools.configuration.configuration import BallotGifts, ClassicFreeGifts, FreeGifts, PaidGifts
 from srtools.manager.actionsfactory import ActionsFactory
+from srtools.manager.api.asyncshowroomapi import AsyncShowroomAPI
+from srtools.manager.api.callbacks.broadcastcallbackfactory import BroadcastCallbackFactory
 from srtools.manager.api.callbacks.coloredbroadcastcallback import ColoredBroadcastCallback
 from srtools.manager.api.callbacks.watchbroadcastcallback import WatchBroadcastCallback
 from srtools.manager.api.callbacks.readablebroadcastcallback import ReadableBroadcastCallback
 from srtools.manager.api.showroombroadcast import ShowroomBroadcast
+from srtools.manager.api.showroombroadcastengine import ShowroomBroadcastEngine
 from srtools.manager.basemanager import BaseManager
+from srtools.manager.watchmultiplexer import WatchMultiplexer
+from srtools.manager.watchscheduler import WatchScheduler
 from srtools.utils.activesleep import activesleep
+from srtools.utils.boundedstate import ExpiringSet, MemoryReport
+from srtools.utils.capturefile import CaptureReader
 from srtools.utils.dateformat import formatted_date
-from srtools.utils.jsonutils import save_json
+from srtools.utils.jsonutils import load_json, save_json, save_json_atomically
 from srtools.utils.loggingutils import log_error, log_trace
-from srtools.utils.parallel import Parallel
+from srtools.utils.parallel import Executor, Parallel
+from srtools.utils.tracksink import TrackSinkFactory
 
 
 class ServicesManager(BaseManager):
@@ -30,6 +40,32 @@ class ServicesManager(BaseManager):
         super(ServicesManager, self).__init__(configuration, showroom_manager.showroom_api)
         self.actions_factory = ActionsFactory()
         self.showroom_manager = showroom_manager
+        self._broadcast_engine = None
+
+    def _use_broadcast_engine(self):
+        """
+        Whether captures run in the shared asynchronous engine.
+        :returns: True if the async engine was chosen, False to use a process per capture.
+        :rtype: bool
+        """
+        return self.configuration.capture.engine == "async"
+
+    def _get_broadcast_engine(self):
+        """
+        Returns the shared broadcast engine, creating it if needed.
+        :returns: The broadcast engine.
+        :rtype: ShowroomBroadcastEngine
+        """
+        if self._broadcast_engine is None:
+            self._broadcast_engine = ShowroomBroadcastEngine(self.configuration)
+
+        return self._broadcast_engine
+
+    def _stop_broadcast_engine(self):
+        """Stops the shared broadcast engine if it was started."""
+        if self._broadcast_engine is not None:
+            self._broadcast_engine.stop()
+            self._broadcast_engine = None
 
     def _count_in_room(self, room):
         """
@@ -194,21 +230,15 @@ class ServicesManager(BaseManager):
         else:
             return json.loads("{u'error_user_msg': u'Special gifts only while voting is open.', u'message': u'BAD REQUEST', u'code': 1001}")
 
-    def _track_rooms_load_previous_day(self, filename):
+    def _track_rooms_load_previous_day(self, sink):
         """
         Auxiliar function, load information from previous day.
-        Currently unused.
-        """
-        _ = timezone('Asia/Tokyo')
-        last = {}
-        with open(filename, "r") as input_file:
-            reader = csv.reader(input_file, delimiter='\t')
-            for room_id, _, date, _, followers, viewers, points, diff in reader:
-                if room_id not in last:
-                    last[room_id] = {
-                        "points": points, "date": date, "viewers": viewers,
-                        "followers": followers, "diff": diff
-                    }
+        :param sink: Track storage.
+        :type sink: TrackSink
+        :returns: Latest values by room id.
+        :rtype: dictionary
+        """
+        return sink.last()
 
     def _do_watch_refresh_manager(self, room_id):
         """
@@ -229,29 +259,21 @@ class ServicesManager(BaseManager):
                 live = self.showroom_manager.showroom_api.get_live_data(room, \
                        self.showroom_manager.lives_manager)
                 room.live = live
+            else:
+                # The next try must see the latest onlives, not the kept reply
+                self.showroom_api.invalidate_onlives()
 
         return room
 
     def _do_watch_wait(self, room_id, delay):
         """
-        Wait until asked room goes online.
+        Wait until asked room goes online, polling it only around its expected start.
         :param room_id: Room id to check.
         :type room_id: int
         :param delay: Seconds to wait between tries.
         :type delay: float
         """
-        # TODO: Fix
-        # Room 97203 is not online, retrying in 10 seconds.
-        # Next broadcast: 2017-06-12 10:30:00 (in -1 day, 23:59:59.833071)
-        while not self.showroom_api.is_online(room_id):
-            message = "Room %s is not online, retrying in %s seconds." % (room_id, delay)
-            next_br = self.showroom_api.get_next_live(room_id)
-            if next_br is not None:
-                print(f"{message}\n    Next broadcast: {next_br} (in {(next_br - datetime.now())})")
-            else:
-                print(message)
-
-            time.sleep(delay)
+        WatchScheduler(self.showroom_api, self.configuration, [room_id], delay).wait()
 
     def _do_watch_check_renewal(self, left, total, extra):
         """
@@ -293,8 +315,9 @@ class ServicesManager(BaseManager):
         :returns: The filename to use.
         :rtype: string
         """
-        return "watch-%s-%s-%s.txt" % (formatted_date(), str(room.room_url_key),
-                                       str(room.live.live_id))
+        extension = "srcap" if self.configuration.capture.format == "binary" else "txt"
+        return "watch-%s-%s-%s.%s" % (formatted_date(), str(room.room_url_key),
+                                      str(room.live.live_id), extension)
 
     def _do_track_get_filename(self, date, room):
         """
@@ -342,7 +365,7 @@ class ServicesManager(BaseManager):
                                        if int(last[room.room_id]["points"]) != 0 else 0
                               }
 
-            print(f"Updating {room.room_url_key} [R: {room.room_id}, L: {room.live.live_id}, F: {live.room['follower_num']} {(int(live.room['follower_num']) - int(last[room.room_id]['followers']) if int(last[room.room_id]['followers']) != 0 else 0)}, P: {int(line_to_add['points'])} ({int(line_to_add['diff'])})]")
+            print(f"Updating {room.room_url_key} [R: {room.room_id}, L: {room.live.live_id}, F: {live.room['follower_num']} {(int(live.room['follower_num']) - int(last[room.room_id]['followers']) if int(last[room.room_id]['followers']) != 0 else 0)}, P: {int(live.room['popularity_point'])} ({int(line_to_add['diff']) if line_to_add else 0})]")
 
             last[room.room_id]["points"] = live.room['popularity_point']
             last[room.room_id]["followers"] = live.room['follower_num']
@@ -367,11 +390,18 @@ class ServicesManager(BaseManager):
 
     def _do_watch_capture(self, room, callback=None):
         """
-        Fork a process to capture the messaging.
+        Fork a process to capture the messaging, or add it to the broadcast engine.
         :param room: Room to capture.
         :type room: Room
         """
-        if self.configuration.watch.capture:
+        if self.configuration.watch.capture and self._use_broadcast_engine():
+            self.configuration.capture.output = self._do_watch_get_capture_filename(room)
+            if callback is None:
+                callback = WatchBroadcastCallback(self.configuration, room)
+
+            if self._get_broadcast_engine().add(room, callback):
+                print(f"Capturing room {room.room_id} ({self._broadcast_engine.active()} active captures).")
+        elif self.configuration.watch.capture:
             pid = os.fork()
             if pid > 0:
                 print(f"Spawned daemon process {pid}.")
@@ -382,6 +412,8 @@ class ServicesManager(BaseManager):
                     exit(0)
                     os._exit(0)
                 else:
+                    # Ends the capture cleanly, writing the messages not yet flushed
+                    signal.signal(signal.SIGTERM, lambda _signum, _frame: sys.exit(0))
                     self.configuration.capture.output = self._do_watch_get_capture_filename(room)
                     if callback is None:
                         callback = WatchBroadcastCallback(self.configuration, room)
@@ -499,6 +531,102 @@ class ServicesManager(BaseManager):
                 log_trace("Bonus embargo til %s" % timeout)
                 break
 
+    def _do_track_get_checkpoint(self, filename):
+        """
+        :param filename: Track file.
+        :type filename: string
+        :returns: Name of the file keeping the latest values of every room.
+        :rtype: string
+        """
+        return self.configuration.track.checkpoint or filename + ".last"
+
+    def _do_track_load_last(self, checkpoint, sink):
+        """
+        Loads the latest values of every room from the checkpoint, or from the track history if
+        there's no checkpoint yet.
+        :param checkpoint: Checkpoint file.
+        :type checkpoint: string
+        :param sink: Track storage.
+        :type sink: TrackSink
+        :returns: Points, followers and viewers by room id.
+        :rtype: dictionary
+        """
+        if os.path.exists(checkpoint):
+            saved = load_json(checkpoint) or {}
+        else:
+            saved = self._track_rooms_load_previous_day(sink)
+
+        return {int(room_id): {"points": values["points"], "followers": values["followers"],
+                               "viewers": values["viewers"]}
+                for room_id, values in saved.items()}
+
+    def _do_track_fetch(self, executor, rooms):
+        """
+        Fetches the live data of the given rooms concurrently.
+        :param executor: Workers doing the requests.
+        :type executor: Executor
+        :param rooms: Room ids to fetch.
+        :type rooms: int[]
+        :returns: Tuples (room id, room, live) for the known rooms, in the same order as rooms.
+                  Every request has ended, so captures can fork right away.
+        :rtype: tuple[]
+        """
+        tracked = [(x, self.showroom_manager.rooms_manager.find(x)) for x in rooms]
+        tracked = [(room_id, room) for room_id, room in tracked if room is not None]
+        lives = executor.map(self.showroom_manager.showroom_api.get_live_data,
+                             [room for _, room in tracked],
+                             [self.showroom_manager.lives_manager] * len(tracked))
+        return [(room_id, room, live) for (room_id, room), live in zip(tracked, list(lives))]
+
+    def _do_track_fetch_async(self, loop, showroom_api, rooms):
+        """
+        Fetches the live data of the given rooms, awaiting up to track.threads requests at once.
+        :param loop: Event loop running the requests.
+        :type loop: asyncio.AbstractEventLoop
+        :param showroom_api: Asynchronous API, kept for every cycle.
+        :type showroom_api: AsyncShowroomAPI
+        :param rooms: Room ids to fetch.
+        :type rooms: int[]
+        :returns: Tuples (room id, room, live) for the known rooms, in the same order as rooms.
+        :rtype: tuple[]
+        """
+        tracked = [(x, self.showroom_manager.rooms_manager.find(x)) for x in rooms]
+        tracked = [(room_id, room) for room_id, room in tracked if room is not None]
+
+        async def fetch():
+            # Same concurrency as the threads of the blocking fetch
+            semaphore = asyncio.Semaphore(self.configuration.track.threads)
+
+            async def fetch_room(room):
+                async with semaphore:
+                    return await showroom_api.get_live_data(room,
+                                                            self.showroom_manager.lives_manager)
+
+            return await asyncio.gather(*[fetch_room(room) for _room_id, room in tracked])
+
+        lives = loop.run_until_complete(fetch())
+        return [(room_id, room, live) for (room_id, room), live in zip(tracked, lives)]
+
+    def _create_expiring_set(self):
+        """
+        Set of rooms or lives forgotten when not seen for the configured cycles.
+        :rtype: ExpiringSet
+        """
+        return ExpiringSet(self.configuration.state.expire_cycles,
+                           self.configuration.state.max_entries)
+
+    def _state_sizes(self, sizes):
+        """
+        Sizes of the managers and of the given structures, for memory reports.
+        :param sizes: Amount of elements by structure name.
+        :type sizes: dictionary
+        :rtype: dictionary
+        """
+        result = {"rooms": len(self.showroom_manager.rooms_manager),
+                  "lives": len(self.showroom_manager.lives_manager.lives)}
+        result.update(sizes)
+        return result
+
     def do_track(self, filename, rooms):
         """
         Track popularity points for given rooms.
@@ -507,55 +635,76 @@ class ServicesManager(BaseManager):
         :params rooms: Rooms to check.
         :type rooms: int[]
         """
+        sink = TrackSinkFactory().create(self.configuration.track.sink, filename)
+        checkpoint = self._do_track_get_checkpoint(filename)
+        loop = None
+        async_api = None
+        executor = None
         try:
-            #last = self._load_previous_day(filename)
-            last = {}
-            active_watch = []
+            last = self._do_track_load_last(checkpoint, sink)
+            active_watch = self._create_expiring_set()
+            memory = MemoryReport(self.configuration.state.report_cycles)
+            if self.configuration.track.http == "async":
+                # Shares the cookies of the blocking API
+                loop = asyncio.new_event_loop()
+                async_api = AsyncShowroomAPI(self.configuration,
+                                             self.showroom_api.connections_manager.session)
+                fetch = lambda: self._do_track_fetch_async(loop, async_api, rooms)
+            else:
+                # Its own workers, so --threads bounds the concurrent requests
+                executor = Executor(self.configuration.track.threads)
+                fetch = lambda: self._do_track_fetch(executor, rooms)
             while True:
                 lines = []
                 date = datetime.now()
                 print(f"Processing {len(rooms)} rooms at {date}...")
-                for room_id in rooms:
-                    room = self.showroom_manager.rooms_manager.find(room_id)
-                    if room is not None:
-                        live = self.showroom_manager.showroom_api.get_live_data(room, \
-                                   self.showroom_manager.lives_manager)
-                        if live != None:
-                            line = self._do_track_process_data(room, live, date, last)
-                            if line:
-                                lines.append(line)
-
-                                if self.configuration.track.save:
-                                    savefile = self._do_track_get_filename(date, room)
-                                    save_json(live.json, savefile)
-
-                            users = self._do_track_find_official_users(live)
-                            if users:
-                                print(f"\tIn this arena: {','.join(map(str, users))}.")
-
-                            if self.configuration.track.capture:
-                                if live.live_id not in active_watch:
-                                    active_watch.append(live.live_id)
-                                    self.configuration.watch.capture = True
-
-                                    if room_id != self._KAHOTARU_ROOM_ID:
-                                        callback = ReadableBroadcastCallback(self.configuration, room)
-                                    else:
-                                        callback = WatchBroadcastCallback(self.configuration, room)
+                for room_id, room, live in fetch():
+                    if live != None:
+                        line = self._do_track_process_data(room, live, date, last)
+                        if line:
+                            lines.append(line)
+
+                            if self.configuration.track.save:
+                                savefile = self._do_track_get_filename(date, room)
+                                save_json(live.json, savefile)
+
+                        users = self._do_track_find_official_users(live)
+                        if users:
+                            print(f"\tIn this arena: {','.join(map(str, users))}.")
+
+                        if self.configuration.track.capture:
+                            captured = live.live_id in active_watch
+                            active_watch.add(live.live_id)
+                            if not captured:
+                                self.configuration.watch.capture = True
+
+                                if room_id != self._KAHOTARU_ROOM_ID:
+                                    callback = ReadableBroadcastCallback(self.configuration, room)
+                                else:
+                                    callback = WatchBroadcastCallback(self.configuration, room)
 
-                                    self._do_watch_capture(room, callback)
+                                self._do_watch_capture(room, callback)
 
-                with open(filename, "a") as output:
-                    for line in lines:
-                        output.write("%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n" % (line["id"], \
-                            line["key"], line["date"], line["actual_date"], line["followers"], \
-                            line["viewers"], line["points"], line["diff"]))
+                if lines:
+                    sink.write(lines)
+                    save_json_atomically(last, checkpoint)
+
+                active_watch.next_cycle()
+                memory.cycle(lambda: self._state_sizes({"captures": len(active_watch)}))
 
                 seconds = self.configuration.track.delay - (datetime.now() - date).seconds
                 activesleep(seconds)
                 self.showroom_manager.initialize()
         except Exception as err:
             log_error(err)
+        finally:
+            sink.close()
+            if executor is not None:
+                executor.shutdown(wait=False)
+            if loop is not None:
+                loop.run_until_complete(async_api.close())
+                loop.close()
+            self._stop_broadcast_engine()
 
     def do_hunt_avatars(self, rooms):
         """
@@ -564,8 +713,9 @@ class ServicesManager(BaseManager):
         :type rooms: int[]
         """
         try:
+            memory = MemoryReport(self.configuration.state.report_cycles)
             while True:
-                obtained_rooms = []
+                obtained_rooms = set()
                 date = datetime.now()
                 print(f"Checking {len(rooms)} rooms at {date} for avatars...")
                 for room_id in rooms:
@@ -590,11 +740,12 @@ class ServicesManager(BaseManager):
                             print(f"Simulated obtaining avatar from room {str(room_id)}.")
 
                         if save:
-                            obtained_rooms.append(room_id)
+                            obtained_rooms.add(room_id)
                             with open(self.configuration.hunt.target_file, "a") as output:
                                 output.write("Tried to obtain avatar from room %s.\n" % str(room_id))
 
                 rooms = [x for x in rooms if x not in obtained_rooms]
+                memory.cycle(lambda: self._state_sizes({"hunted rooms": len(rooms)}))
                 seconds = self.configuration.hunt.delay - (datetime.now() - date).seconds
                 activesleep(seconds)
                 self.showroom_manager.initialize()
@@ -603,21 +754,45 @@ class ServicesManager(BaseManager):
 
     def do_watch_rooms(self, rooms_id, delay):
         """
-        Automatize watching rooms. Spawn a process for each room.
+        Automatize watching rooms, all of them from this process (split among the configured
+        processes), or spawning a process for each room gone online.
         :param room_id: Room id to watch.
         :type room_id: int
         :param delay: Time to wait between tries.
         :type delay: int
         """
+        processes = min(self.configuration.watch.processes, len(rooms_id))
+        if self.configuration.watch.mode == "fork":
+            self._do_watch_rooms_fork(rooms_id, delay)
+        elif self.configuration.watch.capture and not self._use_broadcast_engine():
+            # Forking a capture process from the threads of the multiplexer isn't safe
+            raise ValueError("Multiplexed watch captures need the async capture engine (-e async)")
+        elif processes > 1:
+            self._do_watch_rooms_sharded(rooms_id, delay, processes)
+        else:
+            WatchMultiplexer(self, rooms_id, delay).run()
+
+    def _do_watch_rooms_sharded(self, rooms_id, delay, processes):
+        """
+        Splits the watched rooms among processes, each one pinned to a core when possible.
+        :param rooms_id: Room ids to watch.
+        :type rooms_id: int[]
+        :param delay: Time to wait between tries.
+        :type delay: int
+        :param processes: Amount of processes.
+        :type processes: int
+        """
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
         pids = []
-        for room_id in rooms_id:
+        for index in range(processes):
             pid = os.fork()
             if pid > 0:
-                print(f"Spawned process {pid} to watch room {str(room_id)}.")
+                print(f"Spawned process {pid} to watch rooms {rooms_id[index::processes]}.")
                 pids.append(pid)
             else:
-                self.do_watch_room(room_id, delay)
-                print(f"Spawned process for room {str(room_id)} ended.")
+                if cores:
+                    os.sched_setaffinity(0, {cores[index % len(cores)]})
+                WatchMultiplexer(self, rooms_id[index::processes], delay).run()
                 os._exit(0)
 
         while pids:
@@ -625,19 +800,49 @@ class ServicesManager(BaseManager):
             print(f"Process {pid} ended with status {status}.")
             pids.remove(pid)
 
-    def do_watch_room(self, room_id, delay):
+    def _do_watch_rooms_fork(self, rooms_id, delay):
+        """
+        Watches rooms with a single scheduler waiting for every room, spawning a process for
+        each room gone online until its live ends.
+        :param rooms_id: Room ids to watch.
+        :type rooms_id: int[]
+        :param delay: Time to wait between tries.
+        :type delay: int
+        """
+        scheduler = WatchScheduler(self.showroom_api, self.configuration, rooms_id, delay)
+        pids = {}
+        while True:
+            for room_id in scheduler.wait(delay):
+                pid = os.fork()
+                if pid > 0:
+                    print(f"Spawned process {pid} to watch room {str(room_id)}.")
+                    pids[pid] = room_id
+                else:
+                    self.do_watch_room(room_id, delay, once=True)
+                    print(f"Spawned process for room {str(room_id)} ended.")
+                    os._exit(0)
+
+            while pids:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    break
+
+                print(f"Process {pid} ended with status {status}.")
+                scheduler.add(pids.pop(pid))
+
+    def do_watch_room(self, room_id, delay, once=False):
         """
         Automatize watching a room.
         :param room_id: Room id to watch.
         :type room_id: int
         :param delay: Time to wait between tries.
         :type delay: int
+        :param once: Whether to return once the first live ends.
+        :type once: bool
         """
-        counted_in_room = self.configuration.watch.skip_count
-        japan_tz = timezone('Asia/Tokyo')
+        counted = {"counted": self.configuration.watch.skip_count, "live_id": 0}
         self.configuration.gather.use_twitter = False
         self.configuration.gather.use_bonus = True
-        live_id = 0
 
         while True:
             self._do_watch_wait(room_id, delay)
@@ -647,70 +852,110 @@ class ServicesManager(BaseManager):
             if room:
                 self._do_watch_capture(room)
                 while self.showroom_manager.showroom_api.is_online(room_id):
-                    self._force_visit(room)
-
-                    print("Refreshing rooms list...")
-                    rooms_filter = self.showroom_manager.rooms_manager.create_filter()
-                    rooms_filter.official = room.official
-                    rooms = self.showroom_manager.rooms_manager.rooms(rooms_filter)
-
-                    if not self.configuration.watch.skip_throw:
-                        print("Throwing and reloading items...")
-                        self.do_throw_normal_items(room)
-                        self.do_reload_items(rooms)
-                        self.do_throw_normal_items(room)
-                        self.do_reload_items(rooms)
-                        self.do_throw_normal_items(room)
-                    else:
-                        print("Skipping throwing and reloading items...")
-
-                    print("Guessing next round of gathering...")
-                    tries = 3
-                    timeout = None
-                    while tries > 0 and timeout is None:
-                        tries -= 1
-                        timeout = self.showroom_api.get_timeout(room)
-                        if timeout is not None:
-                            try:
-                                seconds = (japan_tz.localize(datetime.combine(datetime.now().date(), \
-                                          datetime.strptime(timeout, "%H:%M:%S").time())) - \
-                                          datetime.now(tz=japan_tz)).seconds + 60
-                            except Exception as err:
-                                log_error(err)
-                                seconds = 600
-
-                    if timeout is None:
-                        seconds = 60
-
-                    print(f"Guessed {timeout} (in {seconds} seconds)...")
-                    current_date = datetime.now()
-
-                    print("Determining if count is needed...")
-                    if live_id != room.live.live_id:
-                        counted_in_room = False
-
-                    if not counted_in_room:
-                        self._count_in_room(room)
-                        counted_in_room = True
-                        live_id = room.live.live_id
-
-                    seconds -= (datetime.now() - current_date).seconds
-                    if seconds < 1 or seconds > (60 * 60):
-                        seconds = 30
-
-                    print(f"Waiting until {timeout} for next round of gathering ({seconds} seconds)...    ")
-
+                    seconds = self._do_watch_round(room, counted)
                     activesleep(seconds, self._do_watch_check_renewal, extra={"room": room})
-                    self.showroom_api.clear_timeout(room)
-                    print("Woke up! Refreshing room list to gather items...")
-                    room = self._do_watch_refresh_manager(room_id)
-                    rooms = self.showroom_manager.rooms_manager.rooms(rooms_filter)
-
-                    if not self.configuration.watch.skip_throw:
-                        print(f"Found {len(rooms)} rooms. Gathering items...")
-                        self.do_reload_items(rooms)
-                    else:
-                        print(f"Found {len(rooms)} rooms, but skipping gathering items...")
+                    room = self._do_watch_gather(room_id, room)
+
+            if once:
+                break
+
+    def _do_watch_rooms_filter(self, room):
+        """
+        :param room: Watched room.
+        :type room: Room
+        :returns: Filter of the rooms where to gather items for the watched room.
+        :rtype: RoomsFilter
+        """
+        rooms_filter = self.showroom_manager.rooms_manager.create_filter()
+        rooms_filter.official = room.official
+        return rooms_filter
+
+    def _do_watch_round(self, room, counted):
+        """
+        Visits an online watched room, throws and reloads items and counts once per live.
+        :param room: Watched room.
+        :type room: Room
+        :param counted: Whether it was counted in the live with id live_id, updated.
+        :type counted: dictionary
+        :returns: Seconds to wait until the next round of gathering.
+        :rtype: int
+        """
+        japan_tz = timezone('Asia/Tokyo')
+        self._force_visit(room)
+
+        print("Refreshing rooms list...")
+        rooms = self.showroom_manager.rooms_manager.rooms(self._do_watch_rooms_filter(room))
+
+        if not self.configuration.watch.skip_throw:
+            print("Throwing and reloading items...")
+            self.do_throw_normal_items(room)
+            self.do_reload_items(rooms)
+            self.do_throw_normal_items(room)
+            self.do_reload_items(rooms)
+            self.do_throw_normal_items(room)
+        else:
+            print("Skipping throwing and reloading items...")
+
+        print("Guessing next round of gathering...")
+        tries = 3
+        timeout = None
+        while tries > 0 and timeout is None:
+            tries -= 1
+            timeout = self.showroom_api.get_timeout(room)
+            if timeout is not None:
+                try:
+                    seconds = (japan_tz.localize(datetime.combine(datetime.now().date(), \
+                              datetime.strptime(timeout, "%H:%M:%S").time())) - \
+                              datetime.now(tz=japan_tz)).seconds + 60
+                except Exception as err:
+                    log_error(err)
+                    seconds = 600
+
+        if timeout is None:
+            seconds = 60
+
+        print(f"Guessed {timeout} (in {seconds} seconds)...")
+        current_date = datetime.now()
+
+        print("Determining if count is needed...")
+        if counted["live_id"] != room.live.live_id:
+            counted["counted"] = False
+
+        if not counted["counted"]:
+            self._count_in_room(room)
+            counted["counted"] = True
+            counted["live_id"] = room.live.live_id
+
+        seconds -= (datetime.now() - current_date).seconds
+        if seconds < 1 or seconds > (60 * 60):
+            seconds = 30
+
+        print(f"Waiting until {timeout} for next round of gathering ({seconds} seconds)...    ")
+        return seconds
+
+    def _do_watch_gather(self, room_id, room):
+        """
+        Gathers the items renewed while waiting for the next round.
+        :param room_id: Watched room id.
+        :type room_id: int
+        :param room: Watched room, before waiting.
+        :type room: Room
+        :returns: The watched room, refreshed. None if not found.
+        :rtype: Room
+        """
+        self.showroom_api.clear_timeout(room)
+        print("Woke up! Refreshing room list to gather items...")
+        rooms_filter = self._do_watch_rooms_filter(room)
+        room = self._do_watch_refresh_manager(room_id)
+        rooms = self.showroom_manager.rooms_manager.rooms(rooms_filter)
+
+        if not self.configuration.watch.skip_throw:
+            print(f"Found {len(rooms)} rooms. Gathering items...")
+            self.do_reload_items(rooms)
+        else:
+            print(f"Found {len(rooms)} rooms, but skipping gathering items...")
+
+        return room
 
     def get_throwable_items(self, room, normal_items_only=False):
         """Returns array with throwable items in given room."""
@@ -816,8 +1061,68 @@ class ServicesManager(BaseManager):
         if callback is None:
             callback = ColoredBroadcastCallback(self.configuration, room)
 
-        showroom_lowlevel_api = ShowroomBroadcast(self.configuration, room, None)
-        showroom_lowlevel_api.do_communication(callback)
+        if self._use_broadcast_engine():
+            engine = self._get_broadcast_engine()
+            engine.add(room, callback)
+            engine.wait()
+        else:
+            showroom_lowlevel_api = ShowroomBroadcast(self.configuration, room, None)
+            showroom_lowlevel_api.do_communication(callback)
+
+    def _do_replay_room(self, header):
+        """
+        Build the room described in a capture header.
+        :param header: Capture header, None for text captures.
+        :type header: dictionary
+        :returns: The known room if available, a detached one otherwise.
+        :rtype: Room
+        """
+        header = header or {}
+        room = self.showroom_manager.rooms_manager.find(header.get("room_id"))
+        if room is None:
+            room = self.showroom_manager.rooms_manager.Room(header.get("room_id", 0))
+            room.room_url_key = header.get("room_url_key")
+            room.live = self.showroom_manager.lives_manager.Live(header.get("live_id", 0))
+
+        return room
+
+    def do_replay(self, filename, handler):
+        """
+        Feed a recorded capture through a broadcast callback.
+        :param filename: Binary or text capture to replay.
+        :type filename: string
+        :param handler: Alias of the callback handler to use.
+        :type handler: string
+        :returns: Amount of replayed messages.
+        :rtype: int
+        """
+        factory = BroadcastCallbackFactory()
+        self.configuration.capture.output = self.configuration.replay.output
+        header = None
+        callback = None
+        cont = True
+        count = 0
+
+        for current_header, _date, message in CaptureReader(filename):
+            if callback is None or current_header is not header:
+                if callback is not None:
+                    callback.terminate()
+
+                header = current_header
+                callback = factory.create(handler, self.configuration,
+                                          self._do_replay_room(header))
+                callback.initialize()
+                cont = True
+
+            if cont:
+                callback.new_message(message)
+                cont = callback.process_message(message)
+                count += 1
+
+        if callback is not None:
+            callback.terminate()
+
+        return count
 
     def do_stalk_avatars(self, avatars):
         """
@@ -826,8 +1131,9 @@ class ServicesManager(BaseManager):
         :type avatars: int[]
         """
         try:
-            avatar_list = list(avatars)
-            verified_rooms = []
+            avatar_list = set(avatars)
+            verified_rooms = self._create_expiring_set()
+            memory = MemoryReport(self.configuration.state.report_cycles)
             while True:
                 date = datetime.now()
                 print("Already obtained %s avatars as of %s..." % (len(avatar_list), date))
@@ -865,14 +1171,19 @@ class ServicesManager(BaseManager):
                                         print("Room %s is in poll mode." % str(room.room_id))
 
                                 room.avatars.append(avatar_id)
-                                if room.room_id not in verified_rooms:
-                                    verified_rooms.append(room.room_id)
+                                verified_rooms.add(room.room_id)
 
                                 if saveAvatar:
-                                    avatar_list.append(avatar_id)
+                                    avatar_list.add(avatar_id)
                         else:
-                            if room.room_id not in verified_rooms:
-                                verified_rooms.append(room.room_id)
+                            verified_rooms.add(room.room_id)
+                    else:
+                        # Still online, remember it for longer
+                        verified_rooms.add(room.room_id)
+
+                verified_rooms.next_cycle()
+                memory.cycle(lambda: self._state_sizes({"verified rooms": len(verified_rooms),
+                                                        "avatars": len(avatar_list)}))
 
                 seconds = self.configuration.hunt.delay - (datetime.now() - date).seconds
                 activesleep(seconds)
@@ -1,4 +1,6 @@
 """Main manager."""
+import threading
+from enum import Enum
 from srtools.manager.livesmanager import LivesManager
 from srtools.manager.roomsmanager import RoomsManager
 from srtools.manager.genresmanager import GenresManager
@@ -7,14 +9,51 @@ from srtools.utils.loggingutils import log_error
 
 class ShowroomManager(object):
     """Manager group."""
-    def __init__(self, configuration, showroom_api=None):
+    class RoomEvent(Enum):
+        """Changes found while refreshing the online rooms."""
+        ADDED = 1
+        REMOVED = 2
+        CHANGED = 3
+
+    # Room attribute: onlives field
+    _ROOM_FIELDS = {
+        "cell_type": "cell_type",
+        "follower_num": "follower_num",
+        "is_follow": "is_follow",
+        "image": "image",
+        "tags": "tags",
+        "live_type": "live_type",
+        "view_num": "view_num",
+        "room_url_key": "room_url_key",
+        "name": "main_name",
+        "official": "official_lv",
+        "bcsvr_key": "bcsvr_key",
+        "started_at": "started_at",
+        "main_name": "main_name"
+    }
+
+    def __init__(self, configuration, showroom_api=None, initialize=True):
+        """
+        :param configuration: The current configuration.
+        :type configuration: Configuration
+        :param showroom_api: API to use, a new one if None.
+        :type showroom_api: ShowroomAPI
+        :param initialize: False to start with empty managers instead of the online rooms.
+        :type initialize: bool
+        """
         self.configuration = configuration
         self.showroom_api = showroom_api \
                             if showroom_api is not None else ShowroomAPI(self.configuration)
         self.lives_manager = None
         self.rooms_manager = None
         self.genres_manager = None
-        self.initialize()
+        self._listeners = []
+        # Held while refreshing, threads watching different rooms refresh the same managers
+        self._lock = threading.Lock()
+        if initialize:
+            self.initialize()
+        else:
+            self._create_managers()
 
     def _create_managers(self):
         """Create internal managers."""
@@ -22,43 +61,124 @@ class ShowroomManager(object):
         self.rooms_manager = RoomsManager(self.configuration, self.showroom_api)
         self.genres_manager = GenresManager(self.configuration, self.showroom_api)
 
+    def add_listener(self, listener):
+        """
+        Registers a function to call with every change found by initialize.
+        :param listener: Function receiving the event and the room.
+        :type listener: function
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Unregisters a listener.
+        :param listener: Function registered with add_listener.
+        :type listener: function
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event, room):
+        """
+        Notifies the listeners.
+        :param event: What happened to the room.
+        :type event: RoomEvent
+        :param room: The room.
+        :type room: Room
+        """
+        for listener in list(self._listeners):
+            try:
+                listener(event, room)
+            except Exception as err:
+                log_error(err)
+
+    def _get_live(self, live_id):
+        """
+        Returns the known live, creating it if needed, so the fetched information is kept.
+        :param live_id: Live to get.
+        :type live_id: int
+        :returns: The live.
+        :rtype: Live
+        """
+        live = self.lives_manager.find(live_id)
+        if live is None:
+            live = self.lives_manager.create(live_id)
+
+        return live
+
+    def _refresh_room(self, room, genre):
+        """
+        Adds or updates a room from its onlives information.
+        :param room: Room information from onlives.
+        :type room: dictionary
+        :param genre: Genre where the room is listed.
+        :type genre: Genre
+        """
+        current_room = self.rooms_manager.find(room['room_id'])
+        if current_room is None:
+            current_room = self.rooms_manager.create(room['room_id'])
+            for attribute, field in self._ROOM_FIELDS.items():
+                setattr(current_room, attribute, room[field])
+            current_room.bonus_checked = False
+            current_room.badge = False
+            current_room.live = self._get_live(room['live_id'])
+            current_room.genre = genre
+            self._notify(self.RoomEvent.ADDED, current_room)
+        else:
+            changed = False
+            for attribute, field in self._ROOM_FIELDS.items():
+                if getattr(current_room, attribute, None) != room[field]:
+                    setattr(current_room, attribute, room[field])
+                    changed = True
+
+            if current_room.live is None or current_room.live.live_id != room['live_id']:
+                if current_room.live is not None:
+                    self.lives_manager.remove(current_room.live.live_id)
+                current_room.live = self._get_live(room['live_id'])
+                changed = True
+
+            if changed:
+                self._notify(self.RoomEvent.CHANGED, current_room)
+
+    def _retire_room(self, room):
+        """
+        Removes a room that is no longer broadcasting, and its live.
+        :param room: The room to remove.
+        :type room: Room
+        """
+        self.rooms_manager.remove(room.room_id)
+        if room.live is not None:
+            self.lives_manager.remove(room.live.live_id)
+        self._notify(self.RoomEvent.REMOVED, room)
+
     def initialize(self):
-        """Initializes the managers."""
-        self._create_managers()
-        try:
-            respjson = self.showroom_api.get_onlives()
-            if respjson is not None:
-                for genre in respjson['onlives']:
-                    current_genre = self.genres_manager.find(genre['genre_id'])
-                    if current_genre is None:
-                        current_genre = self.genres_manager.create(genre['genre_id'],
-                                                                   genre['genre_name'])
-
-                    for room in genre['lives']:
-                        if room.get('room_id') is not None:
-                            current_room = self.rooms_manager.find(room['room_id'])
-                            if current_room is None:
-                                current_room = self.rooms_manager.create(room['room_id'])
-                                current_room.cell_type = room['cell_type']
-                                current_room.follower_num = room['follower_num']
-                                current_room.is_follow = room['is_follow']
-                                current_room.image = room['image']
-                                current_room.tags = room['tags']
-                                current_room.live_type = room['live_type']
-                                current_room.view_num = room['view_num']
-                                current_room.room_url_key = room['room_url_key']
-                                current_room.name = room['main_name']
-                                current_room.official = room['official_lv']
-                                current_room.bcsvr_key = room['bcsvr_key']
-                                current_room.started_at = room['started_at']
-                                current_room.main_name = room['main_name']
-                                current_room.bonus_checked = False
-                                current_room.badge = False
-                                current_room.live = self.lives_manager.create(room['live_id'])
-                                current_room.genre = current_genre
-                            else:
-                                if current_room.live.live_id != room['live_id']:
-                                    current_room.live = self.lives_manager.create(room['live_id'])
-
-        except Exception as err:
-            log_error(err)
+        """
+        Refreshes the managers with the online rooms. Known rooms are updated in place, so their
+        state survives, and rooms no longer online are removed. Concurrent calls are serialized.
+        """
+        with self._lock:
+            if self.rooms_manager is None:
+                self._create_managers()
+
+            try:
+                respjson = self.showroom_api.get_onlives()
+                if respjson is not None:
+                    online = set()
+                    for genre in respjson['onlives']:
+                        current_genre = self.genres_manager.find(genre['genre_id'])
+                        if current_genre is None:
+                            current_genre = self.genres_manager.create(genre['genre_id'],
+                                                                       genre['genre_name'])
+
+                        for room in genre['lives']:
+                            # Rooms are listed in several genres, the first one is kept
+                            if room.get('room_id') is not None and room['room_id'] not in online:
+                                online.add(room['room_id'])
+                                self._refresh_room(room, current_genre)
+
+                    for room in self.rooms_manager.rooms():
+                        if room.room_id not in online:
+                            self._retire_room(room)
+
+            except Exception as err:
+                log_error(err)
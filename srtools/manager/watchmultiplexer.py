@@ -0,0 +1,165 @@
+"""Watch of many rooms from a single process."""
+import threading
+import time
+
+from srtools.manager.watchscheduler import WatchScheduler
+from srtools.utils.loggingutils import log_error
+from srtools.utils.parallel import Executor
+from srtools.utils.timers import Timers
+
+class WatchMultiplexer(object):
+    """
+    Watches many rooms from a single process, sharing the manager, the HTTP pool and the capture
+    engine. Every room is a state machine driven by timers: it waits in the scheduler, and once
+    online it's refreshed, captured and goes through rounds of gathering (checking for a renewed
+    live meanwhile) until it goes offline and waits again. The steps of the rooms run in an
+    executor of their own, the timers only hand them over: steps wait for the tasks they add to
+    the shared executor, which could never start if steps took every shared worker.
+    """
+    # Seconds between checks for a renewed live while waiting for the next round
+    RENEWAL_STEP = 30
+
+    class Watch(object):
+        """State of an online watched room."""
+        def __init__(self, room_id, skip_count):
+            self.room_id = room_id
+            self.room = None
+            self.counted = {"counted": skip_count, "live_id": 0}
+            # Next round and renewal check timers, rounds scheduled so far
+            self.next_round = None
+            self.rounds = 0
+            self.renewal = None
+            # Held while a step of the room runs, steps of the same room never overlap
+            self.lock = threading.Lock()
+
+    def __init__(self, services_manager, rooms_id, delay):
+        """
+        :param services_manager: Services manager doing the steps.
+        :type services_manager: ServicesManager
+        :param rooms_id: Rooms to watch.
+        :type rooms_id: int[]
+        :param delay: Seconds between polls of a room around its expected start.
+        :type delay: float
+        """
+        self.services_manager = services_manager
+        self.configuration = services_manager.configuration
+        self.delay = delay
+        self.timers = Timers()
+        self.scheduler = WatchScheduler(services_manager.showroom_api, self.configuration,
+                                        rooms_id, delay)
+        self.executor = Executor(max(len(rooms_id), 1))
+        self.watches = {}
+        self._poll_timer = None
+        # Captures set the capture output of the shared configuration
+        self._capture_lock = threading.Lock()
+
+    def run(self):
+        """Watches the rooms until stopped."""
+        self.configuration.gather.use_twitter = False
+        self.configuration.gather.use_bonus = True
+
+        self._poll_timer = self.timers.after(0, self._poll)
+        try:
+            self.timers.run()
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def stop(self):
+        """Stops watching, captures already started go on."""
+        self.timers.stop()
+
+    def _poll(self):
+        """Starts watching the rooms gone online, from the timers thread."""
+        try:
+            for room_id in self.scheduler.poll(time.time()):
+                print(f"Room {room_id} is online. Refreshing manager...")
+                watch = self.watches[room_id] = self.Watch(room_id,
+                                                           self.configuration.watch.skip_count)
+                self._submit(self._start, watch)
+        except Exception as err:
+            log_error(err)
+
+        self.timers.move(self._poll_timer, self.scheduler.next_due() - time.time())
+
+    def _wait(self, room_id):
+        """Waits again for a room whose live ended, from the timers thread."""
+        self.scheduler.add(room_id)
+        self.timers.move(self._poll_timer, 0)
+
+    def _submit(self, step, watch, *args):
+        """Runs a step of a room in the executor."""
+        self.executor.submit(self._run_step, step, watch, *args)
+
+    def _run_step(self, step, watch, *args):
+        """Runs a step, the room waits again if it fails."""
+        with watch.lock:
+            try:
+                step(watch, *args)
+            except Exception as err:
+                log_error(err)
+                self._end(watch)
+
+    def _start(self, watch):
+        """Refreshes and captures a room gone online."""
+        watch.room = self.services_manager._do_watch_refresh_manager(watch.room_id)
+        if watch.room is not None:
+            with self._capture_lock:
+                self.services_manager._do_watch_capture(watch.room)
+            watch.renewal = self.timers.every(self.RENEWAL_STEP, self._renew, watch)
+            self._round(watch)
+        else:
+            self._end(watch)
+
+    def _round(self, watch):
+        """Gathers in an online room, and schedules the next round."""
+        if self.services_manager.showroom_manager.showroom_api.is_online(watch.room_id):
+            seconds = self.services_manager._do_watch_round(watch.room, watch.counted)
+            watch.rounds += 1
+            watch.next_round = self.timers.after(seconds, self._submit, self._next_round, watch,
+                                                 watch.rounds)
+        else:
+            self._end(watch)
+
+    def _next_round(self, watch, number):
+        """Gathers the renewed items, then starts the next round."""
+        if number != watch.rounds or watch.next_round is None:
+            # Already started by a renewal
+            return
+
+        watch.next_round.cancel()
+        watch.next_round = None
+        watch.room = self.services_manager._do_watch_gather(watch.room_id, watch.room)
+        if watch.room is not None:
+            self._round(watch)
+        else:
+            self._end(watch)
+
+    def _renew(self, watch):
+        """
+        Checks for a renewed live while waiting for the next round, from the timers thread.
+        Skipped while a step of the room runs.
+        """
+        if watch.next_round is not None and watch.lock.acquire(blocking=False):
+            watch.lock.release()
+            self._submit(self._check_renewal, watch)
+
+    def _check_renewal(self, watch):
+        """Starts the next round right away if the room started a new live."""
+        if watch.next_round is not None:
+            left = int(watch.next_round.left())
+            with self._capture_lock:
+                left = self.services_manager._do_watch_check_renewal(left, left,
+                                                                    {"room": watch.room})
+            if left <= 0:
+                self._next_round(watch, watch.rounds)
+
+    def _end(self, watch):
+        """Stops the timers of a room gone offline, and waits for it again."""
+        for timer in [watch.renewal, watch.next_round]:
+            if timer is not None:
+                timer.cancel()
+        watch.renewal = watch.next_round = None
+
+        if self.watches.pop(watch.room_id, None) is not None:
+            print(f"Room {watch.room_id} is offline, waiting for its next live.")
+            self.timers.after(0, self._wait, watch.room_id)
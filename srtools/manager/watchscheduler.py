@@ -0,0 +1,177 @@
+"""Schedule of the watched rooms."""
+import heapq
+import time
+from datetime import datetime
+
+class WatchScheduler(object):
+    """
+    Waits for watched rooms to go online without polling each of them all the time. Every room
+    waits for its expected start, taken from the time table or its next live, and is polled only
+    inside a window around it. Rooms going online unannounced are found through the online rooms
+    list, a single request for every room.
+    """
+    def __init__(self, showroom_api, configuration, rooms_id, delay):
+        """
+        :param showroom_api: API used for the requests.
+        :type showroom_api: ShowroomAPI
+        :param configuration: Configuration, see WatchConfiguration.
+        :type configuration: Configuration
+        :param rooms_id: Rooms to wait for.
+        :type rooms_id: int[]
+        :param delay: Seconds between polls of a room inside its window.
+        :type delay: float
+        """
+        self.showroom_api = showroom_api
+        self.delay = delay
+        self.window = configuration.watch.window
+        self.sweep = configuration.watch.sweep
+        self.schedule_refresh = configuration.watch.schedule_refresh
+        # Expected start (epoch) by room id
+        self.expected = {}
+        self._waiting = set()
+        # Heap of (epoch, room id) polls, those not matching _due were rescheduled
+        self._queue = []
+        self._due = {}
+        self._next_sweep = 0
+        self._next_refresh = 0
+
+        for room_id in rooms_id:
+            self.add(room_id)
+
+    def add(self, room_id):
+        """
+        Waits for a room to go online, again once its live has ended.
+        :param room_id: Room to wait for.
+        :type room_id: int
+        """
+        self._waiting.add(room_id)
+        expected = self.expected.get(room_id)
+        if expected is not None and expected > time.time():
+            self._schedule(room_id, expected - self.window)
+        else:
+            self.expected.pop(room_id, None)
+
+    def waiting(self):
+        """
+        :returns: Rooms waited for.
+        :rtype: int[]
+        """
+        return sorted(self._waiting)
+
+    def _schedule(self, room_id, due):
+        """Polls a room at the given epoch, replacing its previous poll."""
+        self._due[room_id] = due
+        heapq.heappush(self._queue, (due, room_id))
+
+    def _unschedule(self, room_id):
+        """Forgets the poll and expected start of a room."""
+        self._due.pop(room_id, None)
+        self.expected.pop(room_id, None)
+
+    def _online_rooms(self):
+        """
+        :returns: Online rooms, according to the online rooms list.
+        :rtype: set
+        """
+        onlives = self.showroom_api.get_onlives() or {}
+        return {x.get("room_id") for genre in onlives.get("onlives") or []
+                for x in genre.get("lives") or []}
+
+    def refresh(self, now):
+        """
+        Takes the expected start of the waiting rooms from the time table, querying the next live
+        of the rooms not in it.
+        :param now: Current epoch.
+        :type now: float
+        """
+        starts = {}
+        timetable = self.showroom_api.get_timetable() or {}
+        for entry in timetable.get("time_tables") or []:
+            room_id = entry.get("room_id")
+            started_at = entry.get("started_at")
+            if room_id in self._waiting and started_at and started_at + self.window > now:
+                starts[room_id] = min(started_at, starts.get(room_id, started_at))
+
+        for room_id in self._waiting - set(starts):
+            next_live = self.showroom_api.get_next_live(room_id)
+            if next_live is not None and next_live.timestamp() + self.window > now:
+                starts[room_id] = next_live.timestamp()
+
+        for room_id in self._waiting:
+            start = starts.get(room_id)
+            if start is None:
+                self._unschedule(room_id)
+            elif start != self.expected.get(room_id):
+                print(f"Room {room_id} is not online.\n"
+                      f"    Next broadcast: {datetime.fromtimestamp(start)}")
+                self.expected[room_id] = start
+                self._schedule(room_id, max(now, start - self.window))
+
+        self._next_refresh = now + self.schedule_refresh
+
+    def poll(self, now):
+        """
+        Checks the rooms due at the given time.
+        :param now: Current epoch.
+        :type now: float
+        :returns: Rooms gone online, no longer waited for.
+        :rtype: int[]
+        """
+        online = set()
+        if now >= self._next_sweep:
+            online = self._waiting & self._online_rooms()
+            self._next_sweep = now + self.sweep
+
+        if not online and now >= self._next_refresh:
+            self.refresh(now)
+
+        while self._queue and self._queue[0][0] <= now:
+            due, room_id = heapq.heappop(self._queue)
+            if room_id in online or room_id not in self._waiting or self._due.get(room_id) != due:
+                continue
+
+            if self.showroom_api.is_online(room_id):
+                online.add(room_id)
+            elif now < self.expected[room_id] + self.window:
+                self._schedule(room_id, now + self.delay)
+            else:
+                print(f"Room {room_id} did not go online around "
+                      f"{datetime.fromtimestamp(self.expected[room_id])}.")
+                self._unschedule(room_id)
+
+        for room_id in online:
+            self._waiting.discard(room_id)
+            self._unschedule(room_id)
+
+        return sorted(online)
+
+    def next_due(self):
+        """
+        :returns: Epoch of the next request.
+        :rtype: float
+        """
+        result = min(self._next_sweep, self._next_refresh)
+        if self._queue:
+            result = min(result, self._queue[0][0])
+
+        return result
+
+    def wait(self, timeout=None):
+        """
+        Sleeps until some rooms go online.
+        :param timeout: Maximum seconds to wait, None to wait forever.
+        :type timeout: float
+        :returns: Rooms gone online, empty if timed out.
+        :rtype: int[]
+        """
+        end = time.time() + timeout if timeout is not None else None
+        while True:
+            now = time.time()
+            online = self.poll(now)
+            if online or (end is not None and now >= end):
+                break
+
+            wake = self.next_due() if end is None else min(self.next_due(), end)
+            time.sleep(max(0, wake - time.time()))
+
+        return online
@@ -0,0 +1,44 @@
+"""Unit tests for bounded state."""
+import contextlib
+import io
+import unittest
+from srtools.utils.boundedstate import ExpiringSet, MemoryReport
+
+class ExpiringSetTest(unittest.TestCase):
+    """Keys forgotten by age and by size."""
+    def test_expire(self):
+        """Test keys not seen for some cycles are evicted."""
+        keys = ExpiringSet(expire_cycles=2)
+        keys.add(1)
+        keys.add(2)
+        self.assertEqual([], keys.next_cycle())
+        keys.add(1)
+        self.assertEqual([2], keys.next_cycle())
+        self.assertIn(1, keys)
+        self.assertNotIn(2, keys)
+        self.assertEqual([1], keys.next_cycle())
+        self.assertEqual(0, len(keys))
+
+    def test_max_size(self):
+        """Test the least recently seen keys are evicted first."""
+        keys = ExpiringSet(max_size=3)
+        for key in [1, 2, 3, 1]:
+            self.assertEqual([], keys.add(key))
+        self.assertEqual([2], keys.add(4))
+        self.assertEqual([3, 1, 4], list(keys))
+        self.assertEqual([], keys.next_cycle())
+
+class MemoryReportTest(unittest.TestCase):
+    """Periodic memory reports."""
+    def test_cycle(self):
+        """Test reports are printed every some cycles."""
+        report = MemoryReport(2)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            printed = [report.cycle(lambda: {"rooms": 5}) for _ in range(4)]
+        self.assertEqual([False, True, False, True], printed)
+        self.assertIn("rooms 5", output.getvalue())
+        self.assertFalse(MemoryReport().cycle(lambda: {}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Replay benchmark for broadcast callbacks.
+
+Streams recorded or synthetic messages from a local broadcast server through
+ShowroomBroadcast.do_communication and reports throughput, per-message latency and allocations.
+
+    python -m srtools.test.broadcastcallback_benchmark -t colored -n 50000
+    python -m srtools.test.broadcastcallback_benchmark -s watch-xxx.srcap -r 2000
+"""
+import argparse
+import array
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+from srtools.configuration.configuration import Configuration
+from srtools.manager.api.callbacks.broadcastcallbackfactory import BroadcastCallbackFactory
+from srtools.manager.api.showroombroadcast import ShowroomBroadcast
+from srtools.manager.livesmanager import LivesManager
+from srtools.manager.roomsmanager import RoomsManager
+from srtools.test.fakebroadcastserver import FakeBroadcastServer, synthetic_stream
+from srtools.utils.capturefile import CaptureReader
+
+class TimedCallback(object):
+    """Measures the time and memory spent by a callback on every message."""
+    def __init__(self, callback, trace_memory=False):
+        self._callback = callback
+        self._trace_memory = trace_memory
+        # Nanoseconds per message, an array so the measure itself doesn't allocate objects
+        self.latencies = array.array("q")
+        self.allocated = 0
+        self._started = 0
+        self._memory = 0
+
+    def __getattr__(self, name):
+        return getattr(self._callback, name)
+
+    def new_message(self, message):
+        self._started = time.perf_counter_ns()
+        if self._trace_memory:
+            tracemalloc.reset_peak()
+            self._memory = tracemalloc.get_traced_memory()[0]
+        self._callback.new_message(message)
+
+    def process_message(self, message):
+        result = self._callback.process_message(message)
+        if self._trace_memory:
+            self.allocated += tracemalloc.get_traced_memory()[1] - self._memory
+        self.latencies.append(time.perf_counter_ns() - self._started)
+        return result
+
+def load_messages(source, count, seed):
+    """
+    Loads the messages to replay.
+    :param source: Capture file, None for a synthetic stream.
+    :type source: string
+    :param count: Amount of synthetic messages.
+    :type count: int
+    :param seed: Synthetic stream seed.
+    :type seed: int
+    :returns: Messages.
+    :rtype: string[]
+    """
+    if source is None:
+        result = synthetic_stream(count, seed)
+    else:
+        # Recorded lives end with their own end of live message, drop it and everything after
+        result = []
+        for _header, _date, message in CaptureReader(source):
+            if '"t":101' in message:
+                break
+            result.append(message)
+
+    return result
+
+def run(handler, messages, rate=0, trace_memory=False):
+    """
+    Replays the messages through the given handler.
+    :param handler: Callback alias.
+    :type handler: string
+    :param messages: Messages to replay.
+    :type messages: string[]
+    :param rate: Messages per second, 0 to send as fast as possible.
+    :type rate: int
+    :param trace_memory: Whether to measure allocations (slows down the run).
+    :type trace_memory: bool
+    :returns: Measures.
+    :rtype: dictionary
+    """
+    configuration = Configuration()
+    configuration.capture.output = None
+    server = FakeBroadcastServer(messages, rate).start()
+    try:
+        room = RoomsManager(configuration, None).create(1)
+        room.room_url_key = "benchmark"
+        room.live = LivesManager(configuration, None).create(1)
+        room.live.broadcast_host, room.live.broadcast_port = server.address
+        room.live.broadcast_key = "benchmark"
+        callback = TimedCallback(BroadcastCallbackFactory().create(handler, configuration, room),
+                                 trace_memory)
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+             contextlib.redirect_stderr(devnull):
+            if trace_memory:
+                tracemalloc.start()
+            blocks = sys.getallocatedblocks()
+            started = time.perf_counter()
+            ShowroomBroadcast(configuration, room, None).do_communication(callback)
+            elapsed = time.perf_counter() - started
+            blocks = sys.getallocatedblocks() - blocks
+            if trace_memory:
+                tracemalloc.stop()
+    finally:
+        server.stop()
+
+    latencies = sorted(callback.latencies)
+    count = len(latencies)
+    return {
+        "handler": handler,
+        "messages": count,
+        "seconds": elapsed,
+        "rate": count / elapsed if elapsed else 0,
+        "p50": latencies[count // 2] / 1000 if count else 0,
+        "p99": latencies[min(count - 1, count * 99 // 100)] / 1000 if count else 0,
+        "allocated": callback.allocated / count if count and trace_memory else None,
+        "blocks": blocks / count if count else 0
+    }
+
+def report(result):
+    """
+    Prints a benchmark result.
+    :param result: Measures returned by run.
+    :type result: dictionary
+    """
+    line = "%-10s %8d msgs %10.0f msgs/s  p50 %8.1f us  p99 %8.1f us  retained %6.2f blocks/msg" % \
+           (result["handler"], result["messages"], result["rate"], result["p50"], result["p99"],
+            result["blocks"])
+    if result["allocated"] is not None:
+        line += "  allocated %8.0f bytes/msg" % result["allocated"]
+    print(line)
+
+def main(args):
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description="Broadcast callbacks replay benchmark")
+    parser.add_argument("-t", "--type", nargs="+",
+                        default=sorted(BroadcastCallbackFactory().available_handlers),
+                        help="handlers to benchmark (default: all)")
+    parser.add_argument("-s", "--source", help="capture file to replay (default: synthetic)")
+    parser.add_argument("-n", "--count", type=int, default=20000,
+                        help="amount of synthetic messages (default: 20000)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic stream seed (default: 0)")
+    parser.add_argument("-r", "--rate", type=int, default=0,
+                        help="messages per second, 0 for unlimited (default: 0)")
+    parser.add_argument("-m", "--memory", action="store_true",
+                        help="also measure allocations per message in a separate run")
+    args = parser.parse_args(args)
+
+    messages = load_messages(args.source, args.count, args.seed)
+    for handler in args.type:
+        report(run(handler, messages, args.rate))
+        if args.memory:
+            report(run(handler, messages, args.rate, True))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
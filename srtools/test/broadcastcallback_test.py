@@ -6,6 +6,8 @@ from srtools.configuration.configuration import Configuration
 from srtools.manager.api.showroombroadcast import ShowroomBroadcast
 from srtools.manager.roomsmanager import RoomsManager
 from srtools.manager.livesmanager import LivesManager
+from srtools.test.broadcastcallback_benchmark import run
+from srtools.test.fakebroadcastserver import synthetic_stream
 
 class FakeShowroomBroadcast(ShowroomBroadcast):
     """Fake Showroom Broadcast."""
@@ -47,3 +49,76 @@ class BroadcastCallbackTest(unittest.TestCase):
 
         broadcast = FakeShowroomBroadcast(self.configuration, room, None)
         broadcast.do_communication(DefaultBroadcastCallback(self.configuration, room))
+
+class GiftsBroadcastCallback(DefaultBroadcastCallback):
+    """Only handles gifts."""
+    def __init__(self, configuration, room):
+        super(GiftsBroadcastCallback, self).__init__(configuration, room)
+        self.gifts = []
+
+    def _throw_gifts(self, _userid, _avatarid, _giftid, _quantity, _username, _showtimeline,
+                     _lon, _lat, _rad):
+        self.gifts.append((_userid, _giftid, _quantity))
+        return True
+
+class CommentsBroadcastCallback(GiftsBroadcastCallback):
+    """Only preprocesses comments."""
+    _PREPROCESSED_MESSAGES = frozenset([DefaultBroadcastCallback._MESSAGE_VIEW_COMMENT])
+
+    def __init__(self, configuration, room):
+        super(CommentsBroadcastCallback, self).__init__(configuration, room)
+        self.preprocessed = []
+
+    def _preprocess_message(self, message, code, key, value, respjson):
+        self.preprocessed.append((value, respjson.get("cm")))
+
+class BroadcastCallbackDispatchTest(unittest.TestCase):
+    """Dispatch table unit test."""
+    def setUp(self):
+        self.configuration = Configuration()
+        self.callback = GiftsBroadcastCallback(self.configuration, None)
+
+    def test_dispatch(self):
+        """Test decoded dispatch."""
+        self.assertTrue(self.callback.process_message(
+            'MSG\tkey\t{"n":10,"g":1001,"u":25,"av":1,"ac":"a","h":0,"t":2}'))
+        self.assertTrue(self.callback.process_message('MSG\tkey\t{"g":1,"u":3,"n":1,"t":"2"}'))
+        self.assertEqual([(25, 1001, 10), (3, 1, 1)], self.callback.gifts)
+
+    def test_skip_decode(self):
+        """Test that handlers not overridden don't need a valid payload."""
+        self.assertTrue(self.callback.process_message('MSG\tkey\t{"t":9,"broken'))
+        self.assertFalse(self.callback.process_message('MSG\tkey\t{"created_at":1,"a":"0","t":101}'))
+        self.assertEqual([], self.callback.gifts)
+
+    def test_preprocessed_messages(self):
+        """Test that only the preprocessed types are decoded for the preprocessor."""
+        callback = CommentsBroadcastCallback(self.configuration, None)
+        self.assertTrue(callback.process_message('MSG\tkey\t{"cm":"hi","u":1,"t":1}'))
+        self.assertTrue(callback.process_message('MSG\tkey\t{"t":9,"broken'))
+        self.assertTrue(callback.process_message('MSG\tkey\t{"g":1,"u":3,"n":1,"t":2}'))
+        self.assertEqual([(1, "hi"), (9, None), (2, None)], callback.preprocessed)
+        self.assertEqual([(3, 1, 1)], callback.gifts)
+
+    def test_peek_message_type(self):
+        """Test reading the message type without decoding."""
+        self.assertEqual(101, self.callback._peek_message_type('{"created_at":1,"t":101}'))
+        self.assertEqual(1, self.callback._peek_message_type('{"t": "1", "cm":"x"}'))
+        self.assertIsNone(self.callback._peek_message_type('{"cm":"{\\"t\\":1}"}'))
+        self.assertIsNone(self.callback._peek_message_type('{"l":[{"t":3}],"t":3}'))
+
+    def test_ack_and_err(self):
+        """Test non MSG messages."""
+        self.assertTrue(self.callback.process_message('ACK\tshowroom'))
+        self.assertTrue(self.callback.process_message('ERR'))
+
+class BroadcastCallbackBenchmarkTest(unittest.TestCase):
+    """Replay benchmark smoke test."""
+    def test_replay(self):
+        """Test a small synthetic replay through every handler."""
+        messages = synthetic_stream(200)
+        self.assertEqual(messages, synthetic_stream(200))
+        for handler in ["default", "colored", "readable"]:
+            result = run(handler, messages)
+            self.assertEqual(len(messages) + 1, result["messages"])
+            self.assertGreater(result["rate"], 0)
@@ -0,0 +1,59 @@
+"""Unit tests for BroadcastFramer."""
+import socket
+import unittest
+from srtools.manager.api.broadcastframer import BroadcastFramer
+
+class BroadcastFramerTest(unittest.TestCase):
+    """BroadcastFramer unit test."""
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_receive_lines(self):
+        """Unit test for receiving complete and partial lines."""
+        framer = BroadcastFramer(64)
+        self.sender.sendall(b"ACK\tshowroom\n\nMSG\tkey\t{\"t\":1")
+        self.assertGreater(framer.receive(self.receiver), 0)
+        self.assertEqual(["ACK\tshowroom"], list(framer.lines()))
+        self.assertEqual(len(b"MSG\tkey\t{\"t\":1"), framer.pending())
+
+        self.sender.sendall(b"}\n")
+        framer.receive(self.receiver)
+        self.assertEqual(["MSG\tkey\t{\"t\":1}"], list(framer.lines()))
+        self.assertEqual(0, framer.pending())
+
+    def test_split_utf8(self):
+        """Unit test for a multibyte character split between reads."""
+        framer = BroadcastFramer(16)
+        data = u"MSG\tkey\t{\"cm\":\"かかか\"}\n".encode("utf-8")
+        lines = []
+        for index in range(len(data)):
+            framer.feed(data[index:index + 1])
+            lines += framer.lines()
+
+        self.assertEqual([data[:-1].decode("utf-8")], lines)
+
+    def test_compact_and_grow(self):
+        """Unit test for tails crossing the end of the buffer and lines bigger than the buffer."""
+        framer = BroadcastFramer(8)
+        expected = ["a" * 5, "b" * 30, "c", "d" * 7]
+        data = ("\n".join(expected) + "\n").encode("utf-8")
+        lines = []
+        for index in range(0, len(data), 3):
+            framer.feed(data[index:index + 3])
+            lines += framer.lines()
+
+        self.assertEqual(expected, lines)
+
+    def test_closed_connection(self):
+        """Unit test for a closed connection."""
+        framer = BroadcastFramer()
+        self.sender.close()
+        self.assertEqual(0, framer.receive(self.receiver))
+        self.assertEqual([], list(framer.lines()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Unit tests for capture files."""
+import os
+import tempfile
+import time
+import unittest
+from srtools.utils.capturefile import CaptureReader, CaptureWriter, is_capture_file
+
+class CaptureFileTest(unittest.TestCase):
+    """Capture files unit test."""
+    _MESSAGES = ['MSG\tkey\t{"t":1,"cm":"こんにちは"}',
+                 'MSG\tkey\t{"t":101}']
+
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def _round_trip(self, compression):
+        """Writes and reads back the test messages."""
+        writer = CaptureWriter(self.filename, {"room_id": 1, "live_id": 2}, compression)
+        for message in self._MESSAGES:
+            writer.write(message)
+        writer.close()
+
+        self.assertTrue(is_capture_file(self.filename))
+        records = list(CaptureReader(self.filename))
+        self.assertEqual(self._MESSAGES, [x[2] for x in records])
+        self.assertEqual(1, records[0][0]["room_id"])
+        self.assertEqual(compression, records[0][0]["compression"])
+
+    def test_uncompressed(self):
+        """Unit test for an uncompressed capture."""
+        self._round_trip("none")
+
+    def test_lz4(self):
+        """Unit test for a lz4 compressed capture."""
+        self._round_trip("lz4")
+
+    def test_flush_interval(self):
+        """Unit test for pending messages written once they waited for the flush interval."""
+        writer = CaptureWriter(self.filename, {"room_id": 1}, flush_interval=0.05)
+        writer.write(self._MESSAGES[0])
+        writer.flush(False)
+        self.assertEqual([], list(CaptureReader(self.filename)))
+        time.sleep(0.05)
+        writer.flush(False)
+        self.assertEqual(self._MESSAGES[:1], [x[2] for x in CaptureReader(self.filename)])
+        writer.close()
+
+    def test_segments(self):
+        """Unit test for a capture appended by several lives."""
+        for live_id in [1, 2]:
+            writer = CaptureWriter(self.filename, {"room_id": 1, "live_id": live_id})
+            writer.write(self._MESSAGES[0])
+            writer.close()
+
+        records = list(CaptureReader(self.filename))
+        self.assertEqual([1, 2], [x[0]["live_id"] for x in records])
+
+    def test_text(self):
+        """Unit test for reading a text capture."""
+        with open(self.filename, "w", encoding="utf-8") as outputfile:
+            for message in self._MESSAGES:
+                outputfile.write("2020-01-01 00:00:00.000001\t" + message + "\n")
+
+        self.assertFalse(is_capture_file(self.filename))
+        records = list(CaptureReader(self.filename))
+        self.assertEqual(self._MESSAGES, [x[2] for x in records])
+        self.assertIsNone(records[0][0])
@@ -0,0 +1,182 @@
+"""Local broadcast server for tests and benchmarks."""
+import json
+import random
+import socketserver
+import threading
+import time
+import srtools.manager.api.message
+
+def synthetic_stream(count, seed=0):
+    """
+    Builds a deterministic stream of broadcast messages.
+    :param count: Amount of messages.
+    :type count: int
+    :param seed: Random seed, the same seed always returns the same stream.
+    :type seed: int
+    :returns: Messages without the "MSG\\tkey\\t" prefix for MSG lines, full lines otherwise.
+    :rtype: string[]
+    """
+    generator = random.Random(seed)
+    messages = []
+    for index in range(count):
+        user = generator.randint(1, 3000000)
+        kind = generator.random()
+        if kind < 0.6:
+            payload = {"cm": "コメント %s" % index, "ac": "user%s" % user, "u": user,
+                       "av": generator.randint(1, 1000), "created_at": 1500000000 + index,
+                       "t": 1}
+        elif kind < 0.9:
+            payload = {"n": generator.randint(1, 10), "g": generator.choice([1, 2, 1001, 1601]),
+                       "u": user, "av": generator.randint(1, 1000), "ac": "user%s" % user,
+                       "h": 0, "created_at": 1500000000 + index, "t": 2}
+        elif kind < 0.95:
+            payload = {"telop": "telop %s" % index, "created_at": 1500000000 + index, "t": 8}
+        elif kind < 0.98:
+            payload = {"created_at": 1500000000 + index, "t": 3}
+        elif kind < 0.99:
+            messages.append(srtools.manager.api.message.MESSAGE_HEADER_ACK + "\tshowroom")
+            continue
+        else:
+            messages.append(srtools.manager.api.message.MESSAGE_HEADER_ERR)
+            continue
+
+        messages.append(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+    return messages
+
+class FakeBroadcastServer(object):
+    """
+    Speaks the SUB/PING/QUIT protocol and streams the given messages to every subscriber.
+    """
+    _BATCH_SIZE = 256
+    _END_LIVE = '{"created_at":1500000000,"a":"0","t":101}'
+
+    class _Server(socketserver.ThreadingTCPServer):
+        """Accepts bursts of concurrent subscribers."""
+        request_queue_size = 128
+        daemon_threads = True
+
+    class _Handler(socketserver.StreamRequestHandler):
+        """Handles a single subscriber."""
+        def handle(self):
+            owner = self.server.owner
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+
+                fields = line.decode("utf-8").rstrip("\n").split("\t")
+                if fields[0] == srtools.manager.api.message.MESSAGE_HEADER_SUB:
+                    owner.subscriptions.append(fields[1])
+                    if not owner.subscribe(self.wfile, fields[1]):
+                        break
+                elif fields[0] == srtools.manager.api.message.MESSAGE_HEADER_PING:
+                    self.wfile.write(b"ACK\tshowroom\n")
+                elif fields[0] == srtools.manager.api.message.MESSAGE_HEADER_QUIT:
+                    owner.quits += 1
+                    break
+
+    def __init__(self, messages, rate=0, end_live=True, latency=0, error_rate=0, seed=0):
+        """
+        :param messages: Messages to stream, MSG payloads or full lines.
+        :type messages: string[]
+        :param rate: Messages per second, 0 to send as fast as possible.
+        :type rate: int
+        :param end_live: Whether to end the stream with an end of live message.
+        :type end_live: bool
+        :param latency: Seconds to wait before answering a subscription.
+        :type latency: float
+        :param error_rate: Probability of answering a subscription with ERR and disconnecting.
+        :type error_rate: float
+        :param seed: Seed for the error injection.
+        :type seed: int
+        """
+        self.messages = messages
+        self.rate = rate
+        self.end_live = end_live
+        self.latency = latency
+        self.error_rate = error_rate
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.subscriptions = []
+        self.quits = 0
+        self._server = None
+
+    @property
+    def address(self):
+        """
+        Address where the server is listening.
+        :returns: Host and port.
+        :rtype: tuple
+        """
+        return self._server.server_address
+
+    def _encode(self, key):
+        """Encodes the stream for the given subscription key."""
+        prefix = srtools.manager.api.message.MESSAGE_HEADER_MSG + "\t%s\t" % key
+        lines = [x if x.startswith(("ACK", "ERR", "MSG\t")) else prefix + x
+                 for x in self.messages]
+        if self.end_live:
+            lines.append(prefix + self._END_LIVE)
+
+        return [(x + "\n").encode("utf-8") for x in lines]
+
+    def subscribe(self, output, key):
+        """
+        Answers a subscription.
+        :param output: Subscriber stream.
+        :type output: file
+        :param key: Subscription key.
+        :type key: string
+        :returns: False if an error was injected and the connection must be closed.
+        :rtype: bool
+        """
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+
+        if failed:
+            output.write((srtools.manager.api.message.MESSAGE_HEADER_ERR + "\n").encode("utf-8"))
+        else:
+            self.stream(output, key)
+
+        return not failed
+
+    def stream(self, output, key):
+        """
+        Sends the messages to a subscriber.
+        :param output: Subscriber stream.
+        :type output: file
+        :param key: Subscription key.
+        :type key: string
+        """
+        lines = self._encode(key)
+        if self.rate > 0:
+            started = time.monotonic()
+            for index, line in enumerate(lines):
+                delay = started + index / self.rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                output.write(line)
+        else:
+            for index in range(0, len(lines), self._BATCH_SIZE):
+                output.write(b"".join(lines[index:index + self._BATCH_SIZE]))
+
+    def start(self):
+        """Starts listening in a background thread."""
+        self._server = self._Server(("127.0.0.1", 0), self._Handler)
+        self._server.owner = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,434 @@
+"""
+Local stand-in for the SHOWROOM web site, for offline tests and load benchmarks.
+
+Serves the endpoints used by _ShowroomWebService from deterministic synthetic fixtures (which
+can be overridden per path), with configurable latency and error injection. Point the tools to
+it with the connection base url:
+
+    python -m srtools.test.fakeshowroomserver --rooms 500 --latency 0.05
+    main.py track --base-url http://127.0.0.1:[port] --cookies none -r 1000 1001 -d 10
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from srtools.test.fakebroadcastserver import FakeBroadcastServer, synthetic_stream
+
+class FakeShowroomServer(object):
+    """HTTP server answering like SHOWROOM."""
+    _GENRES = [(101, "Idol"), (102, "Talent Model"), (103, "Music"), (200, "Amateur")]
+    FIRST_ROOM_ID = 1000
+    FIRST_LIVE_ID = 10000000
+    CSRF_TOKEN = "fakecsrftoken"
+
+    class _Server(ThreadingHTTPServer):
+        """Accepts bursts of concurrent connections."""
+        request_queue_size = 128
+        daemon_threads = True
+
+    class _Handler(BaseHTTPRequestHandler):
+        """Handles a single request."""
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super(FakeShowroomServer._Handler, self).setup()
+            with self.server.owner._lock:
+                self.server.owner.connections += 1
+
+        def _reply(self):
+            url = urlsplit(self.path)
+            params = {x: y[-1] for x, y in parse_qs(url.query).items()}
+            if self.command == "POST":
+                size = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(size).decode("utf-8", "replace")
+                params.update({x: y[-1] for x, y in parse_qs(body).items()})
+
+            status, body, content_type = self.server.owner.answer(self.command, url.path, params)
+            data = body.encode("utf-8")
+            self.send_response(status)
+            if status in (429, 503) and self.server.owner.retry_after is not None:
+                self.send_header("Retry-After", str(self.server.owner.retry_after))
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            """Answers a GET request."""
+            self._reply()
+
+        def do_POST(self):
+            """Answers a POST request."""
+            self._reply()
+
+        def log_message(self, *args):
+            """Silences the request log."""
+            pass
+
+    def __init__(self, rooms=50, live_ratio=0.5, latency=0, jitter=0, error_rate=0,
+                 error_status=503, seed=0, fixtures=None, broadcast=None):
+        """
+        :param rooms: Amount of synthetic rooms.
+        :type rooms: int
+        :param live_ratio: Ratio of rooms currently broadcasting.
+        :type live_ratio: float
+        :param latency: Seconds to wait before answering every request.
+        :type latency: float
+        :param jitter: Maximum random seconds added to the latency.
+        :type jitter: float
+        :param error_rate: Probability of answering with error_status instead.
+        :type error_rate: float
+        :param error_status: HTTP status of injected errors.
+        :type error_status: int
+        :param seed: Seed for fixtures, jitter and error injection.
+        :type seed: int
+        :param fixtures: Replies by path (JSON-compatible value, or a function taking the
+                         query parameters), or a directory with files named after the path
+                         (/api/live/live_info -> api.live.live_info.json).
+        :type fixtures: dictionary or string
+        :param broadcast: Broadcast server for the live rooms, None to not stream anything.
+        :type broadcast: FakeBroadcastServer
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Seconds asked to wait by the injected 429 and 503 replies, None to not ask
+        self.retry_after = None
+        self.broadcast = broadcast
+        self.hits = Counter()
+        self.errors = 0
+        # Accepted connections, kept alive between requests
+        self.connections = 0
+        self.fixtures = self._load_fixtures(fixtures)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._routes = {
+            "/": self._index,
+            "/api/live/onlives": self._onlives,
+            "/api/live/onlive_num": self._onlive_num,
+            "/room/is_live": self._is_live,
+            "/api/live/live_info": self._live_info,
+            "/api/room/profile": self._room_profile,
+            "/api/room/status": self._status,
+            "/api/room/next_live": self._next_live,
+            "/api/time_table/time_tables": self._time_tables,
+            "/api/live/current_user": self._current_user,
+            "/api/live/polling": self._polling,
+            "/api/live/telop": self._telop,
+            "/api/live/gifting_free": self._gifting_free
+        }
+        self._empty_replies = {
+            "/api/live/summary_ranking": {"ranking": []},
+            "/api/live/stage_user_list": {"stage_user_list": []},
+            "/api/anteroom/stage_user_list": {"stage_user_list": []},
+            "/api/live/stage_gift_list": {"stage_gift_list": []},
+            "/api/live/gift_list": {"normal": [], "enquete": []},
+            "/api/live/gift_log": {"gift_log": []},
+            "/api/live/comment_log": {"comment_log": []},
+            "/api/live/enquete_result": {},
+            "/api/room/event_and_support": {"event": None, "support": None},
+            "/api/room/settings": {},
+            "/api/room/banners": {"banners": []},
+            "/api/room/image_and_voice": {"images": [], "voices": []},
+            "/api/room/recommend_comments": {"comments": []},
+            "/api/anteroom/comments": {"comments": []},
+            "/room/user_profile": {}
+        }
+        self.rooms = self._create_rooms(rooms, live_ratio, random.Random(seed))
+
+    def _load_fixtures(self, fixtures):
+        """
+        Loads the fixtures overriding the synthetic replies.
+        :param fixtures: Fixtures by path, or directory with JSON files.
+        :type fixtures: dictionary or string
+        :returns: Fixtures by path.
+        :rtype: dictionary
+        """
+        if isinstance(fixtures, str):
+            result = {}
+            for filename in os.listdir(fixtures):
+                if filename.endswith(".json"):
+                    with open(os.path.join(fixtures, filename), encoding="utf-8") as inputfile:
+                        result["/" + filename[:-len(".json")].replace(".", "/")] = \
+                            json.load(inputfile)
+        else:
+            result = dict(fixtures or {})
+
+        return result
+
+    def _create_rooms(self, count, live_ratio, generator):
+        """
+        Creates the synthetic rooms.
+        :returns: Rooms by id.
+        :rtype: dictionary
+        """
+        rooms = {}
+        for index in range(count):
+            room_id = self.FIRST_ROOM_ID + index
+            genre_id, genre_name = self._GENRES[index % len(self._GENRES)]
+            rooms[room_id] = {
+                "room_id": room_id,
+                "room_url_key": "room%s" % room_id,
+                "main_name": "Room %s" % room_id,
+                "genre_id": genre_id,
+                "genre_name": genre_name,
+                "official_lv": 0 if genre_id == 200 else 1,
+                "live_id": self.FIRST_LIVE_ID + index if generator.random() < live_ratio else 0,
+                "follower_num": generator.randint(0, 100000),
+                "view_num": generator.randint(0, 20000),
+                "point": 0,
+                "started_at": 1500000000 + index
+            }
+
+        return rooms
+
+    def live_rooms(self):
+        """
+        Returns the rooms currently broadcasting.
+        :returns: Room fixtures.
+        :rtype: dictionary[]
+        """
+        return [x for x in self.rooms.values() if x["live_id"]]
+
+    def _room(self, params):
+        """Returns the room requested by room_id or room_url_key."""
+        try:
+            result = self.rooms.get(int(params.get("room_id")))
+        except (TypeError, ValueError):
+            result = next((x for x in self.rooms.values()
+                           if x["room_url_key"] == params.get("room_url_key")), None)
+
+        return result
+
+    def _broadcast(self, room):
+        """Returns the broadcast information of a live room."""
+        if self.broadcast is not None:
+            host, port = self.broadcast.address
+        else:
+            host, port = "127.0.0.1", 0
+
+        return {"bcsvr_host": host, "bcsvr_port": port,
+                "bcsvr_key": "%x:fake%s" % (room["live_id"], room["room_id"])}
+
+    def _index(self, _params):
+        return '<input type="hidden" name="csrf_token" value="%s" />' % self.CSRF_TOKEN
+
+    def _onlives(self, _params):
+        genres = {}
+        for room in self.live_rooms():
+            live = {
+                "room_id": room["room_id"],
+                "live_id": room["live_id"],
+                "room_url_key": room["room_url_key"],
+                "main_name": room["main_name"],
+                "official_lv": room["official_lv"],
+                "follower_num": room["follower_num"],
+                "view_num": room["view_num"],
+                "started_at": room["started_at"],
+                "cell_type": 102,
+                "is_follow": False,
+                "image": "",
+                "tags": [],
+                "live_type": 0,
+                "bcsvr_key": self._broadcast(room)["bcsvr_key"]
+            }
+            genre = genres.setdefault(room["genre_id"], {"genre_id": room["genre_id"],
+                                                         "genre_name": room["genre_name"],
+                                                         "lives": []})
+            genre["lives"].append(live)
+
+        return {"onlives": list(genres.values()), "bcsvr_host": "127.0.0.1"}
+
+    def _onlive_num(self, _params):
+        return {"num": len(self.live_rooms())}
+
+    def _is_live(self, params):
+        room = self._room(params)
+        return {"ok": 1 if room is not None and room["live_id"] else 0}
+
+    def _live_info(self, params):
+        room = self._room(params)
+        if room is None:
+            result = {"errors": [{"error_user_msg": "Room not found", "code": 1}]}
+        elif room["live_id"]:
+            result = {"live_id": room["live_id"], "room_id": room["room_id"],
+                      "room_name": room["main_name"], "live_status": 2, "is_enquete": False,
+                      "telop": "", "online_user_num": room["view_num"],
+                      "age_verification_status": 0, "video_type": 0,
+                      "room": {"room_id": room["room_id"], "room_name": room["main_name"],
+                               "follower_num": room["follower_num"],
+                               "popularity_point": room["point"]},
+                      "live_res": {"view_uu": room["view_num"]}}
+            result.update(self._broadcast(room))
+        else:
+            result = {"live_id": 0, "room_id": room["room_id"], "room_name": room["main_name"],
+                      "live_status": 1, "is_enquete": False, "telop": "",
+                      "bcsvr_host": "", "bcsvr_port": 0, "bcsvr_key": ""}
+
+        return result
+
+    def _room_profile(self, params):
+        room = self._room(params) or {}
+        return {"room_id": room.get("room_id"), "room_name": room.get("main_name"),
+                "room_url_key": room.get("room_url_key"),
+                "follower_num": room.get("follower_num"), "is_onlive": bool(room.get("live_id")),
+                "live_id": room.get("live_id"), "view_num": room.get("view_num")}
+
+    def _status(self, params):
+        room = self._room(params) or {}
+        return {"room_id": room.get("room_id"), "room_url_key": room.get("room_url_key"),
+                "is_live": bool(room.get("live_id")), "live_id": room.get("live_id")}
+
+    def _next_live(self, params):
+        room = self._room(params)
+        if room is not None and not room["live_id"]:
+            result = {"epoch": int(time.time()) + 3600, "text": "next live"}
+        else:
+            result = {"epoch": None, "text": "未定"}
+
+        return result
+
+    def _time_tables(self, _params):
+        now = int(time.time())
+        return {"time_tables": [{"room_id": x["room_id"], "room_url_key": x["room_url_key"],
+                                 "main_name": x["main_name"], "started_at": now + 3600 * index}
+                                for index, x in enumerate(self.rooms.values())
+                                if not x["live_id"]]}
+
+    def _current_user(self, params):
+        room = self._room(params) or {}
+        return {"user_id": 1, "name": "fake", "avatar_id": 1, "room_id": room.get("room_id"),
+                "is_login": True, "gift_list": {"normal": []}}
+
+    def _polling(self, params):
+        room = self._room(params)
+        if room is not None and room["live_id"]:
+            result = {"live_watch_incentive": {}, "online_user_num": room["view_num"]}
+        else:
+            result = {"invalid": 1}
+
+        return result
+
+    def _telop(self, params):
+        room = self._room(params) or {}
+        return {"telop": "telop %s" % room.get("room_id")}
+
+    def _gifting_free(self, params):
+        return {"ok": 1, "fan_level": {"fan_level": 1, "contribution_point": 1},
+                "notify_level_up": False, "gift_id": params.get("gift_id"), "remaining_num": 0}
+
+    def answer(self, method, path, params):
+        """
+        Builds the reply for a request.
+        :param method: "GET" or "POST".
+        :type method: string
+        :param path: Requested path.
+        :type path: string
+        :param params: Query and form parameters.
+        :type params: dictionary
+        :returns: Status, body and content type.
+        :rtype: tuple
+        """
+        with self._lock:
+            self.hits[path] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+
+        if delay > 0:
+            time.sleep(delay)
+
+        status = 200
+        if failed:
+            status = self.error_status
+            body = {"errors": [{"error_user_msg": "Injected error", "code": status}]}
+        elif path in self.fixtures:
+            body = self.fixtures[path]
+            if callable(body):
+                body = body(params)
+        elif path in self._routes:
+            body = self._routes[path](params)
+        elif path in self._empty_replies:
+            body = self._empty_replies[path]
+        elif method == "POST":
+            body = {"ok": 1}
+        else:
+            status = 404
+            body = {"errors": [{"error_user_msg": "Not found", "code": 404}]}
+
+        if isinstance(body, str):
+            result = (status, body, "text/html; charset=utf-8")
+        else:
+            result = (status, json.dumps(body, ensure_ascii=False), "application/json")
+
+        return result
+
+    @property
+    def base_url(self):
+        """
+        Url to set in the connection configuration.
+        :returns: The base url of the server.
+        :rtype: string
+        """
+        return "http://%s:%s" % self._server.server_address[:2]
+
+    def start(self, port=0):
+        """Starts listening in a background thread."""
+        self._server = self._Server(("127.0.0.1", port), self._Handler)
+        self._server.owner = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def main():
+    """Runs the stand-in servers until interrupted."""
+    parser = argparse.ArgumentParser(description="Local SHOWROOM stand-in")
+    parser.add_argument("-p", "--port", type=int, default=0, help="HTTP port (default: any)")
+    parser.add_argument("--rooms", type=int, default=50, help="synthetic rooms (default: 50)")
+    parser.add_argument("--live-ratio", type=float, default=0.5,
+                        help="ratio of live rooms (default: 0.5)")
+    parser.add_argument("--latency", type=float, default=0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0, help="random extra seconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="injected error ratio")
+    parser.add_argument("--error-status", type=int, default=503, help="injected error status")
+    parser.add_argument("--seed", type=int, default=0, help="fixtures and injection seed")
+    parser.add_argument("--fixtures", help="directory with JSON fixtures overriding replies")
+    parser.add_argument("--messages", type=int, default=1000,
+                        help="synthetic broadcast messages per subscription (default: 1000)")
+    parser.add_argument("--rate", type=int, default=10,
+                        help="broadcast messages per second (default: 10)")
+    args = parser.parse_args()
+
+    broadcast = FakeBroadcastServer(synthetic_stream(args.messages, args.seed), args.rate,
+                                    latency=args.latency, error_rate=args.error_rate,
+                                    seed=args.seed).start()
+    server = FakeShowroomServer(args.rooms, args.live_ratio, args.latency, args.jitter,
+                                args.error_rate, args.error_status, args.seed, args.fixtures,
+                                broadcast).start(args.port)
+    print("Serving %s rooms (%s live) at %s, broadcast at %s:%s" %
+          (len(server.rooms), len(server.live_rooms()), server.base_url, *broadcast.address))
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        broadcast.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Unit tests for the local SHOWROOM stand-in."""
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from srtools.configuration.configuration import Configuration
+from srtools.manager.api.asyncshowroomapi import AsyncShowroomAPI, aiohttp
+from srtools.manager.api.callbacks.defaultbroadcastcallback import DefaultBroadcastCallback
+from srtools.manager.api.showroomapi import ShowroomAPI
+from srtools.manager.api.showroombroadcast import ShowroomBroadcast
+from srtools.manager.showroommanager import ShowroomManager
+from srtools.test.fakebroadcastserver import FakeBroadcastServer, synthetic_stream
+from srtools.test.fakeshowroomserver import FakeShowroomServer
+from srtools.utils.parallel import Parallel
+
+class FakeShowroomServerTest(unittest.TestCase):
+    """Runs the SHOWROOM API against the local stand-in."""
+    def setUp(self):
+        self.broadcast = FakeBroadcastServer(synthetic_stream(50)).start()
+        self.server = FakeShowroomServer(rooms=20, broadcast=self.broadcast).start()
+        self.configuration = Configuration()
+        self.configuration.connection.cookies = None
+        self.configuration.connection.base_url = self.server.base_url
+        # Replies change during the tests
+        self.configuration.connection.cache_ttls = {}
+        self.configuration.capture.output = None
+
+    def tearDown(self):
+        self.server.stop()
+        self.broadcast.stop()
+
+    def test_onlives(self):
+        """Test initializing the managers from onlives."""
+        showroom_manager = ShowroomManager(self.configuration)
+        rooms = showroom_manager.rooms_manager.rooms()
+        self.assertEqual(sorted(x["room_id"] for x in self.server.live_rooms()),
+                         sorted(x.room_id for x in rooms))
+        self.assertEqual(1, self.server.hits["/api/live/onlives"])
+
+    def test_onlives_snapshot(self):
+        """Test APIs sharing a snapshot fetch the onlives once."""
+        with tempfile.TemporaryDirectory() as directory:
+            self.configuration.connection.snapshot = os.path.join(directory, "onlives")
+            onlives = ShowroomAPI(self.configuration).get_onlives()
+            showroom_api = ShowroomAPI(self.configuration)
+            self.assertEqual(onlives, showroom_api.get_onlives())
+            self.assertEqual(1, self.server.hits["/api/live/onlives"])
+
+            showroom_api.invalidate_onlives()
+            self.assertEqual(onlives, showroom_api.get_onlives())
+            self.assertEqual(2, self.server.hits["/api/live/onlives"])
+
+    def test_live_data_and_broadcast(self):
+        """Test getting live data and capturing its broadcast."""
+        showroom_manager = ShowroomManager(self.configuration)
+        room = showroom_manager.rooms_manager.rooms()[0]
+        live = showroom_manager.showroom_api.get_live_data(room, showroom_manager.lives_manager)
+        self.assertEqual(room.live.live_id, live.live_id)
+        self.assertEqual(self.broadcast.address[1], live.broadcast_port)
+
+        room.live = live
+        ShowroomBroadcast(self.configuration, room, None).do_communication(
+            DefaultBroadcastCallback(self.configuration, room))
+        self.assertEqual([live.broadcast_key], self.broadcast.subscriptions)
+
+    def test_live_data_single_request(self):
+        """Test that live_info alone tells whether the room is online."""
+        showroom_manager = ShowroomManager(self.configuration)
+        for fixture in self.server.rooms.values():
+            room = showroom_manager.rooms_manager.create(fixture["room_id"])
+            live = showroom_manager.showroom_api.get_live_data(room,
+                                                               showroom_manager.lives_manager)
+            self.assertEqual(fixture["live_id"] or None, live.live_id if live else None)
+
+        self.assertEqual(len(self.server.rooms), self.server.hits["/api/live/live_info"])
+        self.assertEqual(0, self.server.hits["/room/is_live"])
+
+        # Replies without live_status nor live_id fall back to is_live
+        self.server.fixtures["/api/live/live_info"] = {"room_id": 1}
+        room = showroom_manager.rooms_manager.create(self.server.live_rooms()[0]["room_id"])
+        self.assertIsNone(showroom_manager.showroom_api.get_live_data(
+            room, showroom_manager.lives_manager))
+        self.assertEqual(1, self.server.hits["/room/is_live"])
+
+    def test_connection_pool(self):
+        """Test requests reuse the pooled connections, and forked children get their own."""
+        self.configuration.connection.pool_size = 4
+        showroom_manager = ShowroomManager(self.configuration)
+        rooms = showroom_manager.rooms_manager.rooms()
+        parallel = Parallel(8)
+        for index, room in enumerate(rooms * 3):
+            parallel.add_task(index, showroom_manager.showroom_api.get_live_data, room,
+                              showroom_manager.lives_manager)
+        parallel.get_results()
+        self.assertLessEqual(self.server.connections, 4)
+
+        connections = self.server.connections
+        showroom_manager.showroom_api.connections_manager.reset_connections()
+        showroom_manager.showroom_api.get_live_data(rooms[0], showroom_manager.lives_manager)
+        self.assertEqual(connections + 1, self.server.connections)
+
+    @unittest.skipIf(aiohttp is None, "aiohttp not available")
+    def test_async_api(self):
+        """Test the asynchronous API answers like the blocking one."""
+        showroom_manager = ShowroomManager(self.configuration)
+        fixture = self.server.live_rooms()[0]
+        room = showroom_manager.rooms_manager.find(fixture["room_id"])
+        offline = showroom_manager.rooms_manager.create(
+            next(x for x in self.server.rooms.values() if not x["live_id"])["room_id"])
+
+        async def query():
+            async with AsyncShowroomAPI(self.configuration) as showroom_api:
+                return await asyncio.gather(
+                    showroom_api.get_onlives(), showroom_api.get_onlive_num(),
+                    showroom_api.is_online(room.room_id), showroom_api.get_room_profile(room),
+                    showroom_api.get_next_live(room.room_id), showroom_api.get_telop(room),
+                    showroom_api.get_live_data(room, showroom_manager.lives_manager),
+                    showroom_api.get_live_data(offline, showroom_manager.lives_manager))
+
+        results = asyncio.run(query())
+        showroom_api = showroom_manager.showroom_api
+        self.assertEqual(showroom_api.get_onlives(), results[0])
+        self.assertEqual([showroom_api.get_onlive_num(), True,
+                          showroom_api.get_room_profile(room),
+                          showroom_api.get_next_live(room.room_id), showroom_api.get_telop(room)],
+                         results[1:6])
+        self.assertEqual(fixture["live_id"], results[6].live_id)
+        self.assertEqual(self.broadcast.address[1], results[6].broadcast_port)
+        self.assertIsNone(results[7])
+
+    def test_response_cache(self):
+        """Test read-only replies are reused until they expire or are invalidated."""
+        self.configuration.connection.cache_ttls = {"/api/room/profile": 60}
+        showroom_api = ShowroomAPI(self.configuration)
+        room = ShowroomManager(self.configuration).rooms_manager.rooms()[0]
+        profile = showroom_api.get_room_profile(room)
+        self.assertEqual(profile, showroom_api.get_room_profile(room))
+        self.assertEqual(1, self.server.hits["/api/room/profile"])
+        showroom_api.get_telop(room)
+        showroom_api.get_telop(room)
+        self.assertEqual(2, self.server.hits["/api/live/telop"])
+
+        cache = showroom_api.connections_manager.cache
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        showroom_api.connections_manager.invalidate(showroom_api.API_ROOM_PROFILE)
+        self.assertEqual(profile, showroom_api.get_room_profile(room))
+        self.assertEqual(2, self.server.hits["/api/room/profile"])
+
+    def test_single_flight(self):
+        """Test identical concurrent requests reach the server once."""
+        self.server.latency = 0.2
+        showroom_manager = ShowroomManager(self.configuration)
+        rooms = showroom_manager.rooms_manager.rooms()[:2]
+        parallel = Parallel(10)
+        for index in range(10):
+            parallel.add_task(index, showroom_manager.showroom_api.get_room_profile,
+                              rooms[index % 2])
+        results = parallel.get_results()
+
+        self.assertEqual(2, self.server.hits["/api/room/profile"])
+        self.assertEqual([results[0]] * 5, [results[x] for x in range(0, 10, 2)])
+        self.assertEqual(8, showroom_manager.showroom_api.connections_manager.single_flight.shared)
+
+    def test_offline_room(self):
+        """Test a room that isn't broadcasting."""
+        room_id = next(x for x in self.server.rooms.values() if not x["live_id"])["room_id"]
+        self.assertFalse(ShowroomAPI(self.configuration).is_online(room_id))
+
+    def test_get_live(self):
+        """Test the live of a room is only evicted once it's offline or on a new live."""
+        self.configuration.connection.retries = 1
+        showroom_manager = ShowroomManager(self.configuration)
+        lives_manager = showroom_manager.lives_manager
+        fixture = self.server.live_rooms()[0]
+        room = showroom_manager.rooms_manager.find(fixture["room_id"])
+        showroom_api = showroom_manager.showroom_api
+        room.live = lives_manager.Live(fixture["live_id"])
+        live = showroom_api.get_live(room, lives_manager)
+        self.assertEqual(fixture["live_id"], live.live_id)
+        self.assertIs(live, lives_manager.find(fixture["live_id"]))
+
+        self.server.error_rate = 1
+        self.assertIsNone(showroom_api.get_live(room, lives_manager))
+        self.assertIs(live, room.live)
+        self.assertIs(live, lives_manager.find(fixture["live_id"]))
+
+        self.server.error_rate = 0
+        fixture["live_id"] = 0
+        self.assertIsNone(showroom_api.get_live(room, lives_manager))
+        self.assertIsNone(room.live)
+        self.assertIsNone(lives_manager.find(live.live_id))
+
+    def test_get_live_data(self):
+        """Test the live of a room is only ended once the room is known to be offline."""
+        self.configuration.connection.retries = 1
+        showroom_manager = ShowroomManager(self.configuration)
+        lives_manager = showroom_manager.lives_manager
+        fixture = self.server.live_rooms()[0]
+        room = showroom_manager.rooms_manager.find(fixture["room_id"])
+        showroom_api = showroom_manager.showroom_api
+        live = showroom_api.get_live_data(room, lives_manager)
+        self.assertIs(live, lives_manager.find(fixture["live_id"]))
+
+        self.server.error_rate = 1
+        self.assertIsNone(showroom_api.get_live_data(room, lives_manager))
+        self.assertIs(live, lives_manager.find(fixture["live_id"]))
+
+        self.server.error_rate = 0
+        fixture["live_id"] = 0
+        self.assertIsNone(showroom_api.get_live_data(room, lives_manager))
+        self.assertIsNone(lives_manager.find(live.live_id))
+
+    def test_error_injection(self):
+        """Test injected errors are retried after a backoff."""
+        self.configuration.connection.backoff = 0.01
+        self.server.error_rate = 1
+        room_id = self.server.live_rooms()[0]["room_id"]
+        self.assertFalse(ShowroomAPI(self.configuration).is_online(room_id))
+        self.assertEqual(self.configuration.connection.retries, self.server.errors)
+
+    def test_retry_after(self):
+        """Test the seconds asked by a throttling server are waited."""
+        self.server.error_rate = 1
+        self.server.error_status = 429
+        self.server.retry_after = 0.2
+        room_id = self.server.live_rooms()[0]["room_id"]
+        showroom_api = ShowroomAPI(self.configuration)
+        start = time.monotonic()
+        self.assertFalse(showroom_api.is_online(room_id))
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+        self.assertEqual(3, self.server.errors)
+        self.assertFalse(showroom_api.connections_manager.forbidden)
+
+    def test_post_retries(self):
+        """Test POST is only resent when the server asks for it with 429 and Retry-After."""
+        self.configuration.connection.rate_limits = {}
+        self.server.error_rate = 1
+        self.server.error_status = 503
+        connections_manager = ShowroomAPI(self.configuration).connections_manager
+        url = ShowroomAPI.API_GIFTING_FREE
+        self.assertEqual(503, connections_manager.post(url, data={}).status_code)
+        self.assertEqual(1, self.server.errors)
+
+        self.server.error_status = 429
+        connections_manager.post(url, data={})
+        self.assertEqual(2, self.server.errors)
+
+        self.server.retry_after = 0.01
+        connections_manager.post(url, data={})
+        self.assertEqual(2 + self.configuration.connection.retries, self.server.errors)
+
+    def test_circuit_breaker(self):
+        """Test requests stop once forbidden, and resume after a successful trial."""
+        self.configuration.connection.breaker_cooldown = 0.2
+        self.server.error_rate = 1
+        self.server.error_status = 403
+        room_id = self.server.live_rooms()[0]["room_id"]
+        showroom_api = ShowroomAPI(self.configuration)
+        self.assertFalse(showroom_api.is_online(room_id))
+        self.assertFalse(showroom_api.is_online(room_id))
+        self.assertEqual(1, self.server.errors)
+        self.assertTrue(showroom_api.connections_manager.forbidden)
+
+        self.server.error_rate = 0
+        time.sleep(0.2)
+        self.assertTrue(showroom_api.is_online(room_id))
+        self.assertFalse(showroom_api.connections_manager.forbidden)
+
+if __name__ == '__main__':
+    unittest.main()
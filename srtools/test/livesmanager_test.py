@@ -0,0 +1,60 @@
+"""Unit tests for LivesManager."""
+import unittest
+from srtools.configuration.configuration import Configuration
+from srtools.manager.livesmanager import LivesManager
+
+class LivesManagerTest(unittest.TestCase):
+    """Lives decoded from live_info and evicted once ended."""
+    def setUp(self):
+        self.lives_manager = LivesManager(Configuration(), None)
+
+    @staticmethod
+    def _live_info(live_id, room_id, **values):
+        """Builds a live_info reply."""
+        result = {"live_id": live_id, "room_id": room_id, "bcsvr_host": "localhost",
+                  "bcsvr_port": 8080, "bcsvr_key": "key%s" % live_id, "is_enquete": False,
+                  "room": {"room_name": "room%s" % room_id}}
+        result.update(values)
+        return result
+
+    def test_decode(self):
+        """Test attributes read from the payload and overridden by assignments."""
+        live = self.lives_manager.create(1)
+        self.assertIsNone(live.broadcast_host)
+        self.assertEqual('', live.tweet_default)
+
+        self.lives_manager.refresh(live, self._live_info(1, 10, telop="hello"))
+        self.assertEqual(("localhost", 8080, "key1"),
+                         (live.broadcast_host, live.broadcast_port, live.broadcast_key))
+        self.assertEqual("hello", live.telop)
+        self.assertIsNone(live.gift_list)
+        self.assertEqual("room10 broadcasting!", live.tweet_default)
+
+        live.broadcast_key = "other"
+        self.assertEqual("other", live.broadcast_key)
+        self.lives_manager.refresh(live, self._live_info(1, 10, tweet_default="tweet"))
+        self.assertEqual("key1", live.broadcast_key)
+        self.assertEqual("tweet", live.tweet_default)
+
+        with self.assertRaises(AttributeError):
+            live.unknown = 1
+        self.assertFalse(hasattr(live, "__dict__"))
+
+    def test_evict(self):
+        """Test ended lives are removed."""
+        first = self.lives_manager.create(1)
+        self.lives_manager.refresh(first, self._live_info(1, 10))
+        other = self.lives_manager.create(2)
+        self.lives_manager.refresh(other, self._live_info(2, 20))
+
+        second = self.lives_manager.create(3)
+        self.lives_manager.refresh(second, self._live_info(3, 10))
+        self.assertIsNone(self.lives_manager.find(1))
+        self.assertIs(second, self.lives_manager.find(3))
+
+        self.assertIs(other, self.lives_manager.end(20))
+        self.assertIsNone(self.lives_manager.end(20))
+        self.assertEqual([3], list(self.lives_manager.lives))
+
+if __name__ == '__main__':
+    unittest.main()
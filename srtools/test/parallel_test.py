@@ -0,0 +1,62 @@
+"""Unit tests for the threading utilities."""
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError
+from srtools.utils.parallel import Executor, Parallel
+
+def fail(value):
+    """Raises for odd values."""
+    if value % 2:
+        raise ValueError(value)
+    return value
+
+class ExecutorTest(unittest.TestCase):
+    """Bounded executor."""
+    def setUp(self):
+        self.executor = Executor(4, idle_timeout=0.1)
+
+    def tearDown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def test_map(self):
+        """Test results keep the order of the arguments and exceptions are raised."""
+        self.assertEqual([0, 2, 4], list(self.executor.map(fail, [0, 2, 4])))
+        with self.assertRaises(ValueError):
+            list(self.executor.map(fail, [0, 1, 2]))
+
+    def test_as_completed(self):
+        """Test results are streamed as they finish."""
+        submitted = [self.executor.submit(time.sleep, x) for x in [0.2, 0]]
+        self.assertEqual(submitted[::-1], list(Executor.as_completed(submitted)))
+
+    def test_timeout_and_cancel(self):
+        """Test waiting is bounded and queued tasks can be cancelled."""
+        event = threading.Event()
+        running = [self.executor.submit(event.wait) for _ in range(4)]
+        queued = self.executor.submit(fail, 0)
+        with self.assertRaises(TimeoutError):
+            list(self.executor.map(fail, [0], timeout=0.05))
+        self.assertTrue(queued.cancel())
+        event.set()
+        self.assertEqual([True] * 4, [x.result(1) for x in running])
+        self.assertTrue(queued.cancelled())
+
+    def test_idle_workers(self):
+        """Test workers are reused, bounded and end when idle."""
+        for _ in range(3):
+            list(self.executor.map(time.sleep, [0.01] * 10))
+            self.assertLessEqual(self.executor.workers, 4)
+        time.sleep(0.3)
+        self.assertEqual(0, self.executor.workers)
+        self.assertEqual([0], list(self.executor.map(fail, [0])))
+
+    def test_parallel(self):
+        """Test batches collect results by task id, leaving failed tasks out."""
+        parallel = Parallel(executor=self.executor)
+        for index in range(4):
+            parallel.add_task(index, fail, index)
+        self.assertEqual({0: 0, 2: 2}, parallel.get_results())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Unit tests for the request rate control."""
+import random
+import time
+import unittest
+from email.utils import formatdate
+from srtools.utils.ratelimit import CircuitBreaker, TokenBucket, backoff_delay, parse_retry_after
+
+class TokenBucketTest(unittest.TestCase):
+    """Sustained rate with bursts."""
+    def test_reserve(self):
+        """Test the burst is free and the rest waits for the rate."""
+        bucket = TokenBucket(10, 2)
+        self.assertEqual([0, 0], [bucket.reserve(), bucket.reserve()])
+        self.assertAlmostEqual(0.1, bucket.reserve(), delta=0.02)
+        self.assertAlmostEqual(0.2, bucket.reserve(), delta=0.02)
+
+class BackoffTest(unittest.TestCase):
+    """Jittered exponential backoff."""
+    def test_backoff_delay(self):
+        """Test the delay doubles, is capped and waits at least the Retry-After."""
+        generator = random.Random(0)
+        for attempt, limit in [(1, 0.5), (2, 1), (3, 2), (10, 30)]:
+            delay = backoff_delay(attempt, 0.5, 30, generator=generator)
+            self.assertTrue(0 <= delay <= limit)
+        self.assertGreaterEqual(backoff_delay(1, 0.5, 30, 5), 5)
+        self.assertEqual(30, backoff_delay(1, 0.5, 30, 120))
+
+    def test_parse_retry_after(self):
+        """Test seconds and dates are read."""
+        self.assertEqual(3, parse_retry_after("3"))
+        self.assertAlmostEqual(60, parse_retry_after(formatdate(time.time() + 60, usegmt=True)),
+                               delta=2)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+class CircuitBreakerTest(unittest.TestCase):
+    """Half open circuit breaker."""
+    def test_half_open(self):
+        """Test a single trial is let through after the cooldown, which doubles on failure."""
+        breaker = CircuitBreaker(0.05, 1)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(CircuitBreaker.State.OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.05)
+        self.assertEqual(CircuitBreaker.State.HALF_OPEN, breaker.state)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+
+        time.sleep(0.05)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.05)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(CircuitBreaker.State.CLOSED, breaker.state)
+        self.assertTrue(breaker.allow())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Unit tests for the response cache."""
+import time
+import unittest
+from srtools.utils.responsecache import ResponseCache
+
+class ResponseCacheTest(unittest.TestCase):
+    """Replies kept by time to live and recent use."""
+    def test_key(self):
+        """Test keys ignore the cache buster and the parameters order."""
+        self.assertEqual(ResponseCache.key("/api", {"room_id": 1, "_": 10, "a": "b"}),
+                         ResponseCache.key("/api", {"a": "b", "room_id": "1", "_": 20}))
+        self.assertNotEqual(ResponseCache.key("/api", {"room_id": 1}),
+                            ResponseCache.key("/api", {"room_id": 2}))
+
+    def test_expire_and_evict(self):
+        """Test expired and least recently used replies are dropped."""
+        cache = ResponseCache(max_size=2)
+        cache.put("a", 1, 60)
+        cache.put("b", 2, 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("b"))
+        cache.put("c", 3, 60)
+        self.assertEqual(1, cache.get("a"))
+        cache.put("d", 4, 60)
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_invalidate(self):
+        """Test explicit invalidation by path and parameters."""
+        cache = ResponseCache()
+        for room_id in [1, 2]:
+            cache.put(ResponseCache.key("/profile", {"room_id": room_id}), room_id, 60)
+            cache.put(ResponseCache.key("/settings", {"room_id": room_id}), room_id, 60)
+        cache.invalidate("/profile", {"room_id": 1, "_": 5})
+        self.assertEqual(3, len(cache))
+        cache.invalidate("/settings")
+        self.assertEqual(1, len(cache))
+        cache.invalidate()
+        self.assertEqual(0, len(cache))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,10 @@
 """Unit tests for GenresManager."""
+import random
+import unittest
 from srtools.test.showroommanager_test import ShowroomManagerTest
+from srtools.configuration.configuration import Configuration
+from srtools.manager.genresmanager import GenresManager
+from srtools.manager.livesmanager import LivesManager
 from srtools.manager.roomsmanager import RoomsManager
 
 class ShowroomManagerRooms(ShowroomManagerTest):
@@ -103,3 +108,114 @@ class ShowroomManagerRooms(ShowroomManagerTest):
         room = self.showroom_manager_fake.rooms_manager.find(97446)
         result = str(room)
         self.assertEqual("97446", result)
+
+class RoomsManagerIndexTest(unittest.TestCase):
+    """Indexed filters, compared with checking every room."""
+    def setUp(self):
+        configuration = Configuration()
+        self.generator = random.Random(0)
+        self.rooms_manager = RoomsManager(configuration, None)
+        self.lives_manager = LivesManager(configuration, None)
+        genres_manager = GenresManager(configuration, None)
+        self.genres = [genres_manager.create(x, str(x)) for x in range(3)]
+        for room_id in self.generator.sample(range(1, 10000), 300):
+            self._randomize(self.rooms_manager.create(room_id))
+
+    def _randomize(self, room):
+        """Assigns random values to the indexed attributes."""
+        room.official = self.generator.choice([0, 1])
+        room.genre = self.generator.choice(self.genres)
+        room.room_url_key = "key%s" % self.generator.randint(1, 200)
+        room.badge = self.generator.choice([True, False])
+        room.live = self.lives_manager.create(self.generator.randint(1, 100000)) \
+                    if self.generator.random() < 0.8 else None
+
+    def _matches(self, rooms_filter, room):
+        """Reference implementation of a filter on a single room."""
+        if isinstance(rooms_filter, RoomsManager.RoomsFilterGroup):
+            results = [self._matches(x, room) for x in rooms_filter.filters]
+            return all(results) if rooms_filter.operator == "and" else any(results)
+
+        live_id = room.live.live_id if room.live is not None else None
+        for name, actual in [("official", room.official), ("genre", room.genre),
+                             ("room_url_key", room.room_url_key), ("badge", room.badge),
+                             ("room_id", room.room_id)]:
+            value = getattr(rooms_filter, name)
+            if isinstance(value, (set, list)):
+                if actual not in value:
+                    return False
+            elif value is not None and actual != value:
+                return False
+
+        return rooms_filter.live is None or live_id == rooms_filter.live.live_id
+
+    def _expected(self, rooms_filter):
+        """Reference implementation."""
+        rooms = [x for x in self.rooms_manager._rooms.values() if self._matches(rooms_filter, x)]
+        if rooms_filter.order_by == RoomsManager.RoomsSort.LIVE_ID_ASC:
+            rooms = sorted([x for x in rooms if x.live is not None],
+                           key=lambda x: (x.live.live_id, x.room_id))
+        elif rooms_filter.order_by == RoomsManager.RoomsSort.ROOM_ID_DESC:
+            rooms = sorted(rooms, key=lambda x: x.room_id, reverse=True)
+
+        return rooms
+
+    def _check(self):
+        """Compares several filters with the reference implementation."""
+        room = next(x for x in self.rooms_manager.rooms() if x.live is not None)
+        for order_by in [RoomsManager.RoomsSort.UNDEFINED, RoomsManager.RoomsSort.LIVE_ID_ASC,
+                         RoomsManager.RoomsSort.ROOM_ID_DESC]:
+            for attributes in [{}, {"official": 1}, {"official": True, "genre": self.genres[1]},
+                               {"room_url_key": room.room_url_key}, {"live": room.live},
+                               {"genre": self.genres[2], "badge": False}]:
+                rooms_filter = self.rooms_manager.create_filter()
+                rooms_filter.order_by = order_by
+                for name, value in attributes.items():
+                    setattr(rooms_filter, name, value)
+                self.assertEqual(self._expected(rooms_filter),
+                                 self.rooms_manager.rooms(rooms_filter))
+
+    def test_filters(self):
+        """Test filters after creating rooms."""
+        self._check()
+
+    def test_updates(self):
+        """Test filters after modifying and removing rooms."""
+        rooms = self.rooms_manager.rooms()
+        for room in rooms[:100]:
+            self._randomize(room)
+        for room in rooms[100:150]:
+            self.assertIs(room, self.rooms_manager.remove(room.room_id))
+            room.official = 5
+        self.rooms_manager.create(rooms[0].room_id)
+        self.assertEqual(len(rooms) - 50, len(self.rooms_manager))
+
+        self._check()
+        rooms_filter = self.rooms_manager.create_filter()
+        rooms_filter.official = 5
+        self.assertEqual([], self.rooms_manager.rooms(rooms_filter))
+
+    def test_composed_filters(self):
+        """Test set values and filters combined with & and |."""
+        rooms = self.rooms_manager.rooms()
+        favorites = [x.room_id for x in rooms[::7]] + [10001, 10002]
+        for order_by in [RoomsManager.RoomsSort.UNDEFINED, RoomsManager.RoomsSort.LIVE_ID_ASC,
+                         RoomsManager.RoomsSort.ROOM_ID_DESC]:
+            genres = self.rooms_manager.create_filter()
+            genres.genre = {self.genres[0], self.genres[2]}
+            genres.order_by = order_by
+            group = self.rooms_manager.create_filter()
+            group.room_id = favorites
+            group.order_by = order_by
+            official = self.rooms_manager.create_filter()
+            official.official = 1
+            official.order_by = order_by
+            badge = self.rooms_manager.create_filter()
+            badge.badge = True
+            empty = self.rooms_manager.create_filter()
+            empty.room_id = set()
+            for rooms_filter in [genres, group, empty, genres & group, genres | group,
+                                 official | badge, (official & badge) | group,
+                                 group & (genres | badge), empty | badge, official & empty]:
+                self.assertEqual(self._expected(rooms_filter),
+                                 self.rooms_manager.rooms(rooms_filter))
@@ -0,0 +1,215 @@
+"""Unit tests for ServicesManager against the local SHOWROOM stand-in."""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import datetime
+from srtools.configuration.configuration import ClassicFreeGifts, Configuration
+from srtools.manager.api.asyncshowroomapi import AsyncShowroomAPI, aiohttp
+from srtools.manager.servicesmanager import ServicesManager
+from srtools.manager.showroommanager import ShowroomManager
+from srtools.manager.watchmultiplexer import WatchMultiplexer
+from srtools.test.fakeshowroomserver import FakeShowroomServer
+from srtools.utils.capturefile import CaptureWriter
+from srtools.utils.jsonutils import save_json_atomically
+from srtools.utils.parallel import Executor
+from srtools.utils.tracksink import TrackSink
+
+class ServicesManagerTest(unittest.TestCase):
+    """ServicesManager unit test."""
+    def setUp(self):
+        self.server = FakeShowroomServer(rooms=20, live_ratio=1).start()
+        self.configuration = Configuration()
+        self.configuration.connection.cookies = None
+        self.configuration.connection.base_url = self.server.base_url
+        # Replies change during the tests
+        self.configuration.connection.cache_ttls = {}
+        self.showroom_manager = ShowroomManager(self.configuration)
+        self.services_manager = ServicesManager(self.configuration, self.showroom_manager)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_track_fetch(self):
+        """Test that a track cycle fetches rooms concurrently and keeps their order."""
+        rooms = sorted(self.server.rooms, reverse=True) + [1]
+        self.server.latency = 0.1
+
+        started = time.monotonic()
+        fetched = self.services_manager._do_track_fetch(Executor(10), rooms)
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.1 * len(rooms) / 2)
+        self.assertEqual(rooms[:-1], [x[0] for x in fetched])
+        self.assertEqual([self.server.rooms[x]["live_id"] for x in rooms[:-1]],
+                         [x[2].live_id for x in fetched])
+
+    @unittest.skipIf(aiohttp is None, "aiohttp not available")
+    def test_track_fetch_async(self):
+        """Test that the asynchronous fetch awaits track.threads rooms at once, in order."""
+        rooms = sorted(self.server.rooms, reverse=True) + [1]
+        self.server.latency = 0.1
+        self.configuration.track.threads = 5
+        loop = asyncio.new_event_loop()
+        showroom_api = AsyncShowroomAPI(self.configuration)
+        try:
+            started = time.monotonic()
+            fetched = self.services_manager._do_track_fetch_async(loop, showroom_api, rooms)
+            elapsed = time.monotonic() - started
+        finally:
+            loop.run_until_complete(showroom_api.close())
+            loop.close()
+
+        self.assertLess(elapsed, 0.1 * len(rooms) / 2)
+        self.assertGreaterEqual(elapsed, 0.1 * (len(rooms) - 1) / 5)
+        self.assertEqual(rooms[:-1], [x[0] for x in fetched])
+        self.assertEqual([self.server.rooms[x]["live_id"] for x in rooms[:-1]],
+                         [x[2].live_id for x in fetched])
+
+    def test_track_warm_restart(self):
+        """Test that the latest values survive a restart through the checkpoint."""
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, "track.txt")
+            checkpoint = self.services_manager._do_track_get_checkpoint(filename)
+            sink = TrackSink(filename)
+            rooms = sorted(self.server.rooms)
+            for fixture in self.server.rooms.values():
+                fixture["point"] = 1000
+
+            last = self.services_manager._do_track_load_last(checkpoint, sink)
+            self.assertEqual({}, last)
+            lines = [self.services_manager._do_track_process_data(room, live, datetime.now(), last)
+                     for _, room, live in self.services_manager._do_track_fetch(Executor(4), rooms)]
+            self.assertEqual([0] * len(rooms), [x["diff"] for x in lines])
+            sink.write(lines)
+            os.rename(filename, filename + ".old")
+
+            # Without a checkpoint nor history there's nothing to restore
+            self.assertEqual({}, self.services_manager._do_track_load_last(checkpoint, sink))
+            os.rename(filename + ".old", filename)
+            self.assertEqual(last, self.services_manager._do_track_load_last(checkpoint, sink))
+
+            save_json_atomically(last, checkpoint)
+            os.remove(filename)
+            restored = self.services_manager._do_track_load_last(checkpoint, sink)
+            self.assertEqual(last, restored)
+
+            self.server.rooms[rooms[0]]["point"] = 1500
+            room = self.showroom_manager.rooms_manager.find(rooms[0])
+            live = self.showroom_manager.showroom_api.get_live_data(
+                room, self.showroom_manager.lives_manager)
+            line = self.services_manager._do_track_process_data(room, live, datetime.now(),
+                                                                restored)
+            self.assertEqual(500, line["diff"])
+            room = self.showroom_manager.rooms_manager.find(rooms[1])
+            live = self.showroom_manager.showroom_api.get_live_data(
+                room, self.showroom_manager.lives_manager)
+            self.assertEqual("", self.services_manager._do_track_process_data(
+                room, live, datetime.now(), restored))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_watch_multiplexer(self):
+        """Test that rooms go through rounds from a single process, and wait again once offline."""
+        rooms = sorted(self.server.rooms)[:3]
+        self.configuration.watch.sweep = 0.05
+        self.configuration.watch.schedule_refresh = 10 ** 6
+        rounds = []
+        def watch_round(room, _counted):
+            rounds.append(room.room_id)
+            return 0.05
+
+        multiplexer = WatchMultiplexer(self.services_manager, rooms, 0.05)
+        with mock.patch.object(self.services_manager, "_do_watch_round", watch_round), \
+             mock.patch.object(self.services_manager, "_do_watch_gather",
+                               lambda room_id, room: room):
+            thread = threading.Thread(target=multiplexer.run)
+            thread.start()
+            try:
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline and \
+                      any(rounds.count(x) < 2 for x in rooms):
+                    time.sleep(0.01)
+                self.assertEqual(sorted(rooms), sorted(multiplexer.watches))
+
+                self.server.rooms[rooms[0]]["live_id"] = 0
+                while time.monotonic() < deadline and not multiplexer.scheduler.waiting():
+                    time.sleep(0.01)
+                self.assertEqual([rooms[0]], multiplexer.scheduler.waiting())
+            finally:
+                multiplexer.stop()
+                thread.join()
+
+        self.assertTrue(all(rounds.count(x) >= 2 for x in rooms))
+        self.assertEqual(sorted(rooms[1:]), sorted(multiplexer.watches))
+
+    def test_watch_multiplexer_rounds(self):
+        """Test rounds of more rooms than shared workers, gathering through the shared executor."""
+        self.server.stop()
+        gifts = [{"gift_id": x.value, "free_num": 0} for x in ClassicFreeGifts]
+        self.server = FakeShowroomServer(rooms=40, live_ratio=1, fixtures={
+            "/api/live/current_user": {"user_id": 1, "add_free_gift": 0,
+                                       "gift_list": {"normal": gifts, "enquete": []}},
+            "/api/live/polling": {"live_watch_incentive": {"ok": 1}}}).start()
+        self.configuration.connection.base_url = self.server.base_url
+        self.configuration.connection.rate_limits = {}
+        self.configuration.count.end = 1
+        self.configuration.count.delay = 0
+        self.configuration.watch.schedule_refresh = 10 ** 6
+        showroom_manager = ShowroomManager(self.configuration)
+        services_manager = ServicesManager(self.configuration, showroom_manager)
+        rooms = sorted(self.server.rooms)
+
+        multiplexer = WatchMultiplexer(services_manager, rooms, 0.05)
+        thread = threading.Thread(target=multiplexer.run)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 20
+            while time.monotonic() < deadline and \
+                  not (len(multiplexer.watches) == len(rooms) and
+                       all(x.rounds for x in list(multiplexer.watches.values()))):
+                time.sleep(0.05)
+        finally:
+            multiplexer.stop()
+            thread.join()
+
+        self.assertEqual(rooms, sorted(multiplexer.watches))
+        self.assertTrue(all(x.rounds == 1 for x in multiplexer.watches.values()))
+        self.assertGreater(self.server.hits["/api/live/polling"], 0)
+        self.assertEqual(sorted(rooms), sorted(x.room_id for x in
+                                               showroom_manager.rooms_manager.rooms()))
+
+    def test_watch_multiplexer_engine(self):
+        """Test that multiplexed captures need the async engine, and keep the chosen one."""
+        self.configuration.watch.mode = "multiplex"
+        self.configuration.watch.capture = True
+        self.configuration.capture.engine = "blocking"
+        with self.assertRaises(ValueError):
+            self.services_manager.do_watch_rooms(sorted(self.server.rooms), 1)
+        self.assertEqual("blocking", self.configuration.capture.engine)
+
+    def test_replay_offline(self):
+        """Test that a capture is replayed without fetching the online rooms."""
+        directory = tempfile.mkdtemp()
+        try:
+            source = os.path.join(directory, "capture.srcap")
+            writer = CaptureWriter(source, {"room_id": 1, "live_id": 2})
+            writer.write('MSG\tkey\t{"cm":"hi","u":1,"ac":"a","t":1}')
+            writer.close()
+            self.configuration.replay.output = os.path.join(directory, "replay.txt")
+
+            hits = self.server.hits["/api/live/onlives"]
+            showroom_manager = ShowroomManager(self.configuration, initialize=False)
+            services_manager = ServicesManager(self.configuration, showroom_manager)
+            self.assertEqual(1, services_manager.do_replay(source, "default"))
+            self.assertEqual(hits, self.server.hits["/api/live/onlives"])
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Unit tests for the snapshot shared by the processes of the host."""
+import os
+import tempfile
+import threading
+import time
+import unittest
+from srtools.utils.sharedsnapshot import SharedSnapshot
+
+class SharedSnapshotTest(unittest.TestCase):
+    """SharedSnapshot unit test."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "onlives")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_publish(self):
+        """Test a published snapshot is read by other instances, and decoded once per version."""
+        writer = SharedSnapshot(self.path)
+        reader = SharedSnapshot(self.path)
+        self.assertFalse(reader.read())
+
+        writer.publish({"onlives": [1]})
+        self.assertTrue(reader.read())
+        self.assertEqual({"onlives": [1]}, reader.value)
+        value = reader.value
+        reader.read()
+        self.assertIs(value, reader.value)
+
+        writer.publish({"onlives": [2]})
+        reader.read()
+        self.assertEqual(2, reader.version)
+        self.assertEqual({"onlives": [2]}, reader.value)
+
+    def test_threads(self):
+        """Test the threads sharing an instance fetch once and see a consistent snapshot."""
+        snapshot = SharedSnapshot(self.path, ttl=60)
+        fetches = []
+        def fetch():
+            fetches.append(1)
+            time.sleep(0.05)
+            return {"onlives": len(fetches)}
+
+        results = []
+        def get():
+            results.append(snapshot.get(fetch))
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(fetches))
+        self.assertEqual([{"onlives": 1}]*8, results)
+        self.assertEqual(1, snapshot.version)
+
+    def test_get(self):
+        """Test only the process finding the snapshot stale fetches it."""
+        fetches = []
+        def fetch():
+            fetches.append(1)
+            return {"onlives": len(fetches)}
+
+        first = SharedSnapshot(self.path, ttl=0.2)
+        second = SharedSnapshot(self.path, ttl=0.2)
+        self.assertEqual({"onlives": 1}, first.get(fetch))
+        self.assertEqual({"onlives": 1}, second.get(fetch))
+        self.assertEqual(1, len(fetches))
+
+        second.expire()
+        self.assertEqual({"onlives": 2}, second.get(fetch))
+        self.assertEqual({"onlives": 2}, first.get(fetch))
+
+        time.sleep(0.2)
+        self.assertEqual({"onlives": 3}, first.get(fetch))
+        # A failed refresh keeps the stale snapshot
+        time.sleep(0.2)
+        self.assertEqual({"onlives": 3}, second.get(lambda: None))
+
+    def test_fork(self):
+        """Test a forked process uses the snapshot refreshed by its parent."""
+        snapshot = SharedSnapshot(self.path)
+        snapshot.get(lambda: {"onlives": "parent"})
+        pid = os.fork()
+        if pid == 0:
+            child = SharedSnapshot(self.path)
+            os._exit(0 if child.get(lambda: {"onlives": "child"}) == {"onlives": "parent"} else 1)
+        self.assertEqual(0, os.waitpid(pid, 0)[1])
+
+if __name__ == '__main__':
+    unittest.main()
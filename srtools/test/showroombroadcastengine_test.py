@@ -0,0 +1,91 @@
+"""Unit tests for ShowroomBroadcastEngine."""
+import socketserver
+import threading
+import unittest
+from srtools.configuration.configuration import Configuration
+from srtools.manager.api.callbacks.defaultbroadcastcallback import DefaultBroadcastCallback
+from srtools.manager.api.showroombroadcastengine import ShowroomBroadcastEngine
+from srtools.manager.roomsmanager import RoomsManager
+from srtools.manager.livesmanager import LivesManager
+
+class FakeBroadcastHandler(socketserver.StreamRequestHandler):
+    """Replies to a subscription with a few messages and ends the live."""
+    def handle(self):
+        key = self.rfile.readline().decode("utf-8").strip().split("\t")[1]
+        if key == "idle":
+            self.rfile.readline()
+            return
+
+        self.wfile.write(('MSG\t%s\t{"cm":"1","ac":"a","u":1,"av":1,"t":1}\n' % key).encode())
+        self.wfile.write(('MSG\t%s\t{"n":10,"g":1,"u":1,"av":1,"t":2}\n' % key).encode())
+        self.wfile.write(('MSG\t%s\t{"created_at":1499581304,"a":"0","t":101}\n' % key).encode())
+        self.rfile.readline()
+
+class RecordingBroadcastCallback(DefaultBroadcastCallback):
+    """Keeps the received messages."""
+    def __init__(self, configuration, room):
+        super(RecordingBroadcastCallback, self).__init__(configuration, room)
+        self.messages = []
+        self.terminated = False
+
+    def new_message(self, message):
+        super(RecordingBroadcastCallback, self).new_message(message)
+        self.messages.append(message)
+
+    def terminate(self):
+        self.terminated = True
+
+class ShowroomBroadcastEngineTest(unittest.TestCase):
+    """ShowroomBroadcastEngine unit test."""
+    def setUp(self):
+        self.configuration = Configuration()
+        self.configuration.capture.output = None
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeBroadcastHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.engine = ShowroomBroadcastEngine(self.configuration)
+
+    def tearDown(self):
+        self.engine.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _create_room(self, room_id):
+        """Creates a room pointing to the fake server."""
+        room = RoomsManager(self.configuration, None).create(room_id)
+        room.live = LivesManager(self.configuration, None).create(room_id)
+        room.live.broadcast_host, room.live.broadcast_port = self.server.server_address
+        room.live.broadcast_key = "key%s" % room_id
+        return room
+
+    def test_many_rooms(self):
+        """Unit test for capturing several rooms from one loop."""
+        callbacks = []
+        for room_id in range(1, 21):
+            room = self._create_room(room_id)
+            callback = RecordingBroadcastCallback(self.configuration, room)
+            callbacks.append(callback)
+            self.assertTrue(self.engine.add(room, callback))
+
+        self.engine.wait()
+        self.assertEqual(0, self.engine.active())
+        for callback in callbacks:
+            self.assertTrue(callback.terminated)
+            self.assertEqual(3, len(callback.messages))
+            self.assertIn("key%s" % callback._room.room_id, callback.messages[0])
+
+    def test_duplicate_room(self):
+        """Unit test for adding the same live twice."""
+        room = self._create_room(1)
+        room.live.broadcast_key = "idle"
+        callback = RecordingBroadcastCallback(self.configuration, room)
+        self.assertTrue(self.engine.add(room, callback))
+        self.assertFalse(self.engine.add(room, RecordingBroadcastCallback(self.configuration, room)))
+        self.assertTrue(self.engine.contains(room))
+
+        self.engine.stop()
+        self.assertTrue(callback.terminated)
+        self.assertFalse(self.engine.contains(room))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ from srtools.manager.showroommanager import ShowroomManager
 from srtools.manager.servicesmanager import ServicesManager
 from srtools.manager.api.showroomapi import ShowroomAPI
 from srtools.configuration.configuration import Configuration
+from srtools.test.fakeshowroomserver import FakeShowroomServer
 
 class FakeShowroomAPI(ShowroomAPI):
     """FakeShowroomAPI."""
@@ -60,3 +61,53 @@ class ShowroomServicesTest(unittest.TestCase):
         """Unit test for log."""
         room = self.showroom_services.showroom_manager.rooms_manager.find(90487)
         self.assertIsNotNone(self.showroom_services.showroom_manager.showroom_api.get_comment_log(room))
+
+class ShowroomManagerRefreshTest(unittest.TestCase):
+    """Incremental refresh against the local SHOWROOM stand-in."""
+    def setUp(self):
+        self.server = FakeShowroomServer(rooms=10, live_ratio=0.5).start()
+        self.configuration = Configuration()
+        self.configuration.connection.cookies = None
+        self.configuration.connection.base_url = self.server.base_url
+        # Replies change during the tests
+        self.configuration.connection.cache_ttls = {}
+        self.showroom_manager = ShowroomManager(self.configuration)
+        self.events = []
+        self.showroom_manager.add_listener(lambda event, room: self.events.append((event,
+                                                                                   room.room_id)))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_refresh(self):
+        """Test that refreshing keeps the room state and reports the changes."""
+        live_rooms = [x["room_id"] for x in self.server.live_rooms()]
+        offline_room = next(x for x in self.server.rooms.values() if not x["live_id"])
+        kept, ended, changed = live_rooms[0], live_rooms[1], live_rooms[2]
+
+        room = self.showroom_manager.rooms_manager.find(kept)
+        room.bonus_checked = True
+        live = self.showroom_manager.showroom_api.get_live_data(room,
+                                                                self.showroom_manager.lives_manager)
+        self.assertIsNotNone(live.json)
+
+        self.showroom_manager.initialize()
+        self.assertEqual([], self.events)
+
+        self.server.rooms[ended]["live_id"] = 0
+        self.server.rooms[changed]["view_num"] += 1
+        offline_room["live_id"] = 1
+        self.showroom_manager.initialize()
+
+        self.assertEqual(sorted([(ShowroomManager.RoomEvent.REMOVED, ended),
+                                 (ShowroomManager.RoomEvent.CHANGED, changed),
+                                 (ShowroomManager.RoomEvent.ADDED, offline_room["room_id"])],
+                                key=lambda x: x[1]),
+                         sorted(self.events, key=lambda x: x[1]))
+        self.assertIs(room, self.showroom_manager.rooms_manager.find(kept))
+        self.assertTrue(room.bonus_checked)
+        self.assertIs(live, room.live)
+        self.assertIsNotNone(room.live.json)
+        self.assertIsNone(self.showroom_manager.rooms_manager.find(ended))
+        self.assertIsNone(self.showroom_manager.lives_manager.find(
+            self.server.FIRST_LIVE_ID + ended - self.server.FIRST_ROOM_ID))
@@ -0,0 +1,59 @@
+"""Unit tests for single flight calls."""
+import asyncio
+import threading
+import time
+import unittest
+from srtools.utils.singleflight import SingleFlight
+
+class SingleFlightTest(unittest.TestCase):
+    """Identical concurrent calls run once."""
+    def test_threads(self):
+        """Test concurrent threads share the call with the same key."""
+        single_flight = SingleFlight()
+        calls = []
+
+        def call(value):
+            calls.append(value)
+            time.sleep(0.1)
+            return value * 2
+
+        results = []
+        threads = [threading.Thread(target=lambda x=x: results.append(
+            single_flight.do(("key", x % 2), call, x % 2))) for x in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([0, 1], sorted(calls))
+        self.assertEqual([0] * 5 + [2] * 5, sorted(results))
+        self.assertEqual(8, single_flight.shared)
+        self.assertEqual(4, single_flight.do("key", call, 2))
+
+    def test_async(self):
+        """Test concurrent tasks share the call with the same key, errors included."""
+        single_flight = SingleFlight()
+        calls = []
+
+        async def call(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            if value is None:
+                raise ValueError("no value")
+            return value
+
+        async def run():
+            results = await asyncio.gather(*[single_flight.do_async("a", call, 1)
+                                             for _ in range(5)])
+            errors = await asyncio.gather(*[single_flight.do_async("b", call, None)
+                                            for _ in range(3)], return_exceptions=True)
+            return results, errors
+
+        results, errors = asyncio.run(run())
+        self.assertEqual([1] * 5, results)
+        self.assertTrue(all(isinstance(x, ValueError) for x in errors))
+        self.assertEqual([1, None], calls)
+        self.assertEqual(6, single_flight.shared)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Unit tests for the timers of long running loops."""
+import contextlib
+import io
+import time
+import unittest
+from srtools.utils.activesleep import activesleep
+from srtools.utils.timers import Timers
+
+class TimersTest(unittest.TestCase):
+    """Timers unit test."""
+    def test_run(self):
+        """Test timers are called in order until stopped."""
+        timers = Timers()
+        calls = []
+        timers.after(0.03, calls.append, "once")
+        periodic = timers.every(0.02, calls.append, "every")
+        timers.after(0.07, timers.stop)
+        moved = timers.after(0.01, calls.append, "moved")
+        timers.move(moved, 0.05)
+        timers.after(0.01, calls.append, "cancelled").cancel()
+        timers.run()
+
+        self.assertEqual(["every", "once", "every", "moved", "every"], calls)
+        periodic.cancel()
+        timers.run()
+        self.assertEqual(5, len(calls))
+
+class ActiveSleepTest(unittest.TestCase):
+    """activesleep unit test."""
+    def test_renewal(self):
+        """Test the callback can end the sleep early, and the countdown is rate limited."""
+        calls = []
+        def callback(left, total, extra):
+            calls.append((left, total, extra))
+            return 0
+
+        output = io.StringIO()
+        started = time.monotonic()
+        with contextlib.redirect_stdout(output):
+            activesleep(10, callback, step=0.05, extra="room", progress=1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([(10, 10, "room")], calls)
+        self.assertEqual(1, output.getvalue().count("Sleeping for"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Unit tests for track sinks."""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from srtools.utils.tracksink import TrackSinkFactory
+
+class TrackSinkTest(unittest.TestCase):
+    """Track sinks unit test."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.start = datetime(2020, 1, 1, 12, 0, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _line(self, room_id, cycle, points):
+        """Builds a track line."""
+        date = self.start + timedelta(minutes=5 * cycle)
+        return {"id": room_id, "key": "room%s" % room_id, "date": date,
+                "actual_date": date + timedelta(seconds=1), "followers": 100 + cycle,
+                "viewers": 10 * cycle, "points": points, "diff": cycle}
+
+    def _check(self, sink_type):
+        """Writes a few cycles and queries them back."""
+        filename = os.path.join(self.directory, "track." + sink_type)
+        sink = TrackSinkFactory().create(sink_type, filename)
+        for cycle in range(4):
+            sink.write([self._line(1, cycle, 1000 + cycle), self._line(2, cycle, 50)])
+        sink.close()
+
+        sink = TrackSinkFactory().create(sink_type, filename)
+        last = sink.last()
+        self.assertEqual({1, 2}, set(last))
+        self.assertEqual(1003, last[1]["points"])
+        self.assertEqual(self.start + timedelta(minutes=15), last[1]["date"])
+
+        rows = sink.query(1, self.start + timedelta(minutes=5), self.start + timedelta(minutes=10))
+        self.assertEqual([1001, 1002], [x["points"] for x in rows])
+        self.assertEqual([101, 102], [x["followers"] for x in rows])
+        self.assertEqual(4, len(sink.query(2)))
+        self.assertEqual([], sink.query(3))
+        sink.close()
+
+    def test_text(self):
+        """Test the tab separated sink."""
+        self._check("text")
+
+    def test_sqlite(self):
+        """Test the SQLite sink."""
+        self._check("sqlite")
+
+    def test_malformed_date(self):
+        """Test changes with a date that can't be parsed are left out of queries."""
+        for sink_type in ["text", "sqlite"]:
+            filename = os.path.join(self.directory, "malformed." + sink_type)
+            sink = TrackSinkFactory().create(sink_type, filename)
+            line = self._line(1, 0, 1000)
+            sink.write([dict(line, date="yesterday"), self._line(1, 1, 1001)])
+            rows = sink.query(1, self.start, self.start + timedelta(minutes=10))
+            self.assertEqual([1001], [x["points"] for x in rows])
+            self.assertEqual([1001], [x["points"] for x in sink.query(1)])
+            sink.close()
+
+if __name__ == '__main__':
+    unittest.main()
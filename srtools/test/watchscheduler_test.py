@@ -0,0 +1,63 @@
+"""Unit tests for the watch scheduler against the local SHOWROOM stand-in."""
+import time
+import unittest
+from srtools.configuration.configuration import Configuration
+from srtools.manager.api.showroomapi import ShowroomAPI
+from srtools.manager.watchscheduler import WatchScheduler
+from srtools.test.fakeshowroomserver import FakeShowroomServer
+
+class WatchSchedulerTest(unittest.TestCase):
+    """WatchScheduler unit test."""
+    def setUp(self):
+        self.server = FakeShowroomServer(rooms=10, live_ratio=0.5).start()
+        self.configuration = Configuration()
+        self.configuration.connection.cookies = None
+        self.configuration.connection.base_url = self.server.base_url
+        # Replies change during the tests
+        self.configuration.connection.cache_ttls = {}
+        self.configuration.watch.sweep = 10 ** 6
+        self.configuration.watch.schedule_refresh = 10 ** 6
+        self.showroom_api = ShowroomAPI(self.configuration)
+
+        self.live = self.server.live_rooms()[0]["room_id"]
+        self.scheduled, self.unscheduled = [x["room_id"] for x in self.server.rooms.values()
+                                            if not x["live_id"]][:2]
+        self.start = int(time.time()) + 7200
+        self.server.fixtures["/api/time_table/time_tables"] = {
+            "time_tables": [{"room_id": self.scheduled, "started_at": self.start}]
+        }
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_poll(self):
+        """Test rooms are only polled around their expected start."""
+        scheduler = WatchScheduler(self.showroom_api, self.configuration,
+                                   [self.live, self.scheduled, self.unscheduled], 10)
+        now = time.time()
+        self.assertEqual([self.live], scheduler.poll(now))
+        self.assertEqual([], scheduler.poll(now))
+        self.assertEqual(self.start, scheduler.expected[self.scheduled])
+        # The fake server announces the next live of offline rooms in an hour
+        self.assertAlmostEqual(now + 3600, scheduler.expected[self.unscheduled], delta=5)
+        self.assertEqual(1, self.server.hits["/api/room/next_live"])
+
+        for offset in range(0, 3000, 10):
+            self.assertEqual([], scheduler.poll(now + offset))
+        self.assertEqual(0, self.server.hits["/room/is_live"])
+        self.assertEqual(1, self.server.hits["/api/live/onlives"])
+
+        self.assertEqual([], scheduler.poll(now + 3000))
+        self.assertEqual(1, self.server.hits["/room/is_live"])
+        self.assertEqual(now + 3010, scheduler.next_due())
+        self.server.rooms[self.unscheduled]["live_id"] = 1
+        self.assertEqual([self.unscheduled], scheduler.poll(now + 3010))
+        self.assertEqual([self.scheduled], list(scheduler.expected))
+
+        # Given up once the window is over
+        self.assertEqual([], scheduler.poll(self.start + 600))
+        self.assertNotIn(self.scheduled, scheduler.expected)
+        self.assertEqual([self.scheduled], scheduler.waiting())
+
+if __name__ == '__main__':
+    unittest.main()
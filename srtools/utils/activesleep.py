@@ -1,28 +1,36 @@
 """Active sleep counter."""
+import math
 import sys
-import time
+from srtools.utils.timers import Timers
 
-def activesleep(total, callback=None, step=30, extra=None):
+def activesleep(total, callback=None, step=30, extra=None, progress=None):
     """
-    Sleep for the given amount of time.
+    Sleep for the given amount of time, only waking up for the callback and the countdown.
     :param total: Time to wait.
     :type total: int
-    :param callback: Callback to call. Returns the amount of seconds left.
+    :param callback: Callback to call every step seconds, with the seconds left, the total and
+                     extra. Returns the amount of seconds left.
     :type callback: function
+    :param progress: Seconds between countdown prints, 0 to not print, None to print every 10
+                     seconds when writing to a terminal.
+    :type progress: int
     """
-    current_step = step
     if total > 0:
-        index = total
-        while index > 0:
-            index -= 1
+        if progress is None:
+            progress = 10 if sys.stdout.isatty() else 0
 
-            print(f"Sleeping for {index}...", end='\r')
-            sys.stdout.flush()
-            time.sleep(1)
+        timers = Timers()
+        end = timers.after(total, timers.stop)
 
-            current_step -= 1
-            if current_step < 0:
-                if callback is not None:
-                    index = callback(index, total, extra)
+        if callback is not None:
+            def renew():
+                timers.move(end, callback(int(math.ceil(end.left())), total, extra))
+            timers.every(step, renew)
 
-                current_step = step
+        if progress > 0:
+            def countdown():
+                print(f"Sleeping for {int(math.ceil(end.left()))}...", end='\r')
+                sys.stdout.flush()
+            timers.every(progress, countdown, delay=0)
+
+        timers.run()
@@ -0,0 +1,109 @@
+"""Bounded state for long running commands."""
+import os
+import resource
+from collections import OrderedDict
+
+class ExpiringSet(object):
+    """
+    Set of keys forgotten once they are not seen for some cycles, or once the set grows past its
+    maximum size (least recently seen first).
+    """
+    def __init__(self, expire_cycles=0, max_size=0):
+        """
+        :param expire_cycles: Cycles a key is kept without being seen, 0 to keep it.
+        :type expire_cycles: int
+        :param max_size: Maximum amount of keys, 0 for no limit.
+        :type max_size: int
+        """
+        self.expire_cycles = expire_cycles
+        self.max_size = max_size
+        self.cycle = 0
+        # Key: cycle when it was last seen, least recently seen first
+        self._entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def add(self, key):
+        """
+        Adds a key, or marks it as seen in the current cycle.
+        :returns: Keys evicted to respect the maximum size.
+        :rtype: list
+        """
+        self._entries[key] = self.cycle
+        self._entries.move_to_end(key)
+
+        evicted = []
+        while self.max_size > 0 and len(self._entries) > self.max_size:
+            evicted.append(self._entries.popitem(last=False)[0])
+
+        return evicted
+
+    def discard(self, key):
+        """Removes a key if present."""
+        self._entries.pop(key, None)
+
+    def next_cycle(self):
+        """
+        Starts a new cycle, forgetting the keys not seen for expire_cycles.
+        :returns: Evicted keys.
+        :rtype: list
+        """
+        self.cycle += 1
+        evicted = []
+        if self.expire_cycles > 0:
+            oldest = self.cycle - self.expire_cycles
+            while self._entries:
+                key, seen = next(iter(self._entries.items()))
+                if seen > oldest:
+                    break
+                del self._entries[key]
+                evicted.append(key)
+
+        return evicted
+
+def resident_memory():
+    """
+    Resident memory of the current process.
+    :returns: Bytes in use, the peak if the current value is not available.
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            result = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        result = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    return result
+
+class MemoryReport(object):
+    """Prints the memory in use and the size of the given structures every some cycles."""
+    def __init__(self, every=0):
+        """
+        :param every: Cycles between reports, 0 to disable them.
+        :type every: int
+        """
+        self.every = every
+        self._cycles = 0
+
+    def cycle(self, sizes):
+        """
+        Counts a cycle, reporting if it is time to.
+        :param sizes: Returns the amount of elements by structure name, called only to report.
+        :type sizes: function
+        :returns: Whether the report was printed.
+        :rtype: bool
+        """
+        self._cycles += 1
+        result = self.every > 0 and self._cycles % self.every == 0
+        if result:
+            details = ", ".join("%s %s" % (name, size) for name, size in sizes().items())
+            print("Memory: %.1f MB resident, %s." % (resident_memory() / 1048576.0, details))
+
+        return result
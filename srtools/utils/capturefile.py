@@ -0,0 +1,222 @@
+"""Binary capture files."""
+import json
+import struct
+import time
+from datetime import datetime
+
+try:
+    import lz4.frame
+except ImportError:
+    # lz4 compression not available
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    # zstd compression not available
+    zstandard = None
+
+# Every segment starts with the magic and a length-prefixed JSON header, then blocks of records.
+# Block: codec (B), raw length (I), stored length (I), data.
+# Record inside a block: seconds since segment start (d, monotonic), length (I), UTF-8 message.
+CAPTURE_MAGIC = b"SRCAP\x01"
+_HEADER = struct.Struct("<I")
+_BLOCK = struct.Struct("<BII")
+_RECORD = struct.Struct("<dI")
+
+_CODEC_NONE = 0
+_CODEC_LZ4 = 1
+_CODEC_ZSTD = 2
+
+COMPRESSIONS = ["none", "lz4", "zstd"]
+
+def _codec(compression):
+    """
+    Converts a compression name into its codec.
+    :param compression: "none", "lz4" or "zstd".
+    :type compression: string
+    :returns: The codec id.
+    :rtype: int
+    """
+    if compression is None or compression == "none":
+        result = _CODEC_NONE
+    elif compression == "lz4":
+        if lz4 is None:
+            raise ValueError("lz4 compression requires the lz4 package")
+        result = _CODEC_LZ4
+    elif compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        result = _CODEC_ZSTD
+    else:
+        raise ValueError("Unknown compression (%s)" % compression)
+
+    return result
+
+def _compress(codec, data):
+    """Compress a block."""
+    if codec == _CODEC_LZ4:
+        data = lz4.frame.compress(data)
+    elif codec == _CODEC_ZSTD:
+        data = zstandard.ZstdCompressor().compress(data)
+
+    return data
+
+def _decompress(codec, data):
+    """Decompress a block."""
+    if codec == _CODEC_LZ4:
+        data = lz4.frame.decompress(data)
+    elif codec == _CODEC_ZSTD:
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec != _CODEC_NONE:
+        raise ValueError("Unknown block codec (%s)" % codec)
+
+    return data
+
+def is_capture_file(filename):
+    """
+    Checks whether the given file is a binary capture.
+    :param filename: File to check.
+    :type filename: string
+    :returns: True if it's a binary capture, False if it's a text capture.
+    :rtype: bool
+    """
+    with open(filename, "rb") as inputfile:
+        return inputfile.read(len(CAPTURE_MAGIC)) == CAPTURE_MAGIC
+
+class CaptureWriter(object):
+    """Writes received messages to a binary capture file."""
+    _BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, filename, header, compression=None, flush_interval=5):
+        """
+        Opens the capture and writes the segment header. Existing captures get a new segment.
+        :param filename: Target filename.
+        :type filename: string
+        :param header: Information about the capture (room_id, live_id, etc).
+        :type header: dictionary
+        :param compression: "none", "lz4" or "zstd".
+        :type compression: string
+        :param flush_interval: Seconds a message waits at most in a pending block, so a killed
+                               capture only loses its last seconds.
+        :type flush_interval: float
+        """
+        self._codec = _codec(compression)
+        self._origin = time.monotonic()
+        self._flush_interval = flush_interval
+        self._flushed = self._origin
+        self._block = bytearray()
+        self._file = open(filename, "ab")
+
+        header = dict(header)
+        header["started_at"] = time.time()
+        header["compression"] = compression or "none"
+        encoded = json.dumps(header, sort_keys=True).encode("utf-8")
+        self._file.write(CAPTURE_MAGIC + _HEADER.pack(len(encoded)) + encoded)
+
+    def write(self, message):
+        """
+        Appends a message.
+        :param message: Received message.
+        :type message: string
+        """
+        data = message.encode("utf-8")
+        self._block += _RECORD.pack(time.monotonic() - self._origin, len(data))
+        self._block += data
+        self.flush(len(self._block) >= self._BLOCK_SIZE)
+
+    def flush(self, force=True):
+        """
+        Compresses and writes the pending block.
+        :param force: False to only write it once it waited for the flush interval.
+        :type force: bool
+        """
+        now = time.monotonic()
+        if self._block and (force or now - self._flushed >= self._flush_interval):
+            self._flushed = now
+            data = _compress(self._codec, bytes(self._block))
+            self._file.write(_BLOCK.pack(self._codec, len(self._block), len(data)))
+            self._file.write(data)
+            self._file.flush()
+            self._block = bytearray()
+
+    def close(self):
+        """Writes pending messages and closes the file."""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+class CaptureReader(object):
+    """Reads binary capture files, or the text files written by older versions."""
+    def __init__(self, filename):
+        self.filename = filename
+
+    def _read_binary(self, inputfile):
+        """
+        Yields the records in a binary capture.
+        :param inputfile: Opened capture.
+        :type inputfile: file
+        :returns: Tuples (header, date, message).
+        :rtype: tuple
+        """
+        header = None
+        started_at = 0
+        while True:
+            prefix = inputfile.read(len(CAPTURE_MAGIC))
+            if len(prefix) < len(CAPTURE_MAGIC):
+                break
+
+            if prefix == CAPTURE_MAGIC:
+                size = _HEADER.unpack(inputfile.read(_HEADER.size))[0]
+                header = json.loads(inputfile.read(size).decode("utf-8"))
+                started_at = header.get("started_at", 0)
+                continue
+
+            block_header = prefix + inputfile.read(_BLOCK.size - len(prefix))
+            if len(block_header) < _BLOCK.size:
+                break
+
+            codec, _raw_size, size = _BLOCK.unpack(block_header)
+            data = inputfile.read(size)
+            if len(data) < size:
+                # Truncated block, capture didn't end cleanly
+                break
+
+            block = memoryview(_decompress(codec, data))
+            offset = 0
+            while offset < len(block):
+                seconds, length = _RECORD.unpack_from(block, offset)
+                offset += _RECORD.size
+                message = str(block[offset:offset + length], "utf-8")
+                offset += length
+                yield header, datetime.fromtimestamp(started_at + seconds), message
+
+    def _read_text(self, inputfile):
+        """
+        Yields the records in a text capture ("date\\tmessage" lines).
+        :param inputfile: Opened capture.
+        :type inputfile: file
+        :returns: Tuples (None, date, message).
+        :rtype: tuple
+        """
+        for line in inputfile:
+            line = line.rstrip("\n")
+            if "\t" in line:
+                date, message = line.split("\t", 1)
+                try:
+                    date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S.%f")
+                except ValueError:
+                    date = None
+
+                yield None, date, message
+
+    def __iter__(self):
+        if is_capture_file(self.filename):
+            with open(self.filename, "rb") as inputfile:
+                for record in self._read_binary(inputfile):
+                    yield record
+        else:
+            with open(self.filename, "r", encoding="utf-8", errors="replace") as inputfile:
+                for record in self._read_text(inputfile):
+                    yield record
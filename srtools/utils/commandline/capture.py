@@ -3,6 +3,7 @@ import argparse
 from srtools.configuration.configuration import SelectedConfiguration
 from srtools.utils.commandline.base import IConfigurationInterface
 from srtools.manager.api.callbacks.broadcastcallbackfactory import BroadcastCallbackFactory
+from srtools.utils.capturefile import COMPRESSIONS
 
 class CaptureBase(IConfigurationInterface):
     """Capture base parser."""
@@ -15,11 +16,21 @@ class CaptureBase(IConfigurationInterface):
         parser = argparse.ArgumentParser(add_help=False)
         parser.add_argument('-o', '--output', help='capture target filename (default: %s)' %
                             self.configuration.capture.output)
+        parser.add_argument('--format', default=self.configuration.capture.format,
+                            choices=['text', 'binary'],
+                            help='capture file format (default: %s)' %
+                            self.configuration.capture.format)
+        parser.add_argument('--compression', default=self.configuration.capture.compression,
+                            choices=COMPRESSIONS,
+                            help='binary capture compression (default: %s)' %
+                            self.configuration.capture.compression)
         return parser
 
     def parse(self, args):
         """Test items."""
         self.configuration.capture.output = args.output
+        self.configuration.capture.format = args.format
+        self.configuration.capture.compression = args.compression
 
 class Capture(CaptureBase):
     """Capture parser."""
@@ -37,6 +48,10 @@ class Capture(CaptureBase):
                             choices=BroadcastCallbackFactory().available_handlers,
                             help='type of handler to use (default: %s)' %
                             self.configuration.capture.type)
+        parser.add_argument('-e', '--engine', default=self.configuration.capture.engine,
+                            choices=['blocking', 'async'],
+                            help='capture engine to use (default: %s)' %
+                            self.configuration.capture.engine)
 
         parser.set_defaults(func=self.parse)
 
@@ -46,3 +61,4 @@ class Capture(CaptureBase):
         self.configuration.chosen = SelectedConfiguration.CAPTURE
         self.configuration.capture.target_room = args.target_room
         self.configuration.capture.type = args.type
+        self.configuration.capture.engine = args.engine
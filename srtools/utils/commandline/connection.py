@@ -18,8 +18,14 @@ class Connection(IConfigurationInterface):
                             self.configuration.connection.user_agent,
                             default=self.configuration.connection.user_agent)
         parser.add_argument('--cookies', help='Browser from where to pick cookies (default: %s)' %
-                            self.configuration.connection.cookies, choices=['firefox', 'chrome'],
+                            self.configuration.connection.cookies,
+                            choices=['firefox', 'chrome', 'none'],
                             required=False, default=self.configuration.connection.cookies)
+        parser.add_argument('--base-url', required=False,
+                            help='server to use instead of SHOWROOM (e.g. a local test server)')
+        parser.add_argument('--snapshot', required=False,
+                            help='file sharing the online rooms among the processes of the host, '
+                            'only one of them fetches them (default: fetch in every process)')
         parser.add_argument('--username', required=False, help='Username to use')
         parser.add_argument('--password', required=False, help='Password to use')
         return parser
@@ -29,5 +35,7 @@ class Connection(IConfigurationInterface):
         self.configuration.connection.timeout = args.timeout
         self.configuration.connection.user_agent = args.user_agent
         self.configuration.connection.cookies = args.cookies
+        self.configuration.connection.base_url = args.base_url
+        self.configuration.connection.snapshot = args.snapshot
         self.configuration.connection.username = args.username
         self.configuration.connection.password = args.password
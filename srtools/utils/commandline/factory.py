@@ -16,6 +16,7 @@ from srtools.utils.commandline.capture import Capture
 from srtools.utils.commandline.message import Message
 from srtools.utils.commandline.hunt import Hunt
 from srtools.utils.commandline.stalk import Stalk
+from srtools.utils.commandline.replay import Replay
 
 class CommandLineParserFactory(object):
     """Command line parser factory"""
@@ -58,6 +59,8 @@ class CommandLineParserFactory(object):
             result = Hunt(configuration, parser)
         elif option == "STALK":
             result = Stalk(configuration, parser)
+        elif option == "REPLAY":
+            result = Replay(configuration, parser)
         else:
             log_error(f"Unkonwn action ({option})")
 
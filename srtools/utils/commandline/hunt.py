@@ -1,8 +1,8 @@
 """Hunt configuration parser."""
 from srtools.configuration.configuration import SelectedConfiguration
-from srtools.utils.commandline.connection import Connection
+from srtools.utils.commandline.state import State
 
-class Hunt(Connection):
+class Hunt(State):
     """Track parser."""
     def __init__(self, configuration, parser):
         """Constructor for the Hunt option."""
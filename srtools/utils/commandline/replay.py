@@ -0,0 +1,30 @@
+"""Replay configuration parser."""
+from srtools.configuration.configuration import SelectedConfiguration
+from srtools.utils.commandline.base import IConfigurationInterface
+from srtools.manager.api.callbacks.broadcastcallbackfactory import BroadcastCallbackFactory
+
+class Replay(IConfigurationInterface):
+    """Replay parser."""
+    def __init__(self, configuration, parser):
+        """Constructor for the Replay option."""
+        super(Replay, self).__init__(configuration, parser)
+
+    def setup(self, subparsers):
+        """Setups the parser for the Replay option."""
+        parser = subparsers.add_parser('replay')
+        parser.add_argument('source', help='capture file to replay (binary or text)')
+        parser.add_argument('-t', '--type', default=self.configuration.replay.type,
+                            choices=BroadcastCallbackFactory().available_handlers,
+                            help='type of handler to use (default: %s)' %
+                            self.configuration.replay.type)
+        parser.add_argument('-o', '--output', help='capture target filename (default: %s)' %
+                            self.configuration.replay.output)
+        parser.set_defaults(func=self.parse)
+        return parser
+
+    def parse(self, args):
+        """Replay a capture."""
+        self.configuration.chosen = SelectedConfiguration.REPLAY
+        self.configuration.replay.source = args.source
+        self.configuration.replay.type = args.type
+        self.configuration.replay.output = args.output
@@ -1,8 +1,8 @@
 """Stalk configuration parser."""
 from srtools.configuration.configuration import SelectedConfiguration
-from srtools.utils.commandline.connection import Connection
+from srtools.utils.commandline.state import State
 
-class Stalk(Connection):
+class Stalk(State):
     """Track parser."""
     def __init__(self, configuration, parser):
         """Constructor for the Hunt option."""
@@ -0,0 +1,32 @@
+"""Long running commands state configuration parser."""
+from srtools.utils.commandline.connection import Connection
+
+class State(Connection):
+    """State parser, shared by the commands that run in cycles."""
+    def __init__(self, configuration, parser):
+        """Constructor for the State option."""
+        super(State, self).__init__(configuration, parser)
+
+    def setup(self, subparsers):
+        """Setups the parser for the State option."""
+        parser = super(State, self).setup(subparsers)
+        parser.add_argument('--expire', type=int, default=self.configuration.state.expire_cycles,
+                            help='cycles without seeing a room or live before forgetting it, '
+                            '0 to keep them (default: %s)' %
+                            self.configuration.state.expire_cycles)
+        parser.add_argument('--max-entries', type=int,
+                            default=self.configuration.state.max_entries,
+                            help='rooms or lives remembered at most, 0 for no limit '
+                            '(default: %s)' % self.configuration.state.max_entries)
+        parser.add_argument('--memory-report', type=int,
+                            default=self.configuration.state.report_cycles,
+                            help='cycles between memory reports, 0 to disable them '
+                            '(default: %s)' % self.configuration.state.report_cycles)
+        return parser
+
+    def parse(self, args):
+        """State routines."""
+        super(State, self).parse(args)
+        self.configuration.state.expire_cycles = max(0, args.expire)
+        self.configuration.state.max_entries = max(0, args.max_entries)
+        self.configuration.state.report_cycles = max(0, args.memory_report)
@@ -1,12 +1,17 @@
 """Track configuration parser."""
 from srtools.configuration.configuration import SelectedConfiguration
-from srtools.utils.commandline.connection import Connection
+from srtools.utils.commandline.state import State
+from srtools.utils.capturefile import COMPRESSIONS
+from srtools.utils.tracksink import TrackSinkFactory
 
-class Track(Connection):
+class Track(State):
     """Track parser."""
+    _SQLITE_TARGET_FILE = "track.db"
+
     def __init__(self, configuration, parser):
         """Constructor for the Track option."""
         super(Track, self).__init__(configuration, parser)
+        self._default_target_file = self.configuration.track.target_file
 
     def setup(self, subparsers):
         """Setups the parser for the Track option."""
@@ -26,6 +31,34 @@ class Track(Connection):
         parser.add_argument('-c', '--capture', help='capture information (default: %s)' %
                             self.configuration.track.capture, action='store_true',
                             default=self.configuration.track.capture)
+        parser.add_argument('--sink', default=self.configuration.track.sink,
+                            choices=TrackSinkFactory().available_sinks,
+                            help='track storage, sqlite defaults the target file to %s '
+                            '(default: %s)' % (self._SQLITE_TARGET_FILE,
+                                               self.configuration.track.sink))
+        parser.add_argument('--checkpoint', default=self.configuration.track.checkpoint,
+                            help='file keeping the latest values of every room between runs '
+                            '(default: [target file].last)')
+        parser.add_argument('--threads', type=int, default=self.configuration.track.threads,
+                            help='concurrent room requests per cycle (default: %s)' %
+                            self.configuration.track.threads)
+        parser.add_argument('--http', default=self.configuration.track.http,
+                            choices=['threads', 'async'],
+                            help='room requests: blocking in threads, or awaited at once from a '
+                            'single thread (needs aiohttp, default: %s)' %
+                            self.configuration.track.http)
+        parser.add_argument('-e', '--engine', default=self.configuration.capture.engine,
+                            choices=['blocking', 'async'],
+                            help='capture engine: a process per room or a single event loop '
+                            '(default: %s)' % self.configuration.capture.engine)
+        parser.add_argument('--format', default=self.configuration.capture.format,
+                            choices=['text', 'binary'],
+                            help='capture file format (default: %s)' %
+                            self.configuration.capture.format)
+        parser.add_argument('--compression', default=self.configuration.capture.compression,
+                            choices=COMPRESSIONS,
+                            help='binary capture compression (default: %s)' %
+                            self.configuration.capture.compression)
         parser.set_defaults(func=self.parse)
         return parser
 
@@ -35,8 +68,17 @@ class Track(Connection):
         self.configuration.chosen = SelectedConfiguration.TRACK
         self.configuration.track.delay = args.delay
         self.configuration.track.save = args.save
+        self.configuration.track.sink = args.sink
         self.configuration.track.target_file = args.target_file
+        if args.sink == "sqlite" and args.target_file == self._default_target_file:
+            self.configuration.track.target_file = self._SQLITE_TARGET_FILE
         self.configuration.track.capture = args.capture
+        self.configuration.track.threads = max(1, args.threads)
+        self.configuration.track.http = args.http
+        self.configuration.track.checkpoint = args.checkpoint
+        self.configuration.capture.engine = args.engine
+        self.configuration.capture.format = args.format
+        self.configuration.capture.compression = args.compression
         if args.rooms is not None and len(args.rooms) > 0:
             self.configuration.track.target_rooms = [j for i in args.rooms for j in i] \
                                                     if len(args.rooms) > 1 else args.rooms[0]
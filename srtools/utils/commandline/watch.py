@@ -20,6 +20,22 @@ class Watch(IConfigurationInterface):
         parser.add_argument('-d', '--delay', type=int, default=self.configuration.watch.delay,
                             help='delay between messages (default: %s)' %
                             self.configuration.watch.delay)
+        parser.add_argument('-w', '--window', type=int, default=self.configuration.watch.window,
+                            help='seconds around the expected start of a room polling it every '
+                                 'delay seconds (default: %s)' % self.configuration.watch.window)
+        parser.add_argument('--mode', default=self.configuration.watch.mode,
+                            choices=['multiplex', 'fork'],
+                            help='watch every room from a single process, or spawn a process '
+                            'for each room gone online (default: %s)' %
+                            self.configuration.watch.mode)
+        parser.add_argument('--processes', type=int, default=self.configuration.watch.processes,
+                            help='processes sharing the rooms in multiplex mode, each one pinned '
+                            'to a core (default: %s)' % self.configuration.watch.processes)
+        parser.add_argument('-e', '--engine', default=self.configuration.capture.engine,
+                            choices=['blocking', 'async'],
+                            help='capture engine: a process per room or a single event loop, '
+                            'multiplex mode captures need async (default: %s)' %
+                            self.configuration.capture.engine)
         parser.add_argument('-c', '--capture', help='capture information (default: %s)' %
                             self.configuration.watch.capture, action='store_true',
                             default=self.configuration.watch.capture)
@@ -31,6 +47,10 @@ class Watch(IConfigurationInterface):
         if self.configuration.chosen == SelectedConfiguration.UNDEFINED:
             self.configuration.chosen = SelectedConfiguration.WATCH
             self.configuration.watch.delay = args.delay
+            self.configuration.watch.window = args.window
+            self.configuration.watch.mode = args.mode
+            self.configuration.watch.processes = args.processes
+            self.configuration.capture.engine = args.engine
             self.configuration.watch.skip_count = args.skip_count
             self.configuration.watch.skip_throw = args.skip_throw
             self.configuration.watch.capture = args.capture
@@ -23,7 +23,8 @@ class CommandLineParser(object):
             CommandLineParserFactory.create("watch", self.configuration, self.parser),
             CommandLineParserFactory.create("message", self.configuration, self.parser),
             CommandLineParserFactory.create("hunt", self.configuration, self.parser),
-            CommandLineParserFactory.create("stalk", self.configuration, self.parser)
+            CommandLineParserFactory.create("stalk", self.configuration, self.parser),
+            CommandLineParserFactory.create("replay", self.configuration, self.parser)
         ]
 
     def parse(self, args):
@@ -1,5 +1,7 @@
 """Json utilities."""
 import json
+import os
+import tempfile
 from srtools.utils.loggingutils import log_error
 
 def load_json(filename):
@@ -33,3 +35,33 @@ def save_json(dictionary, filename):
             outfile.write(text)
     except Exception as err:
         log_error(err)
+
+def save_json_atomically(dictionary, filename):
+    """
+    Save a dictionary into a json file, readers see either the old or the new file.
+    :param dictionary: Dictionary to save.
+    :type dictionary: Dictionary
+    :param filename: Name of the file to save.
+    :type filename: string
+    :returns: True if saved, False if failed.
+    :rtype: bool
+    """
+    result = False
+    try:
+        text = json.dumps(dictionary, sort_keys=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)),
+                                             prefix=os.path.basename(filename), suffix=".tmp")
+        try:
+            with os.fdopen(handle, 'w') as outfile:
+                outfile.write(text)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+            os.replace(temporary, filename)
+            result = True
+        finally:
+            if not result:
+                os.remove(temporary)
+    except Exception as err:
+        log_error(err)
+
+    return result
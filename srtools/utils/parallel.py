@@ -1,50 +1,220 @@
 """Threading utilities."""
-from queue import Queue
-from threading import Thread
+import os
+import threading
+import time
+from concurrent import futures
+from queue import Empty, Queue
 #import logging
-from srtools.utils.loggingutils import log_debug
+from srtools.utils.loggingutils import log_debug, log_error
 
 #LOGGER = logging.getLogger(__name__)
 
-class Worker(Thread):
-    """No documentation"""
-    def __init__(self, thread_id, tasks, results):
-        super(Worker, self).__init__()
+class Executor(object):
+    """
+    Worker threads running tasks from a bounded queue. Workers are started on demand, up to
+    max_workers, and end after being idle for a while, so the same executor can serve every
+    cycle of a long running command. Submitting blocks while the queue is full.
 
-        self.thread_id = thread_id
-        self.tasks = tasks
-        self.results = results
-        self.daemon = True
+    Tasks must not wait for other tasks of the same executor, they could wait forever once
+    every worker is busy.
+    """
+    # Executor shared by the whole process, see shared()
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers=10, queue_size=0, idle_timeout=60):
+        """
+        :param max_workers: Maximum tasks running at once.
+        :type max_workers: int
+        :param queue_size: Tasks waiting for a worker before submit blocks, 0 for 4 per worker.
+        :type queue_size: int
+        :param idle_timeout: Seconds without tasks before a worker ends.
+        :type idle_timeout: float
+        """
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self._tasks = Queue(queue_size or max_workers * 4)
+        self._workers = set()
+        # Workers waiting for a task and queued tasks not taken yet, a worker is started when
+        # there are more tasks than idle workers
+        self._idle = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    @classmethod
+    def shared(cls, max_workers=0):
+        """
+        Returns the executor of the process, created on first use.
+        :param max_workers: Minimum amount of workers the caller needs.
+        :type max_workers: int
+        :rtype: Executor
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(max(max_workers, 32), queue_size=1024)
+            elif max_workers > cls._shared.max_workers:
+                cls._shared.max_workers = max_workers
+
+            return cls._shared
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.shutdown()
+
+    @property
+    def workers(self):
+        """Workers currently alive."""
+        return len(self._workers)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues a task, waiting for room in the queue if full.
+        :param func: Function to execute.
+        :type func: function
+        :returns: The future of its result, raising its exception if it failed.
+        :rtype: concurrent.futures.Future
+        """
+        future = futures.Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit tasks after shutdown")
+
+            self._pending += 1
+            if self._pending > self._idle and len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                self._workers.add(worker)
+                worker.start()
+                log_debug('Created worker %s', worker.name)
+
+        self._tasks.put((future, func, args, kwargs))
+        return future
+
+    def _work(self):
+        """Runs queued tasks until shut down or idle for too long."""
+        with self._lock:
+            self._idle += 1
 
-    def run(self):
-        log_debug('Worker %s launched', self.thread_id)
         while True:
-            task_id, func, args, kwargs = self.tasks.get()
-            log_debug('Worker %s start to work on %s', self.thread_id, func.__name__)
             try:
-                self.results.put_nowait((task_id, func(*args, **kwargs)))
-            except BaseException as err:
-                log_debug('Thread(%s): error with task %s\n%s',
-                          self.thread_id, repr(func.__name__), err)
+                task = self._tasks.get(timeout=self.idle_timeout)
+            except Empty:
+                # Leaves under the lock of submit, so it never counts on a leaving worker.
+                # Stays if a task was submitted meanwhile.
+                with self._lock:
+                    if not self._pending:
+                        self._idle -= 1
+                        self._workers.discard(threading.current_thread())
+                        break
+                continue
+
+            if task is None:
+                with self._lock:
+                    self._idle -= 1
+                    self._workers.discard(threading.current_thread())
+                break
+
+            with self._lock:
+                self._idle -= 1
+                self._pending -= 1
+
+            future, func, args, kwargs = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as err:
+                    future.set_exception(err)
+            del task, future
+            with self._lock:
+                self._idle += 1
+
+    def map(self, func, *iterables, timeout=None):
+        """
+        Runs a function for every set of arguments.
+        :param func: Function to execute.
+        :type func: function
+        :param timeout: Seconds to wait for all the results, None to wait forever.
+        :type timeout: float
+        :returns: Generator of the results in the order of the arguments, raising the exception
+                  of a failed task or TimeoutError. Pending tasks are cancelled when it's closed.
+        :rtype: generator
+        """
+        end = time.monotonic() + timeout if timeout is not None else None
+        submitted = [self.submit(func, *args) for args in zip(*iterables)]
+
+        def results():
+            try:
+                for future in submitted:
+                    yield future.result(end - time.monotonic() if end is not None else None)
             finally:
-                log_debug('Worker %s finished work on %s', self.thread_id, func.__name__)
-                self.tasks.task_done()
+                for future in submitted:
+                    future.cancel()
 
-class Parallel(object):
-    """Handles parallel execution."""
-    def __init__(self, thread_num=10):
-        # create queues
-        self.tasks_queue = Queue()
-        self.results_queue = Queue()
+        return results()
+
+    @staticmethod
+    def as_completed(submitted, timeout=None):
+        """
+        Yields futures as they finish.
+        :param submitted: Futures to wait for.
+        :type submitted: concurrent.futures.Future[]
+        :param timeout: Seconds to wait for all of them, None to wait forever.
+        :type timeout: float
+        :rtype: generator
+        """
+        return futures.as_completed(submitted, timeout)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        """
+        Stops the workers once the queued tasks are done.
+        :param wait: Whether to wait for the workers to end.
+        :type wait: bool
+        :param cancel_futures: Whether to cancel the queued tasks not started yet.
+        :type cancel_futures: bool
+        """
+        with self._lock:
+            self._shutdown = True
+            workers = list(self._workers)
+
+        if cancel_futures:
+            try:
+                while True:
+                    task = self._tasks.get_nowait()
+                    if task is not None:
+                        task[0].cancel()
+                        with self._lock:
+                            self._pending -= 1
+            except Empty:
+                pass
 
-        # create a threading pool
-        self.pool = []
-        for i in range(thread_num):
-            worker = Worker(i, self.tasks_queue, self.results_queue)
-            self.pool.append(worker)
-            worker.start()
+        for _ in workers:
+            self._tasks.put(None)
 
-        log_debug('Created %s workers', thread_num)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+def _reset_shared_executor():
+    """Forked children don't have the threads of the parent, they create their own."""
+    Executor._shared = None
+    Executor._shared_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_shared_executor)
+
+class Parallel(object):
+    """Batch of tasks run by the shared executor, collecting their results by task id."""
+    def __init__(self, thread_num=10, executor=None):
+        """
+        :param thread_num: Tasks of the batch that should be able to run at once.
+        :type thread_num: int
+        :param executor: Executor running the tasks, None for the shared one.
+        :type executor: Executor
+        """
+        self.executor = executor or Executor.shared(thread_num)
+        self.futures = {}
 
     def add_task(self, task_id, func, *args, **kwargs):
         """
@@ -55,18 +225,22 @@ class Parallel(object):
         """
 
         log_debug('Adding one task to queue (%s)', func.__name__)
-        # add task to queue
-        self.tasks_queue.put_nowait((task_id, func, args, kwargs))
+        self.futures[task_id] = self.executor.submit(func, *args, **kwargs)
 
     def get_results(self):
-        """No documentation."""
+        """
+        Waits for the tasks added so far.
+        :returns: Results by task id, failed tasks are logged and left out.
+        :rtype: dictionary
+        """
         log_debug('Waiting for processes to ends')
-        self.tasks_queue.join()
-        log_debug('Processes terminated, fetching results')
-
-        results = []
-        while not self.results_queue.empty():
-            results.append(self.results_queue.get())
+        results = {}
+        for task_id, future in self.futures.items():
+            try:
+                results[task_id] = future.result()
+            except Exception as err:
+                log_error(err)
+        self.futures = {}
 
         log_debug('Results fetched, returning data')
-        return dict(results)
+        return results
@@ -0,0 +1,147 @@
+"""Client side request rate control."""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from enum import Enum
+
+class TokenBucket(object):
+    """Allows a sustained rate of requests with bursts, shared by every thread."""
+    def __init__(self, rate, burst):
+        """
+        :param rate: Requests per second.
+        :type rate: float
+        :param burst: Requests allowed at once after being idle.
+        :type burst: int
+        """
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token, borrowing it from the future if there are none left.
+        :returns: Seconds to wait before sending the request.
+        :rtype: float
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            result = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        return result
+
+def parse_retry_after(value):
+    """
+    Reads a Retry-After header.
+    :param value: Seconds or HTTP date.
+    :type value: string
+    :returns: Seconds to wait, None if missing or invalid.
+    :rtype: float
+    """
+    result = None
+    if value:
+        try:
+            result = max(0.0, float(value))
+        except ValueError:
+            try:
+                result = max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                result = None
+
+    return result
+
+def backoff_delay(attempt, base, maximum, retry_after=None, generator=random):
+    """
+    Seconds to wait before retrying, exponential with full jitter so clients spread out.
+    :param attempt: Failed attempts so far, from 1.
+    :type attempt: int
+    :param base: Seconds of the first backoff.
+    :type base: float
+    :param maximum: Maximum seconds.
+    :type maximum: float
+    :param retry_after: Seconds asked by the server, waited at least.
+    :type retry_after: float
+    :rtype: float
+    """
+    result = generator.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+    if retry_after is not None:
+        result = max(result, min(retry_after, maximum))
+
+    return result
+
+class CircuitBreaker(object):
+    """
+    Stops sending requests once the server refuses them. After a cooldown a single trial
+    request is let through (half open): success closes the breaker, failure opens it again for
+    twice as long.
+    """
+    class State(Enum):
+        """Breaker state."""
+        CLOSED = 0
+        OPEN = 1
+        HALF_OPEN = 2
+
+    def __init__(self, cooldown=60, max_cooldown=900):
+        """
+        :param cooldown: Seconds without requests after the first refusal.
+        :type cooldown: float
+        :param max_cooldown: Maximum seconds without requests.
+        :type max_cooldown: float
+        """
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._state = self.State.CLOSED
+        self._current_cooldown = cooldown
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        Current state, half open once the cooldown is over.
+        :rtype: CircuitBreaker.State
+        """
+        with self._lock:
+            if self._state == self.State.OPEN and \
+               time.monotonic() - self._opened >= self._current_cooldown:
+                result = self.State.HALF_OPEN
+            else:
+                result = self._state
+
+        return result
+
+    def allow(self):
+        """
+        Whether a request may be sent, taking the trial when half open.
+        :rtype: bool
+        """
+        with self._lock:
+            now = time.monotonic()
+            result = self._state == self.State.CLOSED
+            # A trial without result (e.g. a connection error) is replaced after a cooldown
+            if not result and now - self._opened >= self._current_cooldown:
+                # Trial in flight, the rest wait for its result
+                self._state = self.State.HALF_OPEN
+                self._opened = now
+                result = True
+
+        return result
+
+    def record_success(self):
+        """The server accepted a request."""
+        with self._lock:
+            self._state = self.State.CLOSED
+            self._current_cooldown = self.cooldown
+
+    def record_failure(self):
+        """The server refused a request."""
+        with self._lock:
+            if self._state == self.State.HALF_OPEN:
+                self._current_cooldown = min(self.max_cooldown, self._current_cooldown * 2)
+            self._state = self.State.OPEN
+            self._opened = time.monotonic()
@@ -0,0 +1,93 @@
+"""Cache of replies to read-only requests."""
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache(object):
+    """
+    Replies kept for a time to live, the least recently used are dropped when the cache is full.
+    Shared by every thread of the process.
+    """
+    def __init__(self, max_size=1024):
+        """
+        :param max_size: Maximum amount of replies kept.
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path, params):
+        """
+        Builds the key of a request, ignoring the "_" cache buster.
+        :param path: Requested path.
+        :type path: string
+        :param params: Query parameters.
+        :type params: dictionary
+        :returns: The key.
+        :rtype: tuple
+        """
+        return (path, tuple(sorted((str(x), str(y)) for x, y in (params or {}).items()
+                                   if x != '_')))
+
+    def get(self, key):
+        """
+        Returns a kept reply.
+        :param key: Request key.
+        :type key: tuple
+        :returns: The reply, None if not kept or expired.
+        """
+        result = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    result = entry[1]
+                else:
+                    del self._entries[key]
+
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return result
+
+    def put(self, key, value, ttl):
+        """
+        Keeps a reply.
+        :param key: Request key.
+        :type key: tuple
+        :param value: The reply.
+        :param ttl: Seconds to keep it.
+        :type ttl: float
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path=None, params=None):
+        """
+        Drops kept replies.
+        :param path: Path to drop, None for every path.
+        :type path: string
+        :param params: Parameters of the request to drop, None for every request of the path.
+        :type params: dictionary
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            elif params is not None:
+                self._entries.pop(self.key(path, params), None)
+            else:
+                for key in [x for x in self._entries if x[0] == path]:
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
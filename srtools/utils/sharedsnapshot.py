@@ -0,0 +1,127 @@
+"""Snapshot shared by the processes of the host."""
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+
+# Snapshots alive in this process, their locks are replaced in forked children
+_SNAPSHOTS = weakref.WeakSet()
+
+def _reset_locks_after_fork():
+    """A lock held by another thread while forking would never be released in the child."""
+    for snapshot in list(_SNAPSHOTS):
+        snapshot._lock = threading.RLock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+class SharedSnapshot(object):
+    """
+    Latest reply of a request, published in a memory-mapped file for every process of the host.
+    The first process finding it stale refreshes it while holding a lock, the rest wait for it
+    and read the new snapshot instead of issuing their own request. Every snapshot has a version,
+    a process only decodes the snapshots it didn't read yet. Threads of a process share an
+    instance, its state is only changed while holding its lock.
+    """
+    # Magic, version, fetched at (epoch) and size of the JSON payload
+    _HEADER = struct.Struct("<8sQdI")
+    _MAGIC = b"SRSNAP01"
+
+    def __init__(self, path, ttl=10):
+        """
+        :param path: File keeping the snapshot, path.lock is used as well.
+        :type path: string
+        :param ttl: Seconds a snapshot is used before refreshing it.
+        :type ttl: float
+        """
+        self.path = path
+        self.ttl = ttl
+        self.version = None
+        self.fetched = None
+        self.value = None
+        # Version considered stale regardless of its age, see expire()
+        self._expired = None
+        # Held while reading or changing the state, and while refreshing
+        self._lock = threading.RLock()
+        _SNAPSHOTS.add(self)
+
+    def read(self):
+        """
+        Reads the published snapshot, decoding it only if its version changed.
+        :returns: Whether there's a snapshot.
+        :rtype: bool
+        """
+        result = False
+        with self._lock:
+            try:
+                with open(self.path, "rb") as snapshot:
+                    with mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        magic, version, fetched, size = self._HEADER.unpack_from(mapped)
+                        if magic == self._MAGIC:
+                            if version != self.version:
+                                start = self._HEADER.size
+                                self.value = json.loads(
+                                    mapped[start:start + size].decode("utf-8"))
+                                self.version = version
+                            self.fetched = fetched
+                            result = True
+            except (OSError, ValueError, struct.error):
+                # Missing, empty or being replaced
+                pass
+
+        return result
+
+    def publish(self, value):
+        """
+        Replaces the published snapshot, readers never see a partial one.
+        :param value: JSON-compatible value.
+        """
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            version = (self.version or 0) + 1
+            fetched = time.time()
+            temporary = "%s.%s.tmp" % (self.path, os.getpid())
+            with open(temporary, "wb") as snapshot:
+                snapshot.write(self._HEADER.pack(self._MAGIC, version, fetched, len(payload)))
+                snapshot.write(payload)
+            os.replace(temporary, self.path)
+
+            self.version = version
+            self.fetched = fetched
+            self.value = value
+
+    def _is_fresh(self):
+        """Whether the last read snapshot can be used, called holding the lock."""
+        return self.version is not None and self.version != self._expired and \
+               time.time() - self.fetched < self.ttl
+
+    def expire(self):
+        """Refreshes the current snapshot on the next get, unless another process already did."""
+        with self._lock:
+            self._expired = self.version
+
+    def get(self, fetch):
+        """
+        Returns the snapshot, refreshing it if stale.
+        :param fetch: Function returning a new value, None if failed.
+        :type fetch: function
+        :returns: The value, the stale one if the refresh failed.
+        """
+        with self._lock:
+            if not (self.read() and self._is_fresh()):
+                with open(self.path + ".lock", "a") as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    try:
+                        # Refreshed by another process while waiting for the lock
+                        if not (self.read() and self._is_fresh()):
+                            value = fetch()
+                            if value is not None:
+                                self.publish(value)
+                    finally:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+            return self.value
@@ -0,0 +1,89 @@
+"""Coalescing of identical concurrent calls."""
+import asyncio
+import threading
+
+class SingleFlight(object):
+    """
+    Runs a call once for every caller asking for the same key at the same time: the first one
+    runs it and the rest wait for its result (or its exception).
+    """
+    class _Call(object):
+        """Call in flight."""
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Runs a function, or waits for the call with the same key running in another thread.
+        :param key: Identifies equivalent calls.
+        :type key: tuple
+        :param function: Function to call.
+        :type function: function
+        :returns: The result of the function.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.shared += 1
+
+        if leader:
+            try:
+                call.result = function(*args, **kwargs)
+            except BaseException as err:
+                call.error = err
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+
+        return call.result
+
+    async def do_async(self, key, function, *args, **kwargs):
+        """
+        Awaits a coroutine function, or the call with the same key awaited by another task.
+        Must be used from a single event loop.
+        :param key: Identifies equivalent calls.
+        :type key: tuple
+        :param function: Coroutine function to await.
+        :type function: function
+        :returns: The result of the coroutine.
+        """
+        future = self._futures.get(key)
+        if future is not None:
+            self.shared += 1
+            # A cancelled waiter must not cancel the call of the others
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        try:
+            result = await function(*args, **kwargs)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # Retrieved here, so it isn't reported as never retrieved when nobody waits
+            future.exception()
+            raise
+        finally:
+            del self._futures[key]
+
+        return result
@@ -0,0 +1,136 @@
+"""Timers of long running loops."""
+import heapq
+import itertools
+import threading
+import time
+
+class Timers(object):
+    """
+    Deadlines and periodic checks of a long running loop. run() sleeps until the next timer is
+    due instead of waking up at a fixed rate, so an idle loop costs nothing between them.
+    Timers can be added, moved or cancelled from the callbacks or from other threads.
+    """
+    class Timer(object):
+        """Timer handle."""
+        __slots__ = ("due", "interval", "callback", "args", "cancelled", "_sequence")
+
+        def __init__(self, due, interval, callback, args):
+            self.due = due
+            self.interval = interval
+            self.callback = callback
+            self.args = args
+            self.cancelled = False
+            self._sequence = None
+
+        def left(self):
+            """
+            :returns: Seconds until it's due.
+            :rtype: float
+            """
+            return max(0.0, self.due - time.monotonic())
+
+        def cancel(self):
+            """Stops the timer, it won't be called anymore."""
+            self.cancelled = True
+
+    def __init__(self):
+        # Heap of (due, sequence, timer), entries not matching the sequence of their timer were
+        # moved or rescheduled
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def _push(self, timer):
+        """Queues a timer at its due time, replacing its previous entry."""
+        with self._condition:
+            timer._sequence = next(self._sequence)
+            heapq.heappush(self._queue, (timer.due, timer._sequence, timer))
+            self._condition.notify()
+
+    def after(self, delay, callback, *args):
+        """
+        Calls a function once.
+        :param delay: Seconds to wait.
+        :type delay: float
+        :param callback: Function to call.
+        :type callback: function
+        :returns: The timer.
+        :rtype: Timers.Timer
+        """
+        timer = self.Timer(time.monotonic() + max(0, delay), None, callback, args)
+        self._push(timer)
+        return timer
+
+    def every(self, interval, callback, *args, delay=None):
+        """
+        Calls a function periodically.
+        :param interval: Seconds between calls.
+        :type interval: float
+        :param callback: Function to call.
+        :type callback: function
+        :param delay: Seconds before the first call, None for an interval.
+        :type delay: float
+        :returns: The timer.
+        :rtype: Timers.Timer
+        """
+        timer = self.Timer(time.monotonic() + (interval if delay is None else max(0, delay)),
+                           interval, callback, args)
+        self._push(timer)
+        return timer
+
+    def move(self, timer, delay):
+        """
+        Changes when a timer is due.
+        :param timer: Timer to move.
+        :type timer: Timers.Timer
+        :param delay: Seconds from now.
+        :type delay: float
+        """
+        timer.due = time.monotonic() + max(0, delay)
+        self._push(timer)
+
+    def stop(self):
+        """Makes run() return."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _next(self):
+        """
+        Waits for the next due timer.
+        :returns: The timer, None if stopped or there are no timers left.
+        :rtype: Timers.Timer
+        """
+        with self._condition:
+            while not self._stopped and self._queue:
+                due, sequence, timer = self._queue[0]
+                if timer.cancelled or sequence != timer._sequence:
+                    heapq.heappop(self._queue)
+                    continue
+
+                now = time.monotonic()
+                if due > now:
+                    self._condition.wait(due - now)
+                    continue
+
+                heapq.heappop(self._queue)
+                if timer.interval is not None:
+                    # Keeps the pace, skipping the calls missed while busy
+                    timer.due = max(due + timer.interval, now)
+                    timer._sequence = next(self._sequence)
+                    heapq.heappush(self._queue, (timer.due, timer._sequence, timer))
+
+                return timer
+
+            return None
+
+    def run(self):
+        """Calls the due timers until stopped or there are no timers left."""
+        with self._condition:
+            self._stopped = False
+
+        timer = self._next()
+        while timer is not None:
+            timer.callback(*timer.args)
+            timer = self._next()
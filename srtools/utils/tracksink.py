@@ -0,0 +1,193 @@
+"""Storage for track information."""
+import csv
+import os
+import sqlite3
+from datetime import datetime
+
+_COLUMNS = ["id", "key", "date", "actual_date", "followers", "viewers", "points", "diff"]
+
+def _parse_date(value):
+    """
+    Converts a stored date back to datetime.
+    :param value: Date as written by str(datetime).
+    :type value: string
+    :returns: The date, None if it couldn't be parsed.
+    :rtype: datetime
+    """
+    try:
+        result = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        result = None
+
+    return result
+
+class TrackSink(object):
+    """Tab separated track file, one line per change."""
+    def __init__(self, filename):
+        """
+        :param filename: Track file.
+        :type filename: string
+        """
+        self.filename = filename
+        self._alias = "text"
+
+    def alias(self):
+        """Returns the alias of the sink."""
+        return self._alias
+
+    def write(self, lines):
+        """
+        Stores the changes of a track cycle.
+        :param lines: Changes as built by ServicesManager._do_track_process_data.
+        :type lines: dictionary[]
+        """
+        with open(self.filename, "a") as output:
+            for line in lines:
+                output.write("%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n" % (line["id"], \
+                    line["key"], line["date"], line["actual_date"], line["followers"], \
+                    line["viewers"], line["points"], line["diff"]))
+
+    def _rows(self):
+        """Yields every stored change as a dictionary."""
+        if os.path.exists(self.filename):
+            with open(self.filename, "r") as input_file:
+                for row in csv.reader(input_file, delimiter='\t'):
+                    if len(row) == len(_COLUMNS):
+                        yield dict(zip(_COLUMNS, row))
+
+    def last(self):
+        """
+        Latest stored values of every room.
+        :returns: Points, followers, viewers, diff and date by room id.
+        :rtype: dictionary
+        """
+        result = {}
+        for row in self._rows():
+            result[int(row["id"])] = {"points": int(row["points"]),
+                                      "followers": int(row["followers"]),
+                                      "viewers": int(row["viewers"]),
+                                      "diff": int(row["diff"]),
+                                      "date": _parse_date(row["date"])}
+
+        return result
+
+    def query(self, room_id, start=None, end=None):
+        """
+        Stored changes of a room, oldest first.
+        :param room_id: Room to query.
+        :type room_id: int
+        :param start: First date to include, None for no limit.
+        :type start: datetime
+        :param end: Last date to include, None for no limit.
+        :type end: datetime
+        :returns: Changes with date, actual_date, followers, viewers, points and diff. Changes
+                  without a valid date are left out.
+        :rtype: dictionary[]
+        """
+        result = []
+        for row in self._rows():
+            if row["id"] == str(room_id):
+                date = _parse_date(row["date"])
+                if date is not None and (start is None or start <= date) and \
+                   (end is None or date <= end):
+                    result.append({"date": date,
+                                   "actual_date": _parse_date(row["actual_date"]),
+                                   "followers": int(row["followers"]),
+                                   "viewers": int(row["viewers"]),
+                                   "points": int(row["points"]),
+                                   "diff": int(row["diff"])})
+
+        return result
+
+    def close(self):
+        """Releases the sink."""
+        pass
+
+class SqliteTrackSink(TrackSink):
+    """SQLite track database, indexed by room and date."""
+    def __init__(self, filename):
+        super(SqliteTrackSink, self).__init__(filename)
+        self._alias = "sqlite"
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS track ("
+                                     "room_id INTEGER NOT NULL, room_url_key TEXT, "
+                                     "date TEXT NOT NULL, actual_date TEXT, followers INTEGER, "
+                                     "viewers INTEGER, points INTEGER, diff INTEGER)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS track_room_date "
+                                     "ON track (room_id, date)")
+
+    def write(self, lines):
+        # A single transaction per cycle
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO track VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(int(x["id"]), x["key"], str(x["date"]), str(x["actual_date"]),
+                  int(x["followers"]), int(x["viewers"]), int(x["points"]), int(x["diff"]))
+                 for x in lines])
+
+    def last(self):
+        result = {}
+        cursor = self._connection.execute(
+            "SELECT room_id, points, followers, viewers, diff, MAX(date) FROM track "
+            "GROUP BY room_id")
+        for room_id, points, followers, viewers, diff, date in cursor:
+            result[room_id] = {"points": points, "followers": followers, "viewers": viewers,
+                               "diff": diff, "date": _parse_date(date)}
+
+        return result
+
+    def query(self, room_id, start=None, end=None):
+        sql = "SELECT date, actual_date, followers, viewers, points, diff FROM track " \
+              "WHERE room_id = ?"
+        params = [int(room_id)]
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(str(start))
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(str(end))
+        sql += " ORDER BY date"
+
+        rows = [{"date": _parse_date(date), "actual_date": _parse_date(actual_date),
+                 "followers": followers, "viewers": viewers, "points": points, "diff": diff}
+                for date, actual_date, followers, viewers, points, diff in
+                self._connection.execute(sql, params)]
+        return [x for x in rows if x["date"] is not None]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class TrackSinkFactory(object):
+    """Track sink factory."""
+    def __init__(self):
+        self._sinks = {
+            "text": TrackSink,
+            "sqlite": SqliteTrackSink
+        }
+
+    def create(self, sink, filename):
+        """
+        Create track sink by alias.
+        :param sink: alias of the sink.
+        :type sink: string
+        :param filename: Track file.
+        :type filename: string
+        :returns: A track sink.
+        :rtype: TrackSink
+        """
+        if sink in self._sinks:
+            return self._sinks[sink](filename)
+
+    @property
+    def available_sinks(self):
+        """
+        List of available track sinks.
+        :returns: List of sinks.
+        :rtype: string{}
+        """
+        return self._sinks.keys()